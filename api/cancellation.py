@@ -0,0 +1,35 @@
+import threading
+import time
+
+# Cooperative cancellation: solvers check a token between iterations/nodes and stop with Cancelled
+# once it is tripped (client disconnected, job cancelled) or its deadline has passed.
+
+class Cancelled(Exception):
+    pass
+
+class CancelToken:
+    __slots__ = ['deadline', 'reason', '_event']
+
+    def __init__(self, timeout=None):
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.reason = None
+        self._event = threading.Event()
+
+    def cancel(self, reason="cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline")
+            return True
+        return False
+
+    def check(self):
+        """Raises Cancelled if the token was tripped or its deadline has passed."""
+        if self.cancelled:
+            raise Cancelled(self.reason)
@@ -1,17 +1,37 @@
-from fastapi import FastAPI, HTTPException, Request, Depends
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request, Depends, Path
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.gzip import GZipMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any, Union, Annotated
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, Field, model_validator, ValidationError
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Dict, Any, Union, Annotated, Tuple
 import sys
 import os
 import logging
+import asyncio
+import base64
+import contextlib
+import json
+import numpy as np
 
 # Add parent directory to path if needed for local execution
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from api.solvers import lp, ip, colgen, lagrangian, stochastic
-from api.limiter import check_rate_limit
+from api.lazy import lazy
+from api.limiter import check_rate_limit, consume, ENDPOINT_COSTS
+from api import jobs
+from api.cancellation import CancelToken, Cancelled
+
+# Optimization: solvers (and through them SciPy and matplotlib) are imported by the first request that
+# needs them, so a cold start only loads FastAPI and NumPy
+lp = lazy("api.solvers.lp")
+ip = lazy("api.solvers.ip")
+colgen = lazy("api.solvers.colgen")
+lagrangian = lazy("api.solvers.lagrangian")
+stochastic = lazy("api.solvers.stochastic")
+twostage = lazy("api.solvers.twostage")
+plotting = lazy("api.plotting")
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -24,15 +44,25 @@ app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 # Security Payload Size Limit
 MAX_PAYLOAD_SIZE = 2_000_000 # 2MB limit
+# Packed binary scenarios are ~30x denser than JSON, so the columnar upload gets a larger budget
+COLUMNAR_PATH = "/api/stochastic/columnar"
+MAX_COLUMNAR_PAYLOAD_SIZE = 24_000_000 # 24MB limit
+# Rendered plots are immutable, so they are the one route the browser may cache
+PLOT_PATH = "/api/plot/"
+PLOT_MAX_AGE = 3600 # seconds
+PLOT_WAIT_SECONDS = 30.0
+# Cancellable solves (B&B, column generation, Lagrangian) stop at this deadline or when the client disconnects
+SOLVE_DEADLINE_SECONDS = 60.0
 
 @app.middleware("http")
 async def limit_request_size(request: Request, call_next):
     # Security: Protect against DoS by limiting payload size before JSON parsing
+    max_size = MAX_COLUMNAR_PAYLOAD_SIZE if request.url.path == COLUMNAR_PATH else MAX_PAYLOAD_SIZE
     content_lengths = request.headers.getlist("content-length")
     for content_length in content_lengths:
         for cl in content_length.split(','):
             try:
-                if int(cl.strip()) > MAX_PAYLOAD_SIZE:
+                if int(cl.strip()) > max_size:
                     return JSONResponse(
                         status_code=413,
                         content={"detail": "Payload Too Large"},
@@ -63,7 +93,8 @@ async def add_security_headers(request: Request, call_next):
     response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
     response.headers["Permissions-Policy"] = "accelerometer=(), camera=(), geolocation=(), gyroscope=(), magnetometer=(), microphone=(), payment=(), usb=()"
     response.headers["X-Permitted-Cross-Domain-Policies"] = "none"
-    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+    if not request.url.path.startswith(PLOT_PATH):
+        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
     return response
 
 # Exception Handlers
@@ -75,6 +106,11 @@ async def value_error_handler(request: Request, exc: ValueError):
         content={"detail": "Invalid input parameters"},
     )
 
+@app.exception_handler(Cancelled)
+async def cancelled_handler(request: Request, exc: Cancelled):
+    status_code, detail = solve_error(exc)
+    return JSONResponse(status_code=status_code, content={"detail": detail})
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f"Global exception: {exc}", exc_info=True)
@@ -87,6 +123,25 @@ async def global_exception_handler(request: Request, exc: Exception):
 MAX_VARS = 100
 MAX_CONSTRAINTS = 200
 MAX_SCENARIOS = 50
+# Scenario limits of the columnar upload; the extensive form grows as 3 + 6n variables
+MAX_COLUMNAR_SCENARIOS = 500_000
+MAX_EXTENSIVE_SCENARIOS = 20_000
+MAX_LAGRANGIAN_ITER = 500
+MAX_SOLVE_SECONDS = 30.0
+MAX_SPARSE_TASKS = 2000
+MAX_ELIGIBLE_PAIRS = 20000
+MAX_BENDERS_ITER = 200
+MAX_CUT_GROUPS = 500
+MAX_CANDIDATES = 100
+MAX_EVAL_SCENARIOS = 100_000
+MAX_SAA_SAMPLE = 2000
+MAX_SAA_REPLICATIONS = 20
+MAX_SAA_EVAL = 1_000_000
+MAX_SAA_WORKERS = 4
+MAX_PH_WORKERS = 4
+MAX_FRONTIER_POINTS = 51
+# Same as stochastic.MAX_REDUCTION_SCENARIOS, repeated so validation does not import the solver
+MAX_REDUCTION_SCENARIOS = 5000
 
 # Input validation for floats: strict mode, finite, and bounded to avoid overflows/DoS
 SafeFloat = Annotated[float, Field(allow_inf_nan=False, ge=-1e20, le=1e20)]
@@ -95,6 +150,10 @@ SafeString = Annotated[str, Field(min_length=1, max_length=50, pattern=r"^[a-zA-
 
 ProbabilityFloat = Annotated[float, Field(allow_inf_nan=False, ge=0.0, le=1.0)]
 
+# Plot output: "png" embeds a base64 PNG, "data" returns plot-ready numeric series as plot_data,
+# "async" returns a plot ID at once and renders in the background (fetch it from /api/plot/{id})
+RenderMode = Annotated[str, Field(pattern=r"^(png|data|async)$")]
+
 BoundedFloatList = Annotated[List[SafeFloat], Field(min_length=1, max_length=MAX_VARS)]
 BoundedConstraintMatrix = Annotated[List[BoundedFloatList], Field(min_length=1, max_length=MAX_CONSTRAINTS)]
 BoundedConstraintVector = Annotated[List[SafeFloat], Field(min_length=1, max_length=MAX_CONSTRAINTS)]
@@ -102,6 +161,8 @@ BoundedConstraintVector = Annotated[List[SafeFloat], Field(min_length=1, max_len
 # Security: Enforce strict dimensional constraints on nested arrays to prevent IndexError exceptions (DoS/Log Flooding)
 DemandTuple = Annotated[List[SafeFloat], Field(min_length=2, max_length=2)]
 YieldTuple = Annotated[List[SafeFloat], Field(min_length=3, max_length=3)]
+# (task, agent, cost, weight) eligible pair of a sparse GAP instance
+EligiblePair = Tuple[Annotated[int, Field(ge=0, lt=MAX_SPARSE_TASKS)], Annotated[int, Field(ge=0, lt=MAX_VARS)], SafeFloat, SafeFloat]
 
 class LPParams(BaseModel):
     c: BoundedFloatList
@@ -110,12 +171,14 @@ class LPParams(BaseModel):
     bounds: Annotated[Optional[List[Union[List[Optional[SafeFloat]], None]]], Field(max_length=MAX_VARS)] = None
     maximize: bool = False
     method: Annotated[str, Field(pattern=r"^(highs|highs-ds|highs-ipm)$")] = "highs"
+    render: RenderMode = "png"
 
 class IPParams(BaseModel):
     c: BoundedFloatList
     A_ub: BoundedConstraintMatrix
     b_ub: BoundedConstraintVector
     maximize: bool = True
+    render: RenderMode = "png"
 
 class ColGenParams(BaseModel):
     # Security: Prevent Out-Of-Memory (OOM) DoS by limiting roll_length to 100,000
@@ -123,51 +186,436 @@ class ColGenParams(BaseModel):
     demands: Annotated[List[DemandTuple], Field(min_length=1, max_length=MAX_VARS)] # [[width, quantity], ...]
 
 class LagrangianParams(BaseModel):
-    costs: Annotated[List[BoundedFloatList], Field(min_length=1, max_length=MAX_VARS)]
-    weights: Annotated[List[BoundedFloatList], Field(min_length=1, max_length=MAX_VARS)]
+    # Either dense cost/weight matrices or a sparse list of eligible pairs
+    costs: Annotated[Optional[List[BoundedFloatList]], Field(min_length=1, max_length=MAX_VARS)] = None
+    weights: Annotated[Optional[List[BoundedFloatList]], Field(min_length=1, max_length=MAX_VARS)] = None
+    pairs: Annotated[Optional[List[EligiblePair]], Field(min_length=1, max_length=MAX_ELIGIBLE_PAIRS)] = None
+    n_tasks: Annotated[Optional[int], Field(ge=1, le=MAX_SPARSE_TASKS)] = None
     capacities: BoundedFloatList
+    max_iter: Annotated[int, Field(ge=1, le=MAX_LAGRANGIAN_ITER)] = 100
+    # Security: Bound the wall-clock budget so a single request cannot pin a worker indefinitely
+    time_limit: Annotated[float, Field(gt=0, le=MAX_SOLVE_SECONDS)] = 10.0
+    target_gap: Annotated[float, Field(ge=0, le=1)] = 1e-4
+    step_rule: Annotated[str, Field(pattern=r"^(polyak|diminishing)$")] = "polyak"
+    local_search: bool = False
+    dual_method: Annotated[str, Field(pattern=r"^(subgradient|volume)$")] = "subgradient"
+    relax: Annotated[str, Field(pattern=r"^(assignment|capacity)$")] = "assignment"
+    resolve_tol: Annotated[float, Field(ge=0, le=1e6)] = 0.0
+    render: RenderMode = "png"
+
+    @model_validator(mode="after")
+    def check_input_form(self):
+        dense = self.costs is not None or self.weights is not None
+        if dense == (self.pairs is not None) or (dense and (self.costs is None or self.weights is None)):
+            raise ValueError("Provide either costs and weights, or pairs")
+        return self
 
 class Scenario(BaseModel):
     name: SafeString
     probability: ProbabilityFloat
     yields: YieldTuple
 
-class StochasticParams(BaseModel):
+class StochasticOptions(BaseModel):
     total_land: SafeFloat
+    method: Annotated[str, Field(pattern=r"^(extensive|lshaped|ph|frontier)$")] = "extensive"
+    max_iter: Annotated[int, Field(ge=1, le=MAX_BENDERS_ITER)] = 50
+    tol: Annotated[float, Field(ge=0, le=1)] = 1e-6
+    max_cut_groups: Annotated[int, Field(ge=1, le=MAX_CUT_GROUPS)] = 100
+    metrics: bool = False
+    reduce_to: Annotated[Optional[int], Field(ge=1, le=MAX_REDUCTION_SCENARIOS)] = None
+    rho: Annotated[float, Field(gt=0, le=1e6)] = 1.0
+    # Relative to total_land
+    ph_tol: Annotated[float, Field(gt=0, le=1)] = 1e-3
+    cvar_weight: Annotated[float, Field(ge=0, le=1)] = 0.0
+    cvar_alpha: Annotated[float, Field(ge=0, le=0.999)] = 0.95
+    frontier_points: Annotated[int, Field(ge=2, le=MAX_FRONTIER_POINTS)] = 11
+    # Security: Bound the L-shaped / progressive hedging wall-clock budget like the Lagrangian one
+    time_limit: Annotated[float, Field(gt=0, le=MAX_SOLVE_SECONDS)] = 10.0
+    render: RenderMode = "png"
+
+class StochasticParams(StochasticOptions):
     scenarios: Annotated[List[Scenario], Field(min_length=1, max_length=MAX_SCENARIOS)]
 
+class ColumnarStochasticParams(StochasticOptions):
+    # Base64 of packed little-endian float64: n probabilities, and 3n yields as [wheat | corn | beets]
+    probabilities: Annotated[str, Field(min_length=1, max_length=MAX_COLUMNAR_PAYLOAD_SIZE)]
+    yields: Annotated[str, Field(min_length=1, max_length=MAX_COLUMNAR_PAYLOAD_SIZE)]
+
+AcreTuple = Annotated[List[Annotated[SafeFloat, Field(ge=0)]], Field(min_length=3, max_length=3)]
+
+class EvaluateParams(BaseModel):
+    candidates: Annotated[List[AcreTuple], Field(min_length=1, max_length=MAX_CANDIDATES)]
+    yields: Annotated[List[YieldTuple], Field(min_length=1, max_length=MAX_EVAL_SCENARIOS)]
+    # Defaults to equally likely scenarios
+    probabilities: Annotated[Optional[List[ProbabilityFloat]], Field(max_length=MAX_EVAL_SCENARIOS)] = None
+
+    @model_validator(mode="after")
+    def check_probabilities(self):
+        if self.probabilities is not None and len(self.probabilities) != len(self.yields):
+            raise ValueError("Need one probability per scenario")
+        return self
+
+class YieldDistribution(BaseModel):
+    kind: Annotated[str, Field(pattern=r"^(normal|uniform|triangular)$")]
+    params: Annotated[List[SafeFloat], Field(min_length=2, max_length=3)]
+
+class SAAParams(BaseModel):
+    total_land: SafeFloat
+    # Wheat, Corn, Beets
+    distributions: Annotated[List[YieldDistribution], Field(min_length=3, max_length=3)]
+    sample_size: Annotated[int, Field(ge=1, le=MAX_SAA_SAMPLE)] = 100
+    replications: Annotated[int, Field(ge=2, le=MAX_SAA_REPLICATIONS)] = 10
+    # Security: Bound the out-of-sample evaluation, which scales linearly in time
+    eval_size: Annotated[int, Field(ge=2, le=MAX_SAA_EVAL)] = 100_000
+    seed: Annotated[int, Field(ge=0, le=2**32 - 1)] = 0
+    confidence: Annotated[float, Field(ge=0.5, le=0.999)] = 0.95
+    method: Annotated[str, Field(pattern=r"^(extensive|lshaped|ph)$")] = "extensive"
+    # Per replication; the whole run is still bounded by SOLVE_DEADLINE_SECONDS
+    time_limit: Annotated[float, Field(gt=0, le=MAX_SOLVE_SECONDS)] = 10.0
+    render: RenderMode = "png"
+
+class TwoStageParams(BaseModel):
+    # min c.x + sum_s p_s q_s.y_s s.t. A_ub x <= b_ub, T_s x + W y_s <= h_s, x, y >= 0
+    c: BoundedFloatList
+    A_ub: Optional[BoundedConstraintMatrix] = None
+    b_ub: Optional[BoundedConstraintVector] = None
+    W: BoundedConstraintMatrix
+    # One entry per scenario, or a single entry shared by all scenarios
+    q: Annotated[List[BoundedFloatList], Field(min_length=1, max_length=MAX_SCENARIOS)]
+    T: Annotated[List[BoundedConstraintMatrix], Field(min_length=1, max_length=MAX_SCENARIOS)]
+    h: Annotated[List[BoundedConstraintVector], Field(min_length=1, max_length=MAX_SCENARIOS)]
+    probabilities: Annotated[List[ProbabilityFloat], Field(min_length=1, max_length=MAX_SCENARIOS)]
+    cvar_weight: Annotated[float, Field(ge=0, le=1)] = 0.0
+    cvar_alpha: Annotated[float, Field(ge=0, le=0.999)] = 0.95
+
+    @model_validator(mode="after")
+    def check_first_stage(self):
+        if (self.A_ub is None) != (self.b_ub is None):
+            raise ValueError("Provide both A_ub and b_ub, or neither")
+        return self
+
 @app.get("/api/health")
 def health():
     return {"status": "ok"}
 
+@app.get(PLOT_PATH + "{plot_id}")
+async def get_plot_route(request: Request, plot_id: Annotated[str, Path(pattern=r"^[A-Za-z0-9_\-]{22}$")]):
+    future = plotting.get_plot(plot_id)
+    if future is None:
+        raise HTTPException(status_code=404, detail="Plot not found")
+    etag = f'"{plot_id}"'
+    headers = {"Cache-Control": f"private, max-age={PLOT_MAX_AGE}, immutable", "ETag": etag}
+    if_none_match = ",".join(request.headers.getlist("if-none-match"))
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    try:
+        # Shielded: a timed-out request must not cancel the render other requests may wait on
+        png = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), PLOT_WAIT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Plot rendering timed out")
+    except Exception as e:
+        logger.error(f"Plot rendering failed: {e}")
+        raise HTTPException(status_code=500, detail="Plot rendering failed")
+    return Response(content=png, media_type="image/png", headers=headers)
+
 @app.post("/api/lp", dependencies=[Depends(check_rate_limit)])
 def solve_lp_route(params: LPParams):
     # Clean bounds: Convert None to None (Pydantic might make them something else or lists)
     bounds = params.bounds
     if bounds:
         bounds = [tuple(b) if b else (0, None) for b in bounds]
-    return lp.solve_lp(params.c, params.A_ub, params.b_ub, bounds, params.maximize, params.method)
+    return lp.solve_lp(params.c, params.A_ub, params.b_ub, bounds, params.maximize, params.method, render=params.render)
+
+def solve_error(exc):
+    # Same responses as the synchronous routes' exception handlers
+    if isinstance(exc, HTTPException):
+        return exc.status_code, exc.detail
+    if isinstance(exc, Cancelled):
+        logger.info(f"Solve cancelled: {exc}")
+        return 503, "Solve deadline exceeded" if str(exc) == "deadline" else "Solve cancelled"
+    if isinstance(exc, ValueError):
+        logger.warning(f"ValueError: {exc}")
+        return 400, "Invalid input parameters"
+    logger.error(f"Solve failed: {exc}", exc_info=exc)
+    return 500, "Internal Server Error"
+
+def no_progress():
+    """Progress callback of a direct request: none (background jobs pass their own)."""
+    return None
+
+@contextlib.asynccontextmanager
+async def cancel_on_disconnect(request: Request):
+    """Cancel token tripped when the client disconnects or after SOLVE_DEADLINE_SECONDS; the body must have been read."""
+    token = CancelToken(SOLVE_DEADLINE_SECONDS)
+
+    async def watch():
+        # The solver runs in a worker thread while the event loop waits for the next ASGI message.
+        # The body has been read already, so the next one is the disconnect.
+        # (request.is_disconnected() only peeks, which never sees it through the HTTP middlewares.)
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+        token.cancel("disconnected")
+
+    watcher = asyncio.create_task(watch())
+    try:
+        yield token
+    finally:
+        watcher.cancel()
+
+async def request_cancel_token(request: Request):
+    """Cancel token of a direct request (FastAPI has read the body params by the time dependencies run)."""
+    async with cancel_on_disconnect(request) as token:
+        yield token
 
 @app.post("/api/ip", dependencies=[Depends(check_rate_limit)])
-def solve_ip_route(params: IPParams):
-    return ip.solve_ip(params.c, params.A_ub, params.b_ub, params.maximize)
+def solve_ip_route(params: IPParams, progress=Depends(no_progress), cancel=Depends(request_cancel_token)):
+    return ip.solve_ip(params.c, params.A_ub, params.b_ub, params.maximize, render=params.render,
+                       progress=progress, cancel=cancel)
 
 @app.post("/api/colgen", dependencies=[Depends(check_rate_limit)])
-def solve_colgen_route(params: ColGenParams):
+def solve_colgen_route(params: ColGenParams, progress=Depends(no_progress), cancel=Depends(request_cancel_token)):
     # Convert list of lists to list of tuples if needed, or just pass as is
-    return colgen.solve_cutting_stock(params.roll_length, params.demands)
+    return colgen.solve_cutting_stock(params.roll_length, params.demands, progress=progress, cancel=cancel)
+
+def lagrangian_options(params):
+    return dict(
+        max_iter=params.max_iter, time_limit=params.time_limit,
+        target_gap=params.target_gap, step_rule=params.step_rule,
+        local_search=params.local_search, dual_method=params.dual_method,
+        relax=params.relax, resolve_tol=params.resolve_tol,
+        pairs=params.pairs, n_tasks=params.n_tasks, render=params.render
+    )
 
 @app.post("/api/lagrangian", dependencies=[Depends(check_rate_limit)])
-def solve_lagrangian_route(params: LagrangianParams):
-    return lagrangian.solve_lagrangian(params.costs, params.weights, params.capacities)
+def solve_lagrangian_route(params: LagrangianParams, progress=Depends(no_progress), cancel=Depends(request_cancel_token)):
+    return lagrangian.solve_lagrangian(
+        params.costs, params.weights, params.capacities, progress=progress, cancel=cancel,
+        **lagrangian_options(params)
+    )
+
+def sse(event, data):
+    # Same JSON rules as JSONResponse (no NaN/Infinity), compact separators
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), allow_nan=False, separators=(',', ':'))}\n\n"
+
+def event_stream(run):
+    """
+    text/event-stream of run(progress, cancel): a "progress" event per progress callback as it happens,
+    then one "result" event, or an "error" event with the status code and detail the plain route would return.
+    The solve is cancelled when the client goes away (the stream is closed early) or at SOLVE_DEADLINE_SECONDS.
+    """
+    token = CancelToken(SOLVE_DEADLINE_SECONDS)
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def progress(**fields):
+            # Called from the solver thread; events reach the queue in call order
+            loop.call_soon_threadsafe(queue.put_nowait, sse("progress", fields))
+
+        async def solve():
+            try:
+                message = sse("result", await run_in_threadpool(run, progress, token))
+            except Exception as exc:
+                status_code, detail = solve_error(exc)
+                message = sse("error", {"status_code": status_code, "detail": detail})
+            # Scheduled the same way as the progress events, so it always comes last
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        task = asyncio.create_task(solve())
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                yield message
+            await task
+        finally:
+            # Closed before the last event: nobody is listening any more
+            if not task.done():
+                token.cancel("disconnected")
+
+    # Optimization: ask reverse proxies (nginx) not to buffer the stream, so events arrive as they happen
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"X-Accel-Buffering": "no"})
+
+@app.post("/api/ip/stream", dependencies=[Depends(check_rate_limit)])
+async def stream_ip_route(params: IPParams):
+    """B&B as server-sent events: node count, open nodes and incumbent before every node, then the result."""
+    return event_stream(lambda progress, cancel: solve_ip_route(params, progress=progress, cancel=cancel))
+
+@app.post("/api/colgen/stream", dependencies=[Depends(check_rate_limit)])
+async def stream_colgen_route(params: ColGenParams):
+    """Column generation as server-sent events: one per generated column, then the result (without the log)."""
+    return event_stream(lambda progress, cancel: colgen.solve_cutting_stock(
+        params.roll_length, params.demands, progress=progress, keep_logs=False, cancel=cancel))
+
+@app.post("/api/lagrangian/stream", dependencies=[Depends(check_rate_limit)])
+async def stream_lagrangian_route(params: LagrangianParams):
+    """Subgradient iterations as server-sent events: LB and UB per iteration, then the result (without the log)."""
+    return event_stream(lambda progress, cancel: lagrangian.solve_lagrangian(
+        params.costs, params.weights, params.capacities, progress=progress, keep_logs=False, cancel=cancel,
+        **lagrangian_options(params)))
 
 @app.post("/api/stochastic", dependencies=[Depends(check_rate_limit)])
-def solve_stochastic_route(params: StochasticParams):
+def solve_stochastic_route(params: StochasticParams, progress=Depends(no_progress), cancel=Depends(request_cancel_token)):
     # Convert Pydantic models to dicts
     # Optimization: Use Pydantic V2's core model_dump on the parent array instead of a Python list comprehension.
     # This prevents intermediate memory allocation overhead and relies on the faster Rust backend.
     scenarios = params.model_dump()['scenarios']
-    return stochastic.solve_stochastic(params.total_land, scenarios)
+    return stochastic.solve_stochastic(
+        params.total_land, scenarios, method=params.method,
+        max_iter=params.max_iter, tol=params.tol, max_cut_groups=params.max_cut_groups,
+        metrics=params.metrics, reduce_to=params.reduce_to,
+        rho=params.rho, ph_tol=params.ph_tol, workers=1,
+        cvar_weight=params.cvar_weight, cvar_alpha=params.cvar_alpha, frontier_points=params.frontier_points,
+        render=params.render, time_limit=params.time_limit, progress=progress, cancel=cancel
+    )
+
+@app.post(COLUMNAR_PATH, dependencies=[Depends(check_rate_limit)])
+async def solve_stochastic_columnar_route(request: Request):
+    """
+    Stochastic solve with scenarios uploaded as packed little-endian float64 columns, either as
+    JSON with base64 `probabilities` and `yields`, or as a raw application/octet-stream body of
+    [probabilities | wheat | corn | beets] with the options as query parameters.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    body = await request.body()
+    try:
+        if content_type == "application/octet-stream":
+            options = StochasticOptions.model_validate(dict(request.query_params))
+            probs, ylds = stochastic.unpack_columnar(body, max_scenarios=MAX_COLUMNAR_SCENARIOS)
+        elif content_type == "application/json":
+            options = ColumnarStochasticParams.model_validate_json(body)
+            probs, ylds = stochastic.unpack_columnar(
+                base64.b64decode(options.probabilities, validate=True),
+                base64.b64decode(options.yields, validate=True),
+                max_scenarios=MAX_COLUMNAR_SCENARIOS
+            )
+        else:
+            raise HTTPException(status_code=415, detail="Unsupported Media Type")
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+
+    if options.method == "extensive" and probs.size > MAX_EXTENSIVE_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"Use method=lshaped for more than {MAX_EXTENSIVE_SCENARIOS} scenarios")
+
+    # The solve is CPU-bound; keep it off the event loop like the synchronous routes.
+    # The body is read by now, so the disconnect watcher can take over the receive channel.
+    async with cancel_on_disconnect(request) as cancel:
+        return await run_in_threadpool(
+            stochastic.solve_stochastic_arrays, options.total_land, probs, ylds, method=options.method,
+            max_iter=options.max_iter, tol=options.tol, max_cut_groups=options.max_cut_groups,
+            metrics=options.metrics, reduce_to=options.reduce_to,
+            rho=options.rho, ph_tol=options.ph_tol,
+            workers=min(MAX_PH_WORKERS, stochastic.ph_workers(probs.size)),
+            cvar_weight=options.cvar_weight, cvar_alpha=options.cvar_alpha, frontier_points=options.frontier_points,
+            render=options.render, time_limit=options.time_limit, cancel=cancel
+        )
+
+@app.post("/api/twostage", dependencies=[Depends(check_rate_limit)])
+def solve_twostage_route(params: TwoStageParams):
+    # Ragged matrices fail np.asarray with a ValueError, which the handler maps to a 400
+    res = twostage.solve_two_stage(
+        params.c, params.W, params.q, params.T, params.h, params.probabilities,
+        A_ub=params.A_ub, b_ub=params.b_ub, cvar_weight=params.cvar_weight, cvar_alpha=params.cvar_alpha
+    )
+    result = {
+        "success": res["success"],
+        "message": res["message"],
+        "x": res["x"].tolist() if res["success"] else None,
+        "objective": res["objective"],
+        "recourse_costs": res["recourse_costs"].tolist() if res["success"] else None
+    }
+    if params.cvar_weight > 0 and res["success"]:
+        result["expected_cost"] = res["expected_cost"]
+        result["cvar"] = res["cvar"]
+    return result
+
+@app.post("/api/stochastic/evaluate", dependencies=[Depends(check_rate_limit)])
+def evaluate_stochastic_route(params: EvaluateParams):
+    ylds = np.array(params.yields, dtype=float)
+    n_scenarios = ylds.shape[0]
+    if params.probabilities is None:
+        probs = np.full(n_scenarios, 1.0 / n_scenarios)
+    else:
+        probs = np.array(params.probabilities, dtype=float)
+    return stochastic.evaluate_candidates(params.candidates, stochastic.iter_scenario_chunks(ylds, probs))
+
+@app.post("/api/stochastic/saa", dependencies=[Depends(check_rate_limit)])
+def solve_saa_route(params: SAAParams, cancel=Depends(request_cancel_token)):
+    distributions = [(d.kind, d.params) for d in params.distributions]
+    return stochastic.solve_saa(
+        params.total_land, distributions, sample_size=params.sample_size,
+        replications=params.replications, eval_size=params.eval_size, seed=params.seed,
+        confidence=params.confidence, method=params.method,
+        workers=min(params.replications, MAX_SAA_WORKERS), render=params.render,
+        time_limit=params.time_limit, cancel=cancel
+    )
+
+# Background jobs: solver name -> (params model, route function, path whose rate limit cost applies).
+# Routes taking a progress callback or cancel token get the job's.
+JOB_SOLVERS = {
+    "lp": (LPParams, solve_lp_route, "/api/lp"),
+    "ip": (IPParams, solve_ip_route, "/api/ip"),
+    "colgen": (ColGenParams, solve_colgen_route, "/api/colgen"),
+    "lagrangian": (LagrangianParams, solve_lagrangian_route, "/api/lagrangian"),
+    "stochastic": (StochasticParams, solve_stochastic_route, "/api/stochastic"),
+    "twostage": (TwoStageParams, solve_twostage_route, "/api/twostage"),
+    "evaluate": (EvaluateParams, evaluate_stochastic_route, "/api/stochastic/evaluate"),
+    "saa": (SAAParams, solve_saa_route, "/api/stochastic/saa"),
+}
+PROGRESS_SOLVERS = {"ip", "colgen", "lagrangian", "stochastic"}
+CANCELLABLE_SOLVERS = {"ip", "colgen", "lagrangian", "stochastic", "saa"}
+
+class JobParams(BaseModel):
+    solver: Annotated[str, Field(pattern=r"^(lp|ip|colgen|lagrangian|stochastic|twostage|evaluate|saa)$")]
+    params: Dict[str, Any]
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job_route(job: JobParams, request: Request):
+    """Queues any solver payload as a background job; poll GET /api/jobs/{id} for progress and the result."""
+    model, route, path = JOB_SOLVERS[job.solver]
+    # A job costs the same rate limit tokens as a call to its solver's route
+    await consume(request, ENDPOINT_COSTS.get(path, 1))
+    try:
+        params = model.model_validate(job.params)
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+
+    def run(progress, cancel):
+        hooks = {}
+        if job.solver in PROGRESS_SOLVERS:
+            hooks["progress"] = progress
+        if job.solver in CANCELLABLE_SOLVERS:
+            hooks["cancel"] = cancel
+        return route(params, **hooks)
+
+    try:
+        queued = jobs.submit(job.solver, run, solve_error)
+    except jobs.JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many pending jobs. Please try again later.",
+                            headers={"Retry-After": "5"})
+    return queued.to_dict()
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_route(job_id: Annotated[str, Path(pattern=r"^[A-Za-z0-9_\-]{22}$")]):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job_route(job_id: Annotated[str, Path(pattern=r"^[A-Za-z0-9_\-]{22}$")]):
+    """
+    Cancels a queued or running job; B&B, column generation, Lagrangian, L-shaped, progressive hedging
+    and SAA jobs stop at their next iteration.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job.token.cancel()
+    return job.to_dict()
 
 if __name__ == "__main__":
     import uvicorn
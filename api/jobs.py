@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import secrets
+import time
+from api.cancellation import CancelToken, Cancelled
+
+# Background solve jobs: long solves run on their own bounded pool instead of Starlette's request
+# threads, and clients poll for progress and the result instead of holding the connection open.
+JOB_WORKERS = 2
+MAX_PENDING_JOBS = 16 # queued + running; more is rejected rather than queued without bound
+MAX_STORED_JOBS = 1000 # Memory Leak Protection: finished jobs beyond this are evicted oldest first
+JOB_TTL = 600 # seconds a finished job's result is kept
+JOB_DEADLINE = 300 # seconds after submission a job is cancelled (if its solver supports cancellation)
+
+jobs = OrderedDict()
+_lock = threading.Lock()
+_pool = None
+
+class JobQueueFull(Exception):
+    pass
+
+class Job:
+    __slots__ = ['id', 'solver', 'status', 'progress', 'result', 'error', 'created', 'finished', 'token']
+
+    def __init__(self, solver):
+        # Security: IDs are random, so jobs cannot be enumerated by other clients
+        self.id = secrets.token_urlsafe(16)
+        self.solver = solver
+        self.status = "queued" # queued, running, done, failed, cancelled
+        self.progress = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.token = CancelToken(JOB_DEADLINE)
+
+    def report(self, **progress):
+        """Progress callback for the solvers: replaces the job's progress with the latest values."""
+        self.progress = progress
+
+    def expired(self, now):
+        return self.finished is not None and now - self.finished >= JOB_TTL
+
+    def to_dict(self):
+        out = {"id": self.id, "solver": self.solver, "status": self.status, "progress": self.progress}
+        if self.status == "done":
+            out["result"] = self.result
+        elif self.status in ("failed", "cancelled"):
+            out["error"] = self.error
+        return out
+
+def _purge(now):
+    # Caller holds _lock. The store is small and bounded, so a full scan is cheap.
+    for job_id in [job_id for job_id, job in jobs.items() if job.expired(now)]:
+        del jobs[job_id]
+
+def submit(solver, fn, on_error):
+    """
+    Queues fn(progress_callback, cancel_token) on the job pool and returns the Job.
+    on_error(exc) maps a failure to the (status_code, detail) reported to the client.
+    Raises JobQueueFull when MAX_PENDING_JOBS jobs are already queued or running.
+    """
+    global _pool
+    job = Job(solver)
+    with _lock:
+        now = time.time()
+        _purge(now)
+        if sum(1 for j in jobs.values() if j.finished is None) >= MAX_PENDING_JOBS:
+            raise JobQueueFull()
+        while len(jobs) >= MAX_STORED_JOBS:
+            # Pending jobs are bounded well below the store size, so a finished one is always found
+            oldest = next(job_id for job_id, j in jobs.items() if j.finished is not None)
+            del jobs[oldest]
+        jobs[job.id] = job
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+    _pool.submit(_run, job, fn, on_error)
+    return job
+
+def _run(job, fn, on_error):
+    try:
+        # Cancelled while queued: never start
+        job.token.check()
+        job.status = "running"
+        job.result = fn(job.report, job.token)
+        job.status = "done"
+    except Exception as exc:
+        status_code, detail = on_error(exc)
+        job.error = {"status_code": status_code, "detail": detail}
+        # Cancelled by the client (not by the deadline) is not a failure
+        job.status = "cancelled" if isinstance(exc, Cancelled) and job.token.reason == "cancelled" else "failed"
+    job.finished = time.time()
+
+def get(job_id):
+    """The job with this ID, or None if unknown or expired."""
+    with _lock:
+        job = jobs.get(job_id)
+        if job is not None and job.expired(time.time()):
+            del jobs[job_id]
+            job = None
+    return job
@@ -0,0 +1,40 @@
+import importlib
+import threading
+
+# Lazy-import registry: heavy modules (SciPy solvers, matplotlib, networkx) are imported on first
+# attribute access instead of at API startup, so a cold start only pays for the routes it serves.
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access."""
+    __slots__ = ("_name", "_module")
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            # The import system's per-module locks make concurrent first accesses safe
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+def lazy(name):
+    """The shared LazyModule for a dotted module name."""
+    with _registry_lock:
+        module = _registry.get(name)
+        if module is None:
+            module = _registry[name] = LazyModule(name)
+        return module
+
+def loaded():
+    """Names of the registered modules that have been imported so far."""
+    with _registry_lock:
+        return sorted(name for name, module in _registry.items() if module._module is not None)
@@ -1,20 +1,232 @@
 from fastapi import Request, HTTPException
+from starlette.concurrency import run_in_threadpool
 from collections import OrderedDict
+from urllib.parse import urlsplit, unquote
+import hashlib
+import logging
+import math
+import os
+import socket
+import sqlite3
+import threading
 import time
 
-# Simple in-memory rate limiter using Fixed Window Counter
-# Stores timestamps of requests per IP
-# This provides protection against DoS attacks on computationally expensive endpoints
-rate_limit_store = OrderedDict()
+# Rate limiter using GCRA (Generic Cell Rate Algorithm), the token bucket expressed as a single
+# "theoretical arrival time" (TAT) float per client: each request pushes the TAT forward by its cost
+# in emission intervals, and is rejected if that would put the TAT more than a full window ahead.
+# This provides protection against DoS attacks on computationally expensive endpoints.
+rate_limit_store = OrderedDict() # client -> TAT, for the in-process backend
 RATE_LIMIT_DURATION = 60 # seconds
-RATE_LIMIT_REQUESTS = 20 # requests per duration per IP
+RATE_LIMIT_REQUESTS = 20 # tokens per duration per IP (burst size; refilled evenly over the duration)
 MAX_STORE_SIZE = 1000 # Max number of IPs to track to prevent memory leaks
 
-async def check_rate_limit(request: Request):
+# Tokens charged per request. Endpoints not listed cost 1; the solve-heavy ones cost more,
+# so a client can make 20 LP requests a minute but only 5 B&B solves.
+ENDPOINT_COSTS = {
+    "/api/ip": 4,
+    "/api/ip/stream": 4,
+    "/api/lagrangian": 3,
+    "/api/lagrangian/stream": 3,
+    "/api/colgen": 2,
+    "/api/colgen/stream": 2,
+    "/api/stochastic": 2,
+    "/api/stochastic/columnar": 3,
+    "/api/stochastic/saa": 4,
+    "/api/twostage": 2,
+}
+
+logger = logging.getLogger(__name__)
+
+def gcra(tat, now, cost):
     """
-    Dependency to enforce rate limiting on sensitive endpoints.
-    Limits requests to RATE_LIMIT_REQUESTS per RATE_LIMIT_DURATION per IP.
+    One GCRA step. tat is the client's stored TAT (None if unknown).
+    Returns (new_tat, 0.0) if the request is allowed, or (None, retry_after) if not.
+    """
+    interval = RATE_LIMIT_DURATION / RATE_LIMIT_REQUESTS
+    new_tat = max(tat if tat is not None else now, now) + cost * interval
+    if new_tat - now > RATE_LIMIT_DURATION:
+        return None, new_tat - now - RATE_LIMIT_DURATION
+    return new_tat, 0.0
+
+class MemoryBackend:
+    """Per-process store; with several workers each one enforces its own limit."""
+    blocking = False
+
+    def __init__(self, store=rate_limit_store):
+        self.store = store
+
+    def acquire(self, key, now, cost):
+        store = self.store
+        # LRU Logic: Move to end if exists (recently used)
+        if key in store:
+            store.move_to_end(key)
+        # Memory Leak Protection: Enforce strict limit via LRU eviction
+        elif len(store) >= MAX_STORE_SIZE:
+            store.popitem(last=False)
+        new_tat, retry_after = gcra(store.get(key), now, cost)
+        if new_tat is not None:
+            store[key] = new_tat
+        return retry_after
+
+class SQLiteBackend:
+    """
+    Store in a local SQLite file, shared by every worker process on the host.
+    Each step runs in a write transaction, so concurrent workers cannot both spend the same tokens.
+    """
+    blocking = True
+    PRUNE_EVERY = 256 # acquisitions between sweeps of expired rows
+
+    def __init__(self, path, max_keys=100 * MAX_STORE_SIZE):
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._calls = 0
+        self._conn() # Create the table up front, so a bad path fails at startup
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limit (key TEXT PRIMARY KEY, tat REAL NOT NULL) WITHOUT ROWID")
+            conn.execute("CREATE INDEX IF NOT EXISTS rate_limit_tat ON rate_limit (tat)")
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, key, now, cost):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_limit WHERE key = ?", (key,)).fetchone()
+            new_tat, retry_after = gcra(row[0] if row else None, now, cost)
+            if new_tat is not None:
+                conn.execute("INSERT OR REPLACE INTO rate_limit (key, tat) VALUES (?, ?)", (key, new_tat))
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                self._prune(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    def _prune(self, conn, now):
+        # A TAT in the past means a full bucket, the same as no row, so expired rows are dropped losslessly
+        conn.execute("DELETE FROM rate_limit WHERE tat <= ?", (now,))
+        # Memory Leak Protection: under a flood of distinct clients, drop those closest to a full bucket
+        conn.execute("DELETE FROM rate_limit WHERE key IN (SELECT key FROM rate_limit ORDER BY tat "
+                     "LIMIT max(0, (SELECT count(*) FROM rate_limit) - ?))", (self.max_keys,))
+
+class RedisError(Exception):
+    pass
+
+class RedisBackend:
+    """
+    Store on a Redis-compatible server (Redis, Valkey, KeyDB, ...), shared by workers on any host.
+    The GCRA step runs as a Lua script, so it is atomic on the server, and keys expire once their
+    bucket is full again. Speaks RESP directly, so no client library is needed.
     """
+    blocking = True
+    SCRIPT = """
+local now = tonumber(ARGV[1])
+local tat = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+if tat < now then tat = now end
+local new_tat = tat + tonumber(ARGV[2])
+local ahead = new_tat - now
+if ahead > tonumber(ARGV[3]) then return tostring(ahead - tonumber(ARGV[3])) end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(ahead * 1000))
+return '0'
+"""
+    SCRIPT_SHA = hashlib.sha1(SCRIPT.encode()).hexdigest()
+
+    def __init__(self, url, prefix="optimax:ratelimit:", timeout=1.0):
+        parts = urlsplit(url)
+        self.address = (parts.hostname or "localhost", parts.port or 6379)
+        # AUTH [username] password; a username is only understood by servers with ACLs (Redis 6+)
+        self.auth = [unquote(part) for part in (parts.username, parts.password) if part] if parts.password else []
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        stream = sock.makefile("rwb")
+        sock.close() # The file object keeps its own reference to the socket
+        if self.auth:
+            self._call(stream, "AUTH", *self.auth)
+        if self.db:
+            self._call(stream, "SELECT", self.db)
+        return stream
+
+    def _call(self, stream, *args):
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            arg = arg if isinstance(arg, bytes) else str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        stream.write(b"".join(out))
+        stream.flush()
+        return self._reply(stream)
+
+    def _reply(self, stream):
+        line = stream.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            return None if size < 0 else stream.read(size + 2)[:-2].decode()
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._reply(stream) for _ in range(size)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def command(self, *args):
+        stream = getattr(self._local, "stream", None)
+        if stream is None:
+            stream = self._local.stream = self._connect()
+        try:
+            return self._call(stream, *args)
+        except (OSError, ValueError):
+            # Drop the connection; the next request reconnects
+            self._local.stream = None
+            stream.close()
+            raise
+
+    def acquire(self, key, now, cost):
+        args = (1, self.prefix + key, repr(now), repr(cost * RATE_LIMIT_DURATION / RATE_LIMIT_REQUESTS),
+                RATE_LIMIT_DURATION)
+        try:
+            # Optimization: send the script's hash, and the script itself only when the server lacks it
+            reply = self.command("EVALSHA", self.SCRIPT_SHA, *args)
+        except RedisError as exc:
+            if not str(exc).startswith("NOSCRIPT"):
+                raise
+            reply = self.command("EVAL", self.SCRIPT, *args)
+        return float(reply)
+
+def make_backend(url):
+    """Backend for a RATE_LIMIT_BACKEND setting: "memory", "sqlite:///path/to/file.db" or "redis://host:port/db"."""
+    if url == "memory":
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith("redis://"):
+        return RedisBackend(url)
+    raise ValueError(f"Unknown rate limit backend: {url}")
+
+# Several workers (uvicorn --workers N) should share one store, otherwise each enforces its own limit
+backend = make_backend(os.environ.get("RATE_LIMIT_BACKEND", "memory"))
+_fallback = MemoryBackend()
+
+def client_key(request: Request):
     client_ip = request.client.host
     # Handle X-Forwarded-For (Vercel/proxies)
     # SECURITY: Use the LAST IP in the list. The first IP can be spoofed by the client
@@ -27,34 +239,33 @@ async def check_rate_limit(request: Request):
         x_forwarded_for_headers = request.headers.getlist("x-forwarded-for")
         all_ips = ",".join(x_forwarded_for_headers)
         client_ip = all_ips.split(",")[-1].strip()
+    return client_ip
 
+async def consume(request: Request, cost=1):
+    """Charges cost tokens to the request's client; raises a 429 HTTPException if it has too few left."""
+    key = client_key(request)
     now = time.time()
+    try:
+        if backend.blocking:
+            retry_after = await run_in_threadpool(backend.acquire, key, now, cost)
+        else:
+            retry_after = backend.acquire(key, now, cost)
+    except (OSError, ValueError, sqlite3.Error, RedisError) as exc:
+        # A shared store that is down must not take the API with it: limit per worker until it is back
+        logger.warning(f"Rate limit backend unavailable, using in-process store: {exc}")
+        retry_after = _fallback.acquire(key, now, cost)
 
-    # LRU Logic: Move to end if exists (recently used)
-    if client_ip in rate_limit_store:
-        rate_limit_store.move_to_end(client_ip)
-
-    # Memory Leak Protection: Enforce strict limit via LRU eviction
-    # If new key and full, pop oldest (first)
-    if client_ip not in rate_limit_store and len(rate_limit_store) >= MAX_STORE_SIZE:
-        rate_limit_store.popitem(last=False)
-
-    # Get timestamps, defaulting to empty list if new
-    timestamps = rate_limit_store.get(client_ip, [])
-
-    # Filter out old requests outside the window for the current IP
-    # We only clean up the CURRENT IP's history, not the whole store (O(1) vs O(N))
-    valid_timestamps = [t for t in timestamps if now - t < RATE_LIMIT_DURATION]
-
-    # Check limit
-    if len(valid_timestamps) >= RATE_LIMIT_REQUESTS:
-        # Update store with filtered timestamps even if blocked, to prevent state loss
-        rate_limit_store[client_ip] = valid_timestamps
+    if retry_after > 0:
         raise HTTPException(
             status_code=429,
-            detail="Rate limit exceeded. Please try again later."
+            detail="Rate limit exceeded. Please try again later.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
         )
 
-    # Record new request
-    valid_timestamps.append(now)
-    rate_limit_store[client_ip] = valid_timestamps
+async def check_rate_limit(request: Request):
+    """
+    Dependency to enforce rate limiting on sensitive endpoints.
+    Allows RATE_LIMIT_REQUESTS tokens per RATE_LIMIT_DURATION per IP; each request costs its
+    endpoint's ENDPOINT_COSTS entry (1 if not listed).
+    """
+    await consume(request, ENDPOINT_COSTS.get(request.url.path, 1))
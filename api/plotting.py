@@ -0,0 +1,228 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import threading
+import secrets
+import io
+import base64
+from api.lazy import lazy
+from api import processes
+
+# Optimization: matplotlib and networkx load on the first draw (in the render workers), not at API startup
+figure = lazy("matplotlib.figure")
+backend_agg = lazy("matplotlib.backends.backend_agg")
+patches = lazy("matplotlib.patches")
+nx = lazy("networkx")
+
+# Plot output modes: "png" embeds a base64 PNG, "data" returns the plot spec itself,
+# "async" renders the PNG in the background and returns an ID to fetch it by
+RENDER_MODES = ("png", "data", "async")
+
+# Rendering runs in a pool of worker processes, separate from the solver threads: at most RENDER_WORKERS
+# figures are drawn at once however many solves are running, and drawing never holds the API's GIL.
+# Workers import matplotlib and warm the font cache and Agg canvas once; only specs cross the process boundary.
+RENDER_WORKERS = 2
+# Rendered PNGs (or pending futures) by plot ID for render="async".
+# Memory Leak Protection: the store is bounded and evicts the least recently used plot.
+MAX_STORED_PLOTS = 256
+plot_store = OrderedDict()
+_store_lock = threading.Lock()
+_pool_lock = threading.Lock()
+_render_pool = None
+
+# Plot specs are JSON-ready dicts of numeric series with a "kind" key. Solvers build them without
+# touching matplotlib; the React frontend can draw them directly (render="data"), or they are drawn here.
+
+def output(spec, render="png", key="plot"):
+    """
+    Response fields for a plot spec: {key: base64 PNG} for render="png",
+    {key: None, "plot_data": spec} for render="data", {key: None, key + "_id": plot ID} for render="async".
+    A None spec (plot skipped) gives None for all of them.
+    """
+    if render not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode '{render}'")
+    if render == "data":
+        return {key: None, "plot_data": spec}
+    if render == "async":
+        return {key: None, f"{key}_id": None if spec is None else submit(spec)}
+    return {key: None if spec is None else base64.b64encode(render_in_pool(spec).result()).decode('utf-8')}
+
+def _render_init():
+    # Pre-warm the worker: the first figure pays for the font lookup and Agg setup
+    render_png({"kind": "convergence", "lb": [0.0, 1.0]})
+
+def _pool():
+    global _render_pool
+    with _pool_lock:
+        if _render_pool is None:
+            try:
+                _render_pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, initializer=_render_init,
+                                                   mp_context=processes.context())
+            except (OSError, NotImplementedError):
+                # No process support (e.g. no /dev/shm on some serverless runtimes): render on threads instead
+                _render_pool = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+        return _render_pool
+
+def render_in_pool(spec):
+    """Queues a plot spec on the render workers; returns a future of the PNG bytes."""
+    global _render_pool
+    pool = _pool()
+    try:
+        return pool.submit(render_png, spec)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory): start a fresh pool once
+        with _pool_lock:
+            if _render_pool is pool:
+                _render_pool = None
+        return _pool().submit(render_png, spec)
+
+def submit(spec):
+    """Queues a plot spec for rendering in the background and returns its plot ID."""
+    # Security: IDs are random, so plots cannot be enumerated by other clients
+    plot_id = secrets.token_urlsafe(16)
+    future = render_in_pool(spec)
+    with _store_lock:
+        plot_store[plot_id] = future
+        while len(plot_store) > MAX_STORED_PLOTS:
+            plot_store.popitem(last=False)
+    return plot_id
+
+def get_plot(plot_id):
+    """The future of a submitted plot's PNG bytes, or None if unknown or evicted."""
+    with _store_lock:
+        future = plot_store.get(plot_id)
+        if future is not None:
+            plot_store.move_to_end(plot_id)
+    return future
+
+def render_png(spec):
+    """Draws a plot spec and returns the PNG bytes."""
+    fig = RENDERERS[spec["kind"]](spec)
+    buf = io.BytesIO()
+    canvas = backend_agg.FigureCanvasAgg(fig)
+    canvas.print_png(buf)
+    # No need to explicitly close fig as it is garbage collected
+    return buf.getvalue()
+
+def render_b64(spec):
+    return base64.b64encode(render_png(spec)).decode('utf-8')
+
+def draw_lp(spec):
+    # Use Matplotlib Object-Oriented Interface for thread safety and performance
+    fig = figure.Figure(figsize=(6, 6))
+    ax = fig.add_subplot(111)
+    limit = spec["limit"]
+
+    for line in spec["constraints"]:
+        if "vertical" in line:
+            ax.axvline(line["vertical"], label=line["label"], color='gray', linestyle='--')
+        else:
+            ax.plot(line["x"], line["y"], label=line["label"])
+
+    # Shade feasible region: its exact vertices as a single patch
+    if spec["feasible"]:
+        ax.add_patch(patches.Polygon(spec["feasible"], closed=True, color='green', alpha=0.1))
+
+    objective = spec["objective"]
+    if objective["x"] is not None:
+        ax.plot(objective["x"], objective["y"], 'r--', linewidth=2, label=f'Obj: {objective["value"]:.2f}')
+
+    optimum = spec["optimum"]
+    ax.plot(optimum[0], optimum[1], 'ro', markersize=8, label='Optimal')
+
+    ax.set_xlim(0, limit)
+    ax.set_ylim(0, limit)
+    ax.set_xlabel('x1')
+    ax.set_ylabel('x2')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    ax.set_title('LP Visualization')
+    return fig
+
+# Node fill colors and label suffixes by branch-and-bound status
+TREE_STYLES = {
+    "integer": ("#90EE90", "\n(INT)"),     # Light green
+    "infeasible": ("#F08080", "\n(INF)"),  # Light coral
+    "branched": ("#ADD8E6", ""),           # Light blue
+    "pruned": ("#D3D3D3", "\n(Pruned)"),   # Light gray
+}
+
+def draw_tree(spec):
+    G = nx.DiGraph()
+    node_map = {n["id"]: n for n in spec["nodes"]}
+
+    for node in spec["nodes"]:
+        G.add_node(node["id"], subset=node["level"])
+        if node["parent"] is not None:
+            G.add_edge(node["parent"], node["id"])
+
+    pos = nx.multipartite_layout(G, subset_key="subset", align="horizontal")
+
+    colors = []
+    labels = {}
+    for n_id in G.nodes():
+        node = node_map[n_id]
+        label = f"{node['id']}\n{node['decision']}"
+        if node["value"] is not None: # Only show value if not -inf
+            label += f"\nVal:{node['value']:.1f}"
+        color, suffix = TREE_STYLES.get(node["status"], ("white", ""))
+        colors.append(color)
+        labels[n_id] = label + suffix
+
+    # Use Matplotlib Object-Oriented Interface for better performance and thread safety
+    fig = figure.Figure(figsize=(10, 6))
+    ax = fig.add_subplot(111)
+
+    nx.draw(G, pos, ax=ax, with_labels=True, labels=labels, node_color=colors, node_size=2000, font_size=8, node_shape="o", arrows=True)
+    ax.set_title("Branch and Bound Tree")
+    return fig
+
+def draw_convergence(spec):
+    # Use Matplotlib Object-Oriented Interface for thread safety and performance
+    fig = figure.Figure(figsize=(6, 4))
+    ax = fig.add_subplot(111)
+
+    ax.plot(spec["lb"], marker='o')
+    ax.set_title("Lagrangian Lower Bound Convergence")
+    ax.set_xlabel("Iteration")
+    ax.set_ylabel("Lower Bound")
+    ax.grid(True)
+    return fig
+
+def draw_stochastic(spec):
+    # Use Matplotlib Object-Oriented Interface for thread safety and performance
+    fig = figure.Figure(figsize=(10, 5))
+    ax1 = fig.add_subplot(121)
+    ax2 = fig.add_subplot(122)
+
+    # Plot 1: Acres Allocation
+    crops = ['Wheat', 'Corn', 'Beets']
+    ax1.bar(crops, spec["acres"], color=['gold', 'orange', 'purple'])
+    ax1.set_title('Acres Planted')
+    ax1.set_ylabel('Acres')
+
+    # Plot 2: Profit Distribution (Scenario Profits)
+    profit = spec["expected_profit"]
+    if "histogram" in spec:
+        # Redraw the binned profits: each bin's left edge weighted by its count
+        edges = spec["histogram"]["edges"]
+        ax2.hist(edges[:-1], bins=edges, weights=spec["histogram"]["counts"], color='skyblue', edgecolor='black', alpha=0.7)
+        ax2.set_xlabel('Profit')
+        ax2.set_ylabel('Frequency')
+        ax2.axvline(profit, color='red', linestyle='--', label=f'Exp: {profit:.0f}')
+    else:
+        ax2.bar(spec["scenario_names"], spec["scenario_profits"], color='skyblue')
+        ax2.axhline(profit, color='red', linestyle='--', label=f'Exp: {profit:.0f}')
+
+    ax2.set_title('Profit per Scenario')
+    ax2.legend()
+
+    fig.tight_layout()
+    return fig
+
+RENDERERS = {
+    "lp": draw_lp,
+    "tree": draw_tree,
+    "convergence": draw_convergence,
+    "stochastic": draw_stochastic,
+}
@@ -0,0 +1,21 @@
+import multiprocessing
+
+# Worker processes (plot rendering, progressive hedging, SAA replications) are started from request
+# threads of a multithreaded server, where fork can copy a lock held by another thread into the child
+# and deadlock it. They are started from a single-threaded fork server instead (spawn where there is none).
+# The fork server imports these once, so every worker forked from it starts with them loaded.
+PRELOAD = ["numpy", "scipy.optimize", "api.solvers.stochastic", "api.plotting"]
+
+_context = None
+
+def context():
+    """multiprocessing context for the API's worker pools: forkserver, or spawn where it is not available."""
+    global _context
+    if _context is None:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context("forkserver")
+            ctx.set_forkserver_preload(PRELOAD)
+        else:
+            ctx = multiprocessing.get_context("spawn")
+        _context = ctx
+    return _context
@@ -1,10 +1,14 @@
 import numpy as np
 from scipy.optimize import linprog, milp, Bounds, LinearConstraint
 
-def solve_cutting_stock(roll_length, demands):
+def solve_cutting_stock(roll_length, demands, progress=None, keep_logs=True, cancel=None):
     """
     Solves Cutting Stock problem using Column Generation.
     demands: list of (width, quantity)
+    progress: optional callback, called for each generated column with the iteration, number of columns,
+    master objective, the new pattern, its pricing value and the log message
+    keep_logs: collect the per-column log messages in the result (streaming clients get them from progress instead)
+    cancel: optional CancelToken, checked before each master LP (raises Cancelled once tripped)
     """
     widths = [d[0] for d in demands]
     quantities = [d[1] for d in demands]
@@ -73,6 +77,8 @@ def solve_cutting_stock(roll_length, demands):
     current_cols = n_items
 
     while iter_count < max_iter:
+        if cancel is not None:
+            cancel.check()
         # Solve Master LP
         # Min sum(x) s.t. A x >= quantities
         # Scipy: Min c x s.t. -A x <= -quantities
@@ -137,7 +143,12 @@ def solve_cutting_stock(roll_length, demands):
         c[current_cols] = 1
         current_cols += 1
 
-        logs.append(f"Iter {iter_count}: Added pattern {list(new_pattern_tuple)} (Value: {new_pattern_val:.4f})")
+        message = f"Iter {iter_count}: Added pattern {list(new_pattern_tuple)} (Value: {new_pattern_val:.4f})"
+        if keep_logs:
+            logs.append(message)
+        if progress is not None:
+            progress(iteration=iter_count, columns=current_cols, objective=float(res.fun),
+                     pattern=list(new_pattern_tuple), value=float(new_pattern_val), message=message)
         iter_count += 1
 
     return {
@@ -3,11 +3,7 @@ import math
 import heapq
 from collections import deque
 from scipy.optimize import linprog
-import networkx as nx
-import io
-import base64
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_agg import FigureCanvasAgg
+from api import plotting
 
 MAX_PLOT_NODES = 50
 
@@ -37,10 +33,13 @@ class MockRes:
         self.x = x
         self.fun = fun
 
-def solve_ip(c, A_ub, b_ub, maximize=True, max_nodes=1000, skip_plot=False):
+def solve_ip(c, A_ub, b_ub, maximize=True, max_nodes=1000, skip_plot=False, render="png", progress=None, cancel=None):
     """
     Solves Integer Programming problem using Branch and Bound.
     Maximize c^T x s.t. A_ub x <= b_ub, x >= 0, integer.
+    progress: optional callback, called before each node with the nodes processed so far,
+    the open nodes and the incumbent value (None until one is found).
+    cancel: optional CancelToken, checked before each node (raises Cancelled once tripped).
 
     Optimization:
     - Uses Best-First Search (via heapq) to explore the most promising nodes first, reducing the total nodes evaluated.
@@ -72,7 +71,7 @@ def solve_ip(c, A_ub, b_ub, maximize=True, max_nodes=1000, skip_plot=False):
             "status": "Infeasible",
             "x": None,
             "fun": -np.inf if maximize else np.inf,
-            "tree_plot": None
+            **plotting.output(None, render, key="tree_plot")
         }
 
     root_val = -root_res.fun if maximize else root_res.fun
@@ -88,7 +87,8 @@ def solve_ip(c, A_ub, b_ub, maximize=True, max_nodes=1000, skip_plot=False):
             "status": "Optimal",
             "x": root_res.x.tolist(),
             "fun": root_val,
-            "tree_plot": None # Plot skipped for immediate optimality
+            # Plot skipped for immediate optimality
+            **plotting.output(None, render, key="tree_plot")
         }
 
     # Heuristic: Simple rounding
@@ -161,6 +161,11 @@ def solve_ip(c, A_ub, b_ub, maximize=True, max_nodes=1000, skip_plot=False):
     limit_reached = False
 
     while queue:
+        if cancel is not None:
+            cancel.check()
+        if progress is not None:
+            progress(nodes=processed_nodes, open_nodes=len(queue),
+                     incumbent=float(best_value) if best_solution is not None else None)
         if processed_nodes >= max_nodes:
             limit_reached = True
             break
@@ -287,7 +292,7 @@ def solve_ip(c, A_ub, b_ub, maximize=True, max_nodes=1000, skip_plot=False):
                 heapq.heappush(queue, (right_priority, right_node.id, right_node))
 
     # Generate Tree Plot
-    img_b64 = None if skip_plot else plot_tree(nodes)
+    plot = plotting.output(None if skip_plot else tree_plot_spec(nodes), render, key="tree_plot")
 
     status = "Optimal"
     if limit_reached:
@@ -300,61 +305,29 @@ def solve_ip(c, A_ub, b_ub, maximize=True, max_nodes=1000, skip_plot=False):
         "status": status,
         "x": best_solution.tolist() if best_solution is not None else None,
         "fun": best_value,
-        "tree_plot": img_b64
+        **plot
     }
 
 def plot_tree(nodes):
+    spec = tree_plot_spec(nodes)
+    return None if spec is None else plotting.render_b64(spec)
+
+def tree_plot_spec(nodes):
+    """Plot-ready branch-and-bound tree: one entry per node with its parent, depth, branching decision, value and status."""
     # Performance Optimization: Skip plotting for large trees (>MAX_PLOT_NODES)
     # as it dominates execution time (e.g. ~75% of time for N=25).
     if len(nodes) > MAX_PLOT_NODES:
         return None
 
-    G = nx.DiGraph()
-    node_map = {n.id: n for n in nodes}
-
-    for node in nodes:
-        G.add_node(node.id, subset=node.level)
-        if node.parent_id is not None:
-            G.add_edge(node.parent_id, node.id)
-
-    pos = nx.multipartite_layout(G, subset_key="subset", align="horizontal")
-
-    colors = []
-    labels = {}
-    for n_id in G.nodes():
-        node = node_map[n_id]
-        label = f"{node.id}\n{node.decision}"
-        if node.value > -1e10: # Only show value if not -inf
-             label += f"\nVal:{node.value:.1f}"
-
-        if node.status == "integer":
-            colors.append("#90EE90") # Light green
-            label += "\n(INT)"
-        elif node.status == "infeasible":
-            colors.append("#F08080") # Light coral
-            label += "\n(INF)"
-        elif node.status == "branched":
-            colors.append("#ADD8E6") # Light blue
-        elif node.status == "pruned":
-            colors.append("#D3D3D3") # Light gray
-            label += "\n(Pruned)"
-        else:
-            colors.append("white")
-
-        labels[n_id] = label
-
-    # Use Matplotlib Object-Oriented Interface for better performance and thread safety
-    fig = Figure(figsize=(10, 6))
-    ax = fig.add_subplot(111)
-
-    nx.draw(G, pos, ax=ax, with_labels=True, labels=labels, node_color=colors, node_size=2000, font_size=8, node_shape="o", arrows=True)
-    ax.set_title("Branch and Bound Tree")
-
-    buf = io.BytesIO()
-    canvas = FigureCanvasAgg(fig)
-    canvas.print_png(buf)
-
-    buf.seek(0)
-    img_str = base64.b64encode(buf.read()).decode('utf-8')
-    # No need to explicitly close fig as it is garbage collected
-    return img_str
+    return {
+        "kind": "tree",
+        "nodes": [{
+            "id": node.id,
+            "parent": node.parent_id,
+            "level": node.level,
+            "decision": node.decision,
+            # Only report the value if not -inf
+            "value": float(node.value) if node.value > -1e10 else None,
+            "status": node.status
+        } for node in nodes]
+    }
@@ -1,154 +1,655 @@
 import numpy as np
 from scipy.optimize import milp, LinearConstraint, Bounds
-import scipy.sparse as sp
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_agg import FigureCanvasAgg
-import io
-import base64
+import time
+from api import plotting
 
-def solve_lagrangian(costs, weights, capacities):
+STEP_RULES = ("polyak", "diminishing")
+DUAL_METHODS = ("subgradient", "volume")
+RELAXATIONS = ("assignment", "capacity")
+# Largest items x capacity table the knapsack dynamic program may build; bigger knapsacks go to milp
+MAX_KNAPSACK_CELLS = 1_000_000
+
+def solve_knapsack(profits, weights, capacity):
     """
-    Solves Generalized Assignment Problem using Lagrangian Relaxation.
-    Relaxing the assignment constraints: sum_j x_ij = 1.
-    costs: n_tasks x n_agents (list of lists)
-    weights: n_tasks x n_agents (list of lists)
-    capacities: n_agents (list)
+    0/1 knapsack max profits.x s.t. weights.x <= capacity, by dynamic programming over the capacity.
+    Exact, but only for non-negative integer weights: returns the 0/1 selection, or None when the
+    weights are not integers or the table would exceed MAX_KNAPSACK_CELLS.
     """
-    # Optimization: Initialize costs and weights as Fortran-contiguous arrays so that
-    # subsequent `.ravel('F')` calls return a zero-copy memory view rather than
-    # triggering expensive deep copies, especially inside tight iteration loops.
-    costs = np.array(costs, order='F')
-    weights = np.array(weights, order='F')
-    capacities = np.array(capacities)
+    cap = int(np.floor(capacity + 1e-9))
+    if cap < 0 or np.any(weights < 0) or np.any(weights != np.round(weights)) \
+            or (cap + 1) * weights.size > MAX_KNAPSACK_CELLS:
+        return None
+    w = weights.astype(np.int64)
+    # best[c]: the best profit within capacity c using the items so far; take[k, c]: item k is in it
+    best = np.zeros(cap + 1)
+    take = np.zeros((w.size, cap + 1), dtype=bool)
+    for k in range(w.size):
+        if w[k] > cap:
+            continue
+        # Optimization: One vectorized pass over the capacities per item (the slice sum copies, so
+        # every capacity still sees the table before item k)
+        with_k = best[:cap + 1 - w[k]] + profits[k]
+        better = with_k > best[w[k]:]
+        take[k, w[k]:] = better
+        best[w[k]:][better] = with_k[better]
+    x = np.zeros(w.size)
+    c = cap
+    for k in range(w.size - 1, -1, -1):
+        if take[k, c]:
+            x[k] = 1.0
+            c -= w[k]
+    return x
 
-    # Security: Validate dimensions to prevent IndexError (DoS)
-    if costs.ndim != 2:
-        raise ValueError("Costs must be a 2D matrix")
+class AssignmentOracle:
+    """
+    Lagrangian subproblem for the relaxed assignment constraints sum_j x_ij = 1:
+    L(lambda) = sum_i lambda_i + min { sum_ij (c_ij - lambda_i) x_ij : sum_i w_ij x_ij <= C_j, x binary }.
+    The agents decouple into independent knapsacks, each solved as its own small milp.
 
-    n_tasks, n_agents = costs.shape
+    costs/weights are (n_tasks, n_slots) slot matrices; slot_agent maps each slot to its agent
+    (-1 for padding). With slot_agent=None the matrices are dense and slot k is agent k.
+    Only eligible slots become milp variables.
 
-    if weights.shape != (n_tasks, n_agents):
-        raise ValueError(f"Weights must be a {n_tasks}x{n_agents} matrix")
-    if capacities.shape != (n_agents,):
-        raise ValueError(f"Capacities must be a 1D array of length {n_agents}")
+    Each agent's last solution and the reduced costs it was solved for are cached. If the
+    reduced costs moved so little that the cached solution is provably within `resolve_tol`
+    of optimal, that agent is skipped and its slack is subtracted to keep L(lambda) a valid bound.
+    """
+    __slots__ = ['n_tasks', 'n_slots', 'n_agents', 'var_task', 'var_agent', 'var_slot', 'var_cost',
+                 'var_weight', 'agent_start', 'capacities', 'bounds', 'resolve_tol',
+                 'cached_x', 'cached_costs', 'skipped']
 
-    # Initialize multipliers (lambda)
-    lambdas = np.zeros(n_tasks)
+    def __init__(self, costs, weights, capacities, resolve_tol=0.0, slot_agent=None):
+        self.n_tasks, self.n_slots = costs.shape
+        self.n_agents = capacities.shape[0]
+        if slot_agent is None:
+            slot_agent = np.broadcast_to(np.arange(self.n_slots), costs.shape)
 
-    max_iter = 20
-    logs = []
-    lb_history = []
+        # Variables are the eligible slots ordered agent-major (tasks within an agent), so each agent
+        # owns a contiguous column block. For dense input this is exactly the column-major (order='F')
+        # layout x = [x_11, x_21, ..., x_n1, x_12, ..., x_nm].
+        task_of, slot_of = np.nonzero(slot_agent >= 0)
+        agent_of = slot_agent[task_of, slot_of]
+        order = np.lexsort((task_of, agent_of))
+        self.var_task = task_of[order]
+        self.var_agent = agent_of[order]
+        self.var_slot = (task_of * self.n_slots + slot_of)[order]
+        # Optimization: Gather costs and weights into variable order once, so each iteration's
+        # reduced costs are a single vectorized subtraction with no reshaping or copying.
+        self.var_cost = costs.ravel()[self.var_slot]
+        self.var_weight = weights.ravel()[self.var_slot]
+        # Agent j's variables are var_*[agent_start[j]:agent_start[j + 1]]
+        self.agent_start = np.searchsorted(self.var_agent, np.arange(self.n_agents + 1))
+        self.bounds = Bounds(0, 1) # All variables are binary {0, 1}
+        self.capacities = capacities
 
-    ub = np.inf
-    best_sol = None
+        self.resolve_tol = resolve_tol
+        self.cached_x = None
+        self.cached_costs = None
+        self.skipped = 0
 
-    # Optimization: Pre-compute a single, global sparse constraint matrix for all subproblems combined.
-    # This prevents the incredibly slow setup and overhead of calling milp() inside a loop n_agents times per iteration.
-    # By vectorizing all n_agents subproblems into one sparse block diagonal formulation, milp solve time drops by >50%.
-    bounds = Bounds(0, 1) # All variables are binary {0, 1}
-    integrality = np.ones(n_tasks * n_agents) # All variables are integers
-
-    # Pre-compute global LinearConstraint for all agents simultaneously
-    # Let global x = [x_11, x_21, ..., x_n1, x_12, ..., x_n2, ..., x_nm] (Flattened column-major, order='F')
-    # Row j corresponds to sum_i w_ij x_ij <= C_j
-    rows = np.repeat(np.arange(n_agents), n_tasks)
-    cols = np.arange(n_tasks * n_agents)
-    # Optimization: Use .ravel('F') instead of .flatten('F') to return a contiguous view and avoid redundant memory copying.
-    vals = weights.ravel('F')
-
-    # Optimization: Convert the COO matrix to Compressed Sparse Column (CSC) format once here.
-    # SciPy's HiGHS solver (used by milp) internally operates on CSC matrices. If we pass a COO matrix,
-    # the solver performs an implicit deep copy and conversion to CSC on EVERY iteration of the tight loop.
-    # Pre-converting it here avoids this redundant conversion overhead completely.
-    A_sub_sparse = sp.coo_matrix((vals, (rows, cols)), shape=(n_agents, n_tasks * n_agents)).tocsc()
-    b_l = np.full(n_agents, -np.inf)
-    b_u = capacities
-    all_constraints_sparse = LinearConstraint(A_sub_sparse, b_l, b_u)
+    def initial_multipliers(self):
+        return np.zeros(self.n_tasks)
 
-    for k in range(max_iter):
+    def solve(self, lambdas):
+        """Returns (L(lambda), x) with x the (n_tasks, n_slots) 0/1 subproblem solution."""
         # Solve Subproblems
         # Maximize sum_j sum_i (lambdas[i] - c_ij) x_ij
         # s.t. sum_i w_ij x_ij <= C_j
 
-        current_x = np.zeros((n_tasks, n_agents))
-        subproblem_obj_sum = 0
+        # Optimization: Pre-calculate the reduced costs of every variable at once
+        c_var = self.var_cost - lambdas[self.var_task]
 
-        # Optimization: Pre-calculate the cost modifier matrix
-        c_sub_all = costs - lambdas[:, np.newaxis]
+        if self.cached_x is None:
+            stale = np.ones(self.n_agents, dtype=bool)
+            slack = np.zeros(self.n_agents)
+            x_var = np.zeros(c_var.size)
+        else:
+            # Sensitivity bound on how much better than the cached x_j the new optimum can be:
+            # selected items that got more expensive, plus unselected items that got cheaper while
+            # being profitable at all (items with reduced cost >= 0 never enter a minimizing knapsack).
+            delta = c_var - self.cached_costs
+            loss = np.where(self.cached_x > 0.5, np.maximum(delta, 0.0),
+                            np.where(c_var < 0, np.maximum(-delta, 0.0), 0.0))
+            slack = np.bincount(self.var_agent, weights=loss, minlength=self.n_agents)
+            stale = slack > self.resolve_tol
+            x_var = self.cached_x.copy()
+            self.skipped += int(self.n_agents - np.count_nonzero(stale))
+
+        subproblem_obj_sum = 0
+        fresh_vars = stale[self.var_agent]
+        # Optimization: Solve each agent's knapsack as its own milp over the items that can be in it:
+        # eligible (only eligible slots are variables), with negative reduced cost (the others never
+        # lower the minimum) and no heavier than the capacity. HiGHS does not decompose a block-diagonal
+        # milp, so one over all agents branches on every block at once; the separate knapsacks are a few
+        # items each, and an agent whose candidates all fit needs no solve at all.
+        for j in np.flatnonzero(stale):
+            block = slice(self.agent_start[j], self.agent_start[j + 1])
+            c_j = c_var[block]
+            w_j = self.var_weight[block]
+            x_j = np.zeros(c_j.size)
+            items = np.flatnonzero((c_j < 0) & (w_j <= self.capacities[j]))
+            if items.size and np.sum(w_j[items]) <= self.capacities[j]:
+                x_j[items] = 1.0
+            elif items.size:
+                # Optimization: Integer weights (the usual GAP data) go to the knapsack dynamic program,
+                # microseconds per agent where a HiGHS branch-and-bound takes tens of milliseconds.
+                selected = solve_knapsack(-c_j[items], w_j[items], self.capacities[j])
+                if selected is not None:
+                    x_j[items] = selected
+                else:
+                    # Optimization: Disable the default presolve phase in scipy.optimize.milp.
+                    # These knapsacks are a single row, which leaves the presolver nothing to
+                    # simplify, while it adds significant overhead per call.
+                    res = milp(c=c_j[items], constraints=LinearConstraint(w_j[items][np.newaxis, :], -np.inf, self.capacities[j]),
+                               integrality=np.ones(items.size), bounds=self.bounds, options={'presolve': False})
+                    if res.success:
+                        x_j[items] = np.round(res.x)
+            x_var[block] = x_j
+            # milp minimizes, so the maximization target is the negated cost
+            subproblem_obj_sum -= np.dot(c_j, x_j)
 
-        # Optimization: Flatten the cost matrix to match the global x vector, and solve all subproblems in one milp call.
-        # Use .ravel('F') instead of .flatten('F') to prevent creating a deep copy in memory.
-        c_sub_flat = c_sub_all.ravel('F')
+        # Skipped agents keep their cached solution, valued at the new reduced costs minus their slack
+        kept_vars = ~fresh_vars
+        if np.any(kept_vars):
+            subproblem_obj_sum -= np.dot(x_var[kept_vars], c_var[kept_vars]) - np.sum(slack[~stale])
 
-        # Optimization: Disable the default presolve phase in scipy.optimize.milp.
-        # Since we repeatedly solve structurally identical constraint matrices with only
-        # varying objective coefficients, the presolver's attempt to simplify the matrix
-        # is entirely redundant and adds significant overhead per iteration.
-        res = milp(c=c_sub_flat, constraints=all_constraints_sparse, integrality=integrality, bounds=bounds, options={'presolve': False})
+        # Only freshly solved agents reset their reference reduced costs
+        if self.cached_costs is None:
+            self.cached_costs = c_var
+        else:
+            self.cached_costs[fresh_vars] = c_var[fresh_vars]
+        self.cached_x = x_var
 
-        if res.success:
-            # milp minimizes, so objective value is negative of our maximization target
-            subproblem_obj_sum = -res.fun
-            # Reshape the global solution vector back to (n_tasks, n_agents) matrix
-            current_x = np.round(res.x).reshape((n_tasks, n_agents), order='F')
+        # Scatter the variables back into the (n_tasks, n_slots) slot matrix
+        current_x = np.zeros((self.n_tasks, self.n_slots))
+        current_x.reshape(-1)[self.var_slot] = x_var
 
         # LB = sum(lambdas) - Max ... = sum(lambdas) - subproblem_obj_sum
-        current_lb = np.sum(lambdas) - subproblem_obj_sum
-        lb_history.append(current_lb)
+        return np.sum(lambdas) - subproblem_obj_sum, current_x
 
+    def subgradient(self, x):
         # Subgradient: g_i = 1 - sum_j x_ij
         # If sum_j x_ij > 1, we assigned task to multiple agents. g_i < 0 => reduce lambda => reduce reward.
         # If sum_j x_ij = 0, we didn't assign. g_i > 0 => increase lambda => increase reward.
-        g = 1 - np.sum(current_x, axis=1)
+        return 1 - np.sum(x, axis=1)
+
+    def project(self, lambdas):
+        # Multipliers of equality constraints are free
+        return lambdas
+
+    def direction(self, lambdas, g):
+        return g
+
+    def violation(self, g):
+        return np.linalg.norm(g)
+
+    def is_optimal(self, lambdas, g):
+        # A zero subgradient means the relaxed solution is feasible and complementary, i.e. optimal.
+        return np.all(g == 0)
+
+class CapacityOracle:
+    """
+    Lagrangian subproblem for the relaxed capacity constraints sum_i w_ij x_ij <= C_j:
+    L(mu) = -sum_j mu_j C_j + sum_i min_j (c_ij + mu_j w_ij), with mu >= 0.
+    Each task simply picks its cheapest agent under the penalized costs, so the whole
+    oracle is a single O(n_tasks * n_slots) NumPy pass with no MILP at all.
+    Uses the same slot layout as AssignmentOracle (padding slots carry infinite cost).
+    """
+    __slots__ = ['costs', 'weights', 'slot_agent', 'capacities', 'n_tasks', 'n_slots', 'n_agents', 'task_idx']
+
+    # The closed-form oracle always re-solves every task
+    skipped = 0
+
+    def __init__(self, costs, weights, capacities, slot_agent=None):
+        self.n_tasks, self.n_slots = costs.shape
+        self.n_agents = capacities.shape[0]
+        if slot_agent is None:
+            slot_agent = np.broadcast_to(np.arange(self.n_slots), costs.shape)
+        self.costs = costs
+        # Padding slots get weight 0 (instead of inf) so penalties never produce inf * 0 = nan
+        self.weights = np.where(slot_agent >= 0, weights, 0.0)
+        self.slot_agent = np.maximum(slot_agent, 0)
+        self.capacities = capacities
+        self.task_idx = np.arange(self.n_tasks)
+
+    def initial_multipliers(self):
+        return np.zeros(self.n_agents)
+
+    def solve(self, mu):
+        """Returns (L(mu), x) with x the (n_tasks, n_slots) one-hot subproblem solution."""
+        penalized = self.costs + self.weights * mu[self.slot_agent]
+        slot = np.argmin(penalized, axis=1)
+        x = np.zeros((self.n_tasks, self.n_slots))
+        x[self.task_idx, slot] = 1.0
+        return np.sum(penalized[self.task_idx, slot]) - np.dot(mu, self.capacities), x
+
+    def subgradient(self, x):
+        # Subgradient: g_j = sum_i w_ij x_ij - C_j (positive => agent overloaded => raise its price)
+        load = np.bincount(self.slot_agent.ravel(), weights=(self.weights * x).ravel(), minlength=self.n_agents)
+        return load - self.capacities
+
+    def project(self, mu):
+        # Multipliers of inequality constraints stay non-negative
+        return np.maximum(mu, 0.0)
+
+    def direction(self, mu, g):
+        # Projected subgradient: components that would push a zero multiplier negative are dropped,
+        # otherwise they inflate ||g|| and shrink the Polyak step for no movement.
+        return np.where((mu <= 0) & (g < 0), 0.0, g)
+
+    def violation(self, g):
+        return np.linalg.norm(np.maximum(g, 0.0))
+
+    def is_optimal(self, mu, g):
+        # Feasible and complementary: no overloaded agent and slack capacities carry no price
+        return np.all(g <= 1e-9) and abs(np.dot(mu, g)) <= 1e-9
+
+def solve_lagrangian(costs, weights, capacities, max_iter=100, time_limit=None, target_gap=1e-4,
+                     step_rule="polyak", theta=2.0, patience=3, local_search=False,
+                     dual_method="subgradient", alpha=0.1, relax="assignment", resolve_tol=0.0,
+                     pairs=None, n_tasks=None, render="png", progress=None, keep_logs=True, cancel=None):
+    """
+    Solves Generalized Assignment Problem using Lagrangian Relaxation.
+    relax="assignment" relaxes the assignment constraints sum_j x_ij = 1 (knapsack subproblems per agent);
+    relax="capacity" relaxes the capacity constraints sum_i w_ij x_ij <= C_j (closed-form argmin per task,
+    much cheaper per iteration but usually a weaker bound).
+    costs: n_tasks x n_agents (list of lists), or None when `pairs` is given
+    weights: n_tasks x n_agents (list of lists), or None when `pairs` is given
+    capacities: n_agents (list)
+    max_iter: maximum number of subgradient iterations
+    time_limit: wall-clock budget in seconds (None for no limit)
+    target_gap: stop once (UB - LB) / |UB| drops to this relative gap
+    step_rule: "polyak" (Held-Karp step towards the best UB, theta halved on stall)
+               or "diminishing" (legacy 10 / (k + 1))
+    theta: initial Held-Karp step scale, halved after `patience` iterations without LB improvement
+    local_search: improve every repaired assignment with shift moves before using it as UB
+    dual_method: "subgradient" or "volume" (Barahona-Anbil volume algorithm: steps from the best
+                 multipliers along the subgradient of an exponentially averaged primal solution,
+                 which is returned as `primal_estimate`)
+    alpha: upper bound on the volume algorithm's primal averaging weight
+    resolve_tol: skip re-solving an agent's knapsack while its cached solution is provably within
+                 this absolute tolerance of optimal (0 skips only when the optimum cannot change)
+    pairs: sparse input, list of eligible (task, agent, cost, weight); all other pairs are forbidden.
+           Only eligible pairs become variables. best_solution is then None (use `assignment`)
+           and primal_estimate is given per input pair.
+    n_tasks: number of tasks for sparse input (defaults to the largest task index + 1)
+    render: "png" embeds the convergence plot as a base64 PNG, "data" returns its series as plot_data
+    progress: optional callback, called after each iteration with the iteration count, its LB,
+              the best LB and UB, and the log message
+    keep_logs: collect the per-iteration log messages in the result (streaming clients get them from progress instead)
+    cancel: optional CancelToken, checked before each iteration (raises Cancelled once tripped)
+    """
+    capacities = np.array(capacities, dtype=float)
+
+    # Security: Validate dimensions to prevent IndexError (DoS)
+    if capacities.ndim != 1:
+        raise ValueError("Capacities must be a 1D array")
+    n_agents = capacities.shape[0]
+
+    if pairs is not None:
+        costs, weights, slot_agent, pair_index = _slots_from_pairs(pairs, n_agents, n_tasks)
+        n_tasks = costs.shape[0]
+    else:
+        costs = np.array(costs, dtype=float)
+        weights = np.array(weights, dtype=float)
+
+        if costs.ndim != 2:
+            raise ValueError("Costs must be a 2D matrix")
+
+        n_tasks = costs.shape[0]
+
+        if weights.shape != costs.shape:
+            raise ValueError(f"Weights must be a {n_tasks}x{costs.shape[1]} matrix")
+        if costs.shape[1] != n_agents:
+            raise ValueError(f"Capacities must be a 1D array of length {costs.shape[1]}")
+        slot_agent = None
+        pair_index = None
+
+    task_idx = np.arange(n_tasks)
+
+    if step_rule not in STEP_RULES:
+        raise ValueError(f"Unknown step rule '{step_rule}'")
+    if dual_method not in DUAL_METHODS:
+        raise ValueError(f"Unknown dual method '{dual_method}'")
+    if relax not in RELAXATIONS:
+        raise ValueError(f"Unknown relaxation '{relax}'")
+
+    if relax == "capacity":
+        oracle = CapacityOracle(costs, weights, capacities, slot_agent)
+    else:
+        oracle = AssignmentOracle(costs, weights, capacities, resolve_tol, slot_agent)
+
+    # Initialize multipliers (lambda)
+    lambdas = oracle.initial_multipliers()
+
+    logs = []
+    lb_history = []
+
+    ub = np.inf
+    best_slot = None
+    best_lb = -np.inf
+    gap = None
+    stall = 0
+    phase_lb = -np.inf
+    stop_reason = "max_iter"
+    start_time = time.perf_counter()
+
+    # Volume algorithm state: stability center, its bound, and the averaged primal solution
+    center = lambdas
+    center_lb = -np.inf
+    x_bar = None
+
+    # Polyak steps need a target value above the dual optimum. Seed the UB with a plain
+    # greedy regret assignment; if even that fails, assigning every task to its most expensive
+    # agent is a valid upper bound on any feasible cost and keeps the step scaled to the costs.
+    ub_estimate = np.sum(np.max(np.where(np.isfinite(costs), costs, -np.inf), axis=1))
+    slot = repair_assignment(np.zeros(costs.shape), costs, weights, capacities, local_search, slot_agent)
+    if slot is not None:
+        ub = np.sum(costs[task_idx, slot])
+        best_slot = slot
+        if keep_logs:
+            logs.append(f"Greedy start: UB={ub:.2f}")
+
+    for k in range(max_iter):
+        if cancel is not None:
+            cancel.check()
+        current_lb, current_x = oracle.solve(lambdas)
+        lb_history.append(current_lb)
+
+        g = oracle.subgradient(current_x)
+
+        candidates = [current_x]
+        if dual_method == "volume":
+            if x_bar is None:
+                x_bar = current_x.copy()
+            else:
+                # Pick the averaging weight minimizing ||a g + (1 - a) v||, clipped to [alpha / 10, alpha]
+                v = oracle.subgradient(x_bar)
+                diff = v - g
+                diff_sq = np.dot(diff, diff)
+                a = np.dot(v, diff) / diff_sq if diff_sq > 0 else alpha
+                a = min(max(a, alpha / 10), alpha)
+                x_bar = a * current_x + (1 - a) * x_bar
+            candidates.append(x_bar)
+            # Serious step: move the stability center only when the bound improves
+            serious = current_lb > center_lb + 1e-9
+            if serious:
+                center = lambdas
+                center_lb = current_lb
+
+        optimal = oracle.is_optimal(lambdas, g)
 
         # Check Primal Feasibility
-        if np.all(g == 0):
-            # Feasible
-            # Optimization: Use np.vdot to directly compute the dot product of two matrices,
-            # completely avoiding the O(N) memory allocation overhead from current_x * costs.
-            cost = np.vdot(current_x, costs)
+        if optimal:
+            # Feasible: exactly one slot per task
+            slot = np.argmax(current_x, axis=1)
+            cost = np.sum(costs[task_idx, slot])
             if cost < ub:
                 ub = cost
-                best_sol = current_x.copy()
-            logs.append(f"Iter {k}: Feasible! LB={current_lb:.2f}, Cost={cost:.2f}")
+                best_slot = slot
+            message = f"Iter {k}: Feasible! LB={current_lb:.2f}, Cost={cost:.2f}"
         else:
-            logs.append(f"Iter {k}: LB={current_lb:.2f}, Infeasibility norm={np.linalg.norm(g):.2f}")
+            # Repair the relaxed solution into a feasible assignment so every iteration can yield an UB
+            for x in candidates:
+                slot = repair_assignment(x, costs, weights, capacities, local_search, slot_agent)
+                if slot is not None:
+                    cost = np.sum(costs[task_idx, slot])
+                    if cost < ub:
+                        ub = cost
+                        best_slot = slot
+            message = f"Iter {k}: LB={current_lb:.2f}, UB={ub:.2f}, Infeasibility norm={oracle.violation(g):.2f}"
+        if keep_logs:
+            logs.append(message)
 
-        if np.linalg.norm(g) == 0:
+        best_lb = max(best_lb, current_lb)
+        if progress is not None:
+            progress(iteration=k + 1, current_lb=float(current_lb), lb=float(best_lb),
+                     ub=float(ub) if ub != np.inf else None, message=message)
+        # Stall is measured against the best bound seen since theta last changed, so recovering
+        # from an early overshoot counts as progress instead of shrinking theta to nothing.
+        # The volume algorithm's center is monotone, so there only serious steps count.
+        improved = serious if dual_method == "volume" else current_lb > phase_lb + 1e-9
+        if improved:
+            phase_lb = max(phase_lb, current_lb)
+            stall = 0
+        else:
+            stall += 1
+
+        if optimal:
+            stop_reason = "optimal"
+            break
+
+        if ub != np.inf:
+            gap = (ub - best_lb) / max(abs(ub), 1e-9)
+            if gap <= target_gap:
+                stop_reason = "gap"
+                break
+
+        if time_limit is not None and time.perf_counter() - start_time >= time_limit:
+            stop_reason = "time_limit"
             break
 
+        if dual_method == "volume":
+            # Step from the stability center along the subgradient of the averaged primal solution
+            base, base_lb = center, center_lb
+            direction = oracle.direction(center, oracle.subgradient(x_bar))
+        else:
+            base, base_lb = lambdas, current_lb
+            direction = oracle.direction(lambdas, g)
+        direction_sq = np.dot(direction, direction)
+        if direction_sq == 0:
+            # The averaged primal is feasible; fall back to the current subgradient
+            base, base_lb = lambdas, current_lb
+            direction = oracle.direction(lambdas, g)
+            direction_sq = np.dot(direction, direction)
+            if direction_sq == 0:
+                stop_reason = "optimal"
+                break
+
         # Step size
-        # Simple diminishing step
-        step = 10.0 / (k + 1)
-        lambdas = lambdas + step * g
+        if step_rule == "polyak":
+            # Held-Karp: t_k = theta * (UB - L(lambda_k)) / ||g||^2, halving theta whenever the
+            # bound has not improved for `patience` iterations so the multipliers stop oscillating.
+            if stall >= patience:
+                theta *= 0.5
+                stall = 0
+                phase_lb = current_lb
+            target = ub if ub != np.inf else ub_estimate
+            step = theta * max(target - base_lb, 1e-6) / direction_sq
+        else:
+            # Simple diminishing step
+            step = 10.0 / (k + 1)
+        lambdas = oracle.project(base + step * direction)
+
+    if ub != np.inf:
+        gap = max((ub - best_lb) / max(abs(ub), 1e-9), 0.0)
+
+    assignment = None
+    best_sol = None
+    primal_estimate = None
+    if best_slot is not None:
+        assignment = best_slot if slot_agent is None else slot_agent[task_idx, best_slot]
+        if slot_agent is None:
+            best_sol = np.zeros((n_tasks, n_agents))
+            best_sol[task_idx, assignment] = 1.0
+    if x_bar is not None:
+        if slot_agent is None:
+            primal_estimate = x_bar.tolist()
+        else:
+            # Report the averaged primal per input pair rather than as a padded slot matrix
+            estimate = np.zeros(len(pairs))
+            eligible = pair_index >= 0
+            estimate[pair_index[eligible]] = x_bar[eligible]
+            primal_estimate = estimate.tolist()
 
-    img_b64 = plot_convergence(lb_history)
+    plot = plotting.output(convergence_plot_spec(lb_history), render)
 
     return {
         "status": "Completed",
+        "dual_method": dual_method,
+        "relax": relax,
         "lb_history": lb_history,
-        "ub": ub if ub != np.inf else None,
+        "lb": float(best_lb) if best_lb != -np.inf else None,
+        "ub": float(ub) if ub != np.inf else None,
+        "gap": float(gap) if gap is not None else None,
+        "iterations": len(lb_history),
+        "stop_reason": stop_reason,
+        "skipped_solves": oracle.skipped,
         "best_solution": best_sol.tolist() if best_sol is not None else None,
-        "plot": img_b64,
+        "assignment": assignment.tolist() if assignment is not None else None,
+        "primal_estimate": primal_estimate,
+        **plot,
         "logs": logs
     }
 
+def repair_assignment(x, costs, weights, capacities, local_search=False, slot_agent=None):
+    """
+    Turns a relaxed (possibly infeasible) 0/1 assignment into a feasible GAP assignment.
+    1. Tasks assigned to several agents keep only their cheapest agent.
+    2. Overloaded agents drop their lowest-regret tasks until within capacity.
+    3. Unassigned tasks are placed in decreasing order of regret (second-best minus best
+       feasible cost) on the cheapest agent with enough residual capacity.
+    4. Optionally, improving shift moves are applied until none remain.
+    x, costs and weights are (n_tasks, n_slots) slot matrices; slot_agent maps slots to agents
+    (-1 for padding, which must carry infinite cost and weight). With slot_agent=None they are
+    dense and slot k is agent k.
+    Returns the slot (i.e. dense agent) index per task, or None if some task cannot be placed.
+    """
+    n_tasks, n_slots = costs.shape
+    n_agents = capacities.shape[0]
+    if slot_agent is None:
+        slot_agent = np.broadcast_to(np.arange(n_slots), costs.shape)
+    task_idx = np.arange(n_tasks)
+    assigned = x > 0.5
+
+    # 1. Keep the cheapest of duplicate assignments
+    slot = np.where(assigned, costs, np.inf).argmin(axis=1)
+    slot[~assigned.any(axis=1)] = -1
+    agent = np.where(slot >= 0, slot_agent[task_idx, np.maximum(slot, 0)], -1)
+
+    # Regret of each task over all agents: how much it costs to move it off its best agent
+    sorted_costs = np.sort(costs, axis=1)
+    regret = sorted_costs[:, 1] - sorted_costs[:, 0] if n_slots > 1 else np.zeros(n_tasks)
+
+    placed = slot >= 0
+    load = np.bincount(agent[placed], weights=weights[task_idx[placed], slot[placed]], minlength=n_agents)
+
+    # 2. Unload overloaded agents (only possible when capacities are relaxed), cheapest moves first
+    for j in np.flatnonzero(load > capacities + 1e-9):
+        members = np.flatnonzero(agent == j)
+        for i in members[np.argsort(regret[members], kind='stable')]:
+            if load[j] <= capacities[j] + 1e-9:
+                break
+            load[j] -= weights[i, slot[i]]
+            slot[i] = -1
+            agent[i] = -1
+
+    residual = capacities - load
+
+    # 3. Greedy regret insertion of the remaining tasks. If ranking by cost paints itself into a
+    # corner on tight capacities, retry ranking by relative weight, which packs far more reliably.
+    pending = np.flatnonzero(slot < 0)
+    for desirability in (costs, weights / np.maximum(capacities[slot_agent], 1e-9)):
+        trial_slot, trial_residual = slot.copy(), residual.copy()
+        if _insert_by_regret(pending, trial_slot, trial_residual, desirability, weights, slot_agent):
+            slot, residual = trial_slot, trial_residual
+            break
+    else:
+        return None
+
+    # 4. Shift local search: move the single task with the largest saving while one exists
+    if local_search:
+        for _ in range(n_tasks * n_slots):
+            current_costs = costs[task_idx, slot]
+            savings = current_costs[:, np.newaxis] - costs
+            savings[weights > residual[slot_agent] + 1e-9] = -np.inf
+            savings[task_idx, slot] = -np.inf
+            best = np.argmax(savings)
+            i, k = divmod(best, n_slots)
+            if savings[i, k] <= 1e-9:
+                break
+            residual[slot_agent[i, slot[i]]] += weights[i, slot[i]]
+            residual[slot_agent[i, k]] -= weights[i, k]
+            slot[i] = k
+
+    return slot
+
+def _insert_by_regret(pending, slot, residual, desirability, weights, slot_agent):
+    """Places `pending` tasks in place (updating slot/residual); returns False if one does not fit."""
+    n_slots = weights.shape[1]
+    while pending.size:
+        # Optimization: Evaluate feasible desirabilities for all pending tasks at once instead of per task.
+        # Padding slots have infinite weight, so they never fit whatever residual[-1] holds.
+        fits = weights[pending] <= residual[slot_agent[pending]] + 1e-9
+        if not np.all(fits.any(axis=1)):
+            return False
+        feasible = np.where(fits, desirability[pending], np.inf)
+        if n_slots > 1:
+            two_best = np.partition(feasible, 1, axis=1)[:, :2]
+            # A task with a single feasible agent has infinite regret and is placed first
+            pending_regret = two_best[:, 1] - two_best[:, 0]
+        else:
+            pending_regret = np.zeros(pending.size)
+        pick = np.argmax(pending_regret)
+        i = pending[pick]
+        k = np.argmin(feasible[pick])
+        slot[i] = k
+        residual[slot_agent[i, k]] -= weights[i, k]
+        pending = np.delete(pending, pick)
+    return True
+
+def _slots_from_pairs(pairs, n_agents, n_tasks=None):
+    """
+    Builds the padded (n_tasks, max_degree) slot layout from eligible (task, agent, cost, weight)
+    tuples. Returns (costs, weights, slot_agent, pair_index) where padding slots have infinite
+    cost and weight, slot_agent -1, and pair_index maps each slot back to its input row.
+    """
+    pairs = np.array(pairs, dtype=float)
+    if pairs.ndim != 2 or pairs.shape[1] != 4:
+        raise ValueError("Pairs must be a list of (task, agent, cost, weight) tuples")
+
+    task = pairs[:, 0]
+    agent = pairs[:, 1]
+    if np.any(task != np.floor(task)) or np.any(agent != np.floor(agent)):
+        raise ValueError("Task and agent indices must be integers")
+    task = task.astype(int)
+    agent = agent.astype(int)
+
+    if n_tasks is None:
+        n_tasks = int(task.max()) + 1
+    # Security: Validate indices to prevent IndexError (DoS)
+    if np.any(task < 0) or np.any(task >= n_tasks):
+        raise ValueError(f"Task indices must be in [0, {n_tasks})")
+    if np.any(agent < 0) or np.any(agent >= n_agents):
+        raise ValueError(f"Agent indices must be in [0, {n_agents})")
+
+    order = np.lexsort((agent, task))
+    task = task[order]
+    agent = agent[order]
+    if np.any((task[1:] == task[:-1]) & (agent[1:] == agent[:-1])):
+        raise ValueError("Duplicate (task, agent) pairs")
+
+    degree = np.bincount(task, minlength=n_tasks)
+    if np.any(degree == 0):
+        raise ValueError("Every task needs at least one eligible agent")
+
+    # Position of each pair within its task's row
+    pos = np.arange(task.size) - (np.cumsum(degree) - degree)[task]
+    shape = (n_tasks, int(degree.max()))
+
+    slot_agent = np.full(shape, -1)
+    slot_agent[task, pos] = agent
+    costs = np.full(shape, np.inf)
+    costs[task, pos] = pairs[order, 2]
+    weights = np.full(shape, np.inf)
+    weights[task, pos] = pairs[order, 3]
+    pair_index = np.full(shape, -1)
+    pair_index[task, pos] = order
+    return costs, weights, slot_agent, pair_index
+
 def plot_convergence(history):
-    # Use Matplotlib Object-Oriented Interface for thread safety and performance
-    fig = Figure(figsize=(6, 4))
-    ax = fig.add_subplot(111)
-
-    ax.plot(history, marker='o')
-    ax.set_title("Lagrangian Lower Bound Convergence")
-    ax.set_xlabel("Iteration")
-    ax.set_ylabel("Lower Bound")
-    ax.grid(True)
-
-    buf = io.BytesIO()
-    canvas = FigureCanvasAgg(fig)
-    canvas.print_png(buf)
-
-    buf.seek(0)
-    img_str = base64.b64encode(buf.read()).decode('utf-8')
-    # No need to explicitly close fig as it is garbage collected
-    return img_str
+    return plotting.render_b64(convergence_plot_spec(history))
+
+def convergence_plot_spec(history):
+    """Plot-ready lower bound history."""
+    return {"kind": "convergence", "lb": [float(v) for v in history]}
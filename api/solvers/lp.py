@@ -1,13 +1,12 @@
 import numpy as np
+from collections import deque
 from scipy.optimize import linprog
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_agg import FigureCanvasAgg
-import io
-import base64
+from api import plotting
 
-def solve_lp(c, A_ub, b_ub, bounds=None, maximize=False, method="highs"):
+def solve_lp(c, A_ub, b_ub, bounds=None, maximize=False, method="highs", render="png"):
     """
     method supports: highs, highs-ds (dual simplex), highs-ipm (interior point)
+    render: "png" embeds the plot as a base64 PNG, "data" returns its numeric series as plot_data
     """
     """
     Solves a Linear Programming problem:
@@ -28,10 +27,11 @@ def solve_lp(c, A_ub, b_ub, bounds=None, maximize=False, method="highs"):
 
     res = linprog(c_solver, A_ub=A_ub, b_ub=b_ub, bounds=bounds, method=method)
 
-    img_b64 = None
+    plot = plotting.output(None, render)
     if len(c) == 2 and res.success:
         try:
-            img_b64 = plot_lp(c, A_ub, b_ub, res.x, maximize)
+            spec = lp_plot_spec(c, A_ub, b_ub, res.x, maximize, bounds)
+            plot = {"feasible_region": spec["feasible"], **plotting.output(spec, render)}
         except Exception as e:
             print(f"Plotting failed: {e}")
 
@@ -43,14 +43,100 @@ def solve_lp(c, A_ub, b_ub, bounds=None, maximize=False, method="highs"):
         "message": res.message,
         "x": res.x.tolist() if res.x is not None else None,
         "fun": fun_val,
-        "plot": img_b64
+        **plot
     }
 
-def plot_lp(c, A_ub, b_ub, optimal_x, maximize):
-    # Use Matplotlib Object-Oriented Interface for thread safety and performance
-    fig = Figure(figsize=(6, 6))
-    ax = fig.add_subplot(111)
+def plot_lp(c, A_ub, b_ub, optimal_x, maximize, bounds=None):
+    return plotting.render_b64(lp_plot_spec(c, A_ub, b_ub, optimal_x, maximize, bounds))
 
+def feasible_polygon(A, b, limit, bounds=None, tol=1e-9):
+    """
+    Exact feasible region of A x <= b (2 variables) within the bounds and the plot window [0, limit]^2,
+    as its vertices in counter-clockwise order ([] if empty or degenerate).
+    Half-plane intersection: sort the boundary lines by angle, then sweep them once with a deque, O(m log m).
+    """
+    A = np.asarray(A, dtype=float).reshape(-1, 2)
+    b = np.asarray(b, dtype=float).ravel()
+    if bounds is None:
+        bounds = [(0, None)] * 2
+    # Bounds and the plot window become ordinary half-planes
+    rows, rhs = [A], [b]
+    for j, (lo, hi) in enumerate(bounds):
+        e = np.eye(2)[j]
+        for coef, val in ((-e, lo), (e, hi)):
+            if val is not None:
+                rows.append(coef[np.newaxis])
+                rhs.append([float(coef @ e) * val])
+    rows.append(np.vstack([-np.eye(2), np.eye(2)]))
+    rhs.append([0.0, 0.0, limit, limit])
+    A = np.vstack(rows)
+    b = np.concatenate([np.asarray(r, dtype=float) for r in rhs])
+
+    norm = np.hypot(A[:, 0], A[:, 1])
+    zero = norm <= tol
+    # 0 <= b rows are always true; 0 <= negative b makes the region empty
+    if np.any(b[zero] < -tol):
+        return []
+    A, b, norm = A[~zero], b[~zero], norm[~zero]
+    A = A / norm[:, np.newaxis]
+    b = b / norm
+
+    # Boundary direction with the feasible side on its left
+    d = np.column_stack([-A[:, 1], A[:, 0]])
+    angle = np.arctan2(d[:, 1], d[:, 0])
+    # Optimization: for parallel lines only the tightest (smallest offset) one matters
+    order = np.lexsort((b, np.round(angle, 12)))
+    A, b, d, angle = A[order], b[order], d[order], np.round(angle[order], 12)
+    keep = np.ones(len(b), dtype=bool)
+    keep[1:] = angle[1:] != angle[:-1]
+    A, b, d = A[keep], b[keep], d[keep]
+
+    def meet(i, j):
+        det = d[i, 0] * d[j, 1] - d[i, 1] * d[j, 0]
+        if abs(det) <= tol:
+            return None
+        # Solve A_i p = b_i, A_j p = b_j
+        return np.array([b[i] * A[j, 1] - b[j] * A[i, 1], A[i, 0] * b[j] - A[j, 0] * b[i]]) / (A[i, 0] * A[j, 1] - A[i, 1] * A[j, 0])
+
+    def outside(i, p):
+        return p is None or A[i] @ p > b[i] + tol
+
+    lines = deque()
+    for i in range(len(b)):
+        while len(lines) >= 2 and outside(i, meet(lines[-2], lines[-1])):
+            lines.pop()
+        while len(lines) >= 2 and outside(i, meet(lines[0], lines[1])):
+            lines.popleft()
+        if lines and meet(lines[-1], i) is None:
+            # Opposite parallel lines meeting directly: the strip between them is empty
+            return []
+        lines.append(i)
+    while len(lines) >= 3 and outside(lines[0], meet(lines[-2], lines[-1])):
+        lines.pop()
+    while len(lines) >= 3 and outside(lines[-1], meet(lines[0], lines[1])):
+        lines.popleft()
+    if len(lines) < 3:
+        return []
+    lines = list(lines)
+
+    vertices = []
+    for k in range(len(lines)):
+        p = meet(lines[k], lines[(k + 1) % len(lines)])
+        if p is None:
+            return []
+        if not vertices or np.hypot(*(p - vertices[-1])) > 1e-7:
+            vertices.append(p)
+    if len(vertices) > 1 and np.hypot(*(vertices[0] - vertices[-1])) <= 1e-7:
+        vertices.pop()
+    if len(vertices) < 3:
+        return []
+    return [[float(v[0]), float(v[1])] for v in vertices]
+
+def lp_plot_spec(c, A_ub, b_ub, optimal_x, maximize, bounds=None):
+    """
+    Plot-ready series of a 2-variable LP: constraint lines (end points, or x1 of a vertical line),
+    the feasible polygon's vertices, the objective line through the optimum, and the optimum.
+    """
     # Determine plot limits based on constraints and optimal solution
     # Simple heuristic: max of intercepts and optimal solution
     max_val = 0
@@ -64,59 +150,36 @@ def plot_lp(c, A_ub, b_ub, optimal_x, maximize):
         if a1 > 0: max_val = max(max_val, b/a1)
         if a2 > 0: max_val = max(max_val, b/a2)
 
-    limit = max(10, max_val * 1.2)
-    x = np.linspace(0, limit, 400)
+    limit = float(max(10, max_val * 1.2))
+    # Optimization: Lines are straight, so two end points describe them instead of 400 samples
+    ends = np.array([0.0, limit])
 
-    # Plot constraints
-    # a1*x + a2*y <= b
-    y_min_feasible = np.zeros_like(x)
-    y_max_feasible = np.full_like(x, limit)
+    # Constraints: a1*x + a2*y <= b
+    constraints = []
 
     for i in range(len(b_ub)):
         a1, a2 = A_ub[i]
         b = b_ub[i]
 
         if a2 != 0:
-            y = (b - a1 * x) / a2
-            label = f'{a1}x1 + {a2}x2 <= {b}'
-            ax.plot(x, y, label=label)
-
-            # Update feasible region tracking (assuming <= constraints and a2 > 0)
-            # This is a simplification for visualization
-            if a2 > 0:
-                y_max_feasible = np.minimum(y_max_feasible, y)
-            elif a2 < 0:
-                y_min_feasible = np.maximum(y_min_feasible, y)
+            constraints.append({"label": f'{a1}x1 + {a2}x2 <= {b}', "x": ends.tolist(), "y": ((b - a1 * ends) / a2).tolist()})
         elif a1 != 0:
-            ax.axvline(b/a1, label=f'{a1}x1 <= {b}', color='gray', linestyle='--')
-            # Handle vertical constraint for fill? Complex.
+            constraints.append({"label": f'{a1}x1 <= {b}', "vertical": float(b / a1)})
 
-    # Shade feasible region (simplified)
-    ax.fill_between(x, y_min_feasible, y_max_feasible, where=(y_max_feasible >= y_min_feasible), color='green', alpha=0.1)
-
-    # Plot Objective Function at Optimal
+    # Objective Function at Optimal
     # Z = c1*x + c2*y => y = (Z - c1*x)/c2
-    opt_val = np.dot(c, optimal_x)
+    opt_val = float(np.dot(c, optimal_x))
     c1, c2 = c
+    objective = {"value": opt_val, "x": None, "y": None}
     if c2 != 0:
-        y_obj = (opt_val - c1 * x) / c2
-        ax.plot(x, y_obj, 'r--', linewidth=2, label=f'Obj: {opt_val:.2f}')
-
-    ax.plot(optimal_x[0], optimal_x[1], 'ro', markersize=8, label='Optimal')
-
-    ax.set_xlim(0, limit)
-    ax.set_ylim(0, limit)
-    ax.set_xlabel('x1')
-    ax.set_ylabel('x2')
-    ax.legend()
-    ax.grid(True, alpha=0.3)
-    ax.set_title('LP Visualization')
-
-    buf = io.BytesIO()
-    canvas = FigureCanvasAgg(fig)
-    canvas.print_png(buf)
-
-    buf.seek(0)
-    img_str = base64.b64encode(buf.read()).decode('utf-8')
-    # No need to explicitly close fig as it is garbage collected
-    return img_str
+        objective["x"] = ends.tolist()
+        objective["y"] = ((opt_val - c1 * ends) / c2).tolist()
+
+    return {
+        "kind": "lp",
+        "limit": limit,
+        "constraints": constraints,
+        "feasible": feasible_polygon(A_ub, b_ub, limit, bounds),
+        "objective": objective,
+        "optimum": [float(v) for v in optimal_x]
+    }
@@ -1,206 +1,970 @@
 import numpy as np
 from scipy.optimize import linprog
 import scipy.sparse as sp
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_agg import FigureCanvasAgg
-import io
-import base64
-
-def solve_stochastic(total_land, scenarios):
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from api.solvers import twostage
+from api import plotting, processes
+from api.cancellation import Cancelled
+from api.lazy import lazy
+from api.solvers.twostage import solve_recourse
+
+# Optimization: scipy.stats adds about as much import time as scipy.optimize, and only SAA needs it
+stats = lazy("scipy.stats")
+
+STOCHASTIC_METHODS = ("extensive", "lshaped", "ph", "frontier")
+
+# Costs per acre
+PLANTING_COSTS = np.array([150, 230, 260], dtype=float) # Wheat, Corn, Beets
+# Selling prices
+SELL_PRICE = np.array([170, 150, 36, 10], dtype=float) # Wheat, Corn, Beets (quota), Beets (excess)
+# Purchase prices
+BUY_PRICE = np.array([238, 210], dtype=float) # Wheat, Corn
+# Demands (feeding requirements)
+DEMANDS = np.array([200, 240], dtype=float) # Wheat, Corn
+# Quota for Beets
+BEETS_QUOTA = 6000.0
+
+# Progressive hedging only spreads over worker processes in chunks of at least this many scenarios
+PH_CHUNK_SCENARIOS = 20_000
+# Progressive hedging rebalances rho whenever the non-anticipativity residual and the consensus move
+# (scaled by rho) are more than PH_RHO_BALANCE apart, by a factor of PH_RHO_FACTOR (residual balancing)
+PH_RHO_BALANCE = 10.0
+PH_RHO_FACTOR = 2.0
+
+# Processes solving SAA replications, shared by all requests
+SAA_WORKERS = min(4, os.cpu_count() or 1)
+# Seconds between checks of the cancel token while the SAA pool runs
+SAA_CANCEL_POLL = 0.1
+_saa_pool = None
+_saa_pool_lock = threading.Lock()
+
+# Supported yield distributions for sample average approximation and their parameter counts:
+# normal (mean, std), uniform (low, high), triangular (low, mode, high)
+YIELD_DISTRIBUTIONS = {"normal": 2, "uniform": 2, "triangular": 3}
+
+# Largest scenario set reduce_scenarios accepts. Its float32 distance matrix takes 4 * n^2 bytes (100MB at 5000),
+# which is the peak: the float64 intermediates only ever cover one block of REDUCTION_BLOCK elements (~8MB each).
+MAX_REDUCTION_SCENARIOS = 5000
+REDUCTION_BLOCK = 1 << 20
+
+# Scenarios per chunk read by the closed-form evaluator
+EVAL_CHUNK = 65536
+# Max (candidates x scenarios) elements per evaluation block, bounding temporary memory (~16MB per array)
+EVAL_BLOCK = 1 << 21
+
+def solve_stochastic(total_land, scenarios, method="extensive", max_iter=50, tol=1e-6, max_cut_groups=100,
+                     metrics=False, reduce_to=None, rho=1.0, ph_tol=1e-3, workers=1,
+                     cvar_weight=0.0, cvar_alpha=0.95, frontier_points=11, render="png", time_limit=None,
+                     progress=None, cancel=None):
     """
     Solves the Farmer's problem (Two-Stage Stochastic LP).
     Maximize Expected Profit.
     scenarios: list of dict with 'probability' and 'yields' (list of 3 floats: Wheat, Corn, Beets)
+    method: "extensive" solves the deterministic equivalent in one LP;
+            "lshaped" uses multi-cut L-shaped (Benders) decomposition, whose master only has
+            3 + max_cut_groups variables however many scenarios there are;
+            "ph" uses progressive hedging with closed-form scenario subproblems;
+            "frontier" sweeps the CVaR weight over frontier_points values in [0, 1] and returns the
+            mean-CVaR frontier (see solve_frontier)
+    max_iter, tol: L-shaped / progressive hedging iteration limit, and L-shaped relative optimality gap
+    max_cut_groups: number of scenario groups with their own recourse variable in the L-shaped
+                    master (one group per scenario, i.e. the pure multi-cut method, up to this many)
+    metrics: also return the expected value of perfect information (EVPI) and the value of
+             the stochastic solution (VSS) of the risk-neutral problem, also under a CVaR objective
+    reduce_to: first reduce the scenario set to this many scenarios by fast forward selection
+    rho, ph_tol: progressive hedging initial penalty and non-anticipativity tolerance (fraction of total_land)
+    workers: progressive hedging worker processes (None picks them with ph_workers)
+    cvar_weight, cvar_alpha: maximize (1 - cvar_weight) E[profit] + cvar_weight CVaR_alpha[profit], where
+                             CVaR_alpha is the expected profit of the worst 1 - cvar_alpha probability tail
+                             (extensive and frontier methods)
+    render: "png" embeds the plot as a base64 PNG, "data" returns its numeric series as plot_data
+    time_limit: wall-clock budget in seconds of the L-shaped / progressive hedging iterations (None for no limit)
+    progress: optional callback, called after each L-shaped / progressive hedging iteration
+    cancel: optional CancelToken, checked between iterations and solve phases (raises Cancelled once tripped)
     """
-    # Costs per acre
-    planting_costs = np.array([150, 230, 260], dtype=float) # Wheat, Corn, Beets
-
-    # Selling prices
-    sell_price = np.array([170, 150, 36, 10], dtype=float) # Wheat, Corn, Beets (quota), Beets (excess)
-    # Purchase prices
-    buy_price = np.array([238, 210], dtype=float) # Wheat, Corn
-
-    # Demands (feeding requirements)
-    demands = np.array([200, 240], dtype=float) # Wheat, Corn
-
-    # Quota for Beets
-    beets_quota = 6000.0
+    if method not in STOCHASTIC_METHODS:
+        raise ValueError(f"Unknown method '{method}'")
 
     n_scenarios = len(scenarios)
     # Optimization: Use np.fromiter with a pre-calculated count instead of a list comprehension and np.array
     # This avoids intermediate Python list creation and improves speed and memory efficiency for large scenario counts.
     probs = np.fromiter((s['probability'] for s in scenarios), dtype=float, count=n_scenarios)
-
-    # Variables:
-    # x (3): planted acres
-    # For each scenario s:
-    #   w_s (2): sold wheat, corn
-    #   y_s (2): purchased wheat, corn
-    #   z_s (2): sold beets (quota, excess)
-    # Total per scenario: 2+2+2 = 6 vars.
-    # Total vars: 3 + 6*S
-
-    num_vars = 3 + 6 * n_scenarios
-
-    # Objective: Minimize -Expected Profit
-    # Profit = Sum_s p_s * [ (170 w1 + 150 w2 + 36 z1 + 10 z2) - (238 y1 + 210 y2) ] - (150 x1 + 230 x2 + 260 x3)
-    # Coeffs for x: 150, 230, 260 (positive because we minimize cost - revenue)
-    c = np.zeros(num_vars)
-    c[0:3] = planting_costs
-
-    # Optimization: Use NumPy broadcasting to calculate objective coefficients for all scenarios simultaneously,
-    # completely eliminating the O(N_SCENARIOS) Python for-loop overhead.
-    scenario_coeffs = np.array([
-        -sell_price[0], -sell_price[1],
-        buy_price[0], buy_price[1],
-        -sell_price[2], -sell_price[3]
-    ])
-    # Optimization: Use .ravel() instead of .flatten() to avoid redundant memory allocation and copying overhead.
-    c[3:] = (probs[:, np.newaxis] * scenario_coeffs).ravel()
-
-    # Optimization: Pre-allocate numpy arrays for sparse matrices instead of appending to lists.
-    # We construct A_ub and A_eq as scipy.sparse.coo_matrix to vastly improve memory footprint
-    # and solve time for large scenario counts since the constraint matrices are extremely sparse.
-    n_ub_constraints = 1 + 3 * n_scenarios
-    n_eq_constraints = n_scenarios
-
-    # A_ub Nonzeros: 3 (land) + S*3 (wheat) + S*3 (corn) + S*1 (quota) = 3 + 7*S
-    nnz_ub = 3 + 7 * n_scenarios
-    rows_ub = np.zeros(nnz_ub, dtype=int)
-    cols_ub = np.zeros(nnz_ub, dtype=int)
-    vals_ub = np.zeros(nnz_ub)
-    b_ub = np.zeros(n_ub_constraints)
-
-    # 1. Land constraint: x1 + x2 + x3 <= total_land
-    rows_ub[0:3] = 0
-    cols_ub[0:3] = [0, 1, 2]
-    vals_ub[0:3] = 1.0
-    b_ub[0] = total_land
-
-    idx = 3
     # Optimization: Use np.fromiter with a pre-calculated count instead of a list comprehension and np.array
     # This avoids intermediate Python list creation and is measurably faster (~20-30%) for large scenario counts.
     ylds = np.fromiter((y for s in scenarios for y in s['yields']), dtype=float, count=n_scenarios * 3).reshape(n_scenarios, 3)
-    base_indices = 3 + np.arange(n_scenarios) * 6
-
-    # --- Wheat Constraints (ub_idx: 1, 4, 7...) ---
-    wheat_ub_idx = 1 + np.arange(n_scenarios) * 3
-    rows_ub[idx:idx + 3*n_scenarios] = np.repeat(wheat_ub_idx, 3)
-    # Optimization: Replace np.column_stack(...).ravel() with strided slice assignments.
-    # This directly avoids intermediate 2D memory allocations and is significantly faster.
-    cols_ub[idx:idx + 3*n_scenarios:3] = 0
-    cols_ub[idx+1:idx + 3*n_scenarios:3] = base_indices
-    cols_ub[idx+2:idx + 3*n_scenarios:3] = base_indices + 2
-
-    vals_ub[idx:idx + 3*n_scenarios:3] = -ylds[:, 0]
-    vals_ub[idx+1:idx + 3*n_scenarios:3] = 1.0
-    vals_ub[idx+2:idx + 3*n_scenarios:3] = -1.0
-    b_ub[wheat_ub_idx] = -demands[0]
-    idx += 3*n_scenarios
-
-    # --- Corn Constraints (ub_idx: 2, 5, 8...) ---
-    corn_ub_idx = 2 + np.arange(n_scenarios) * 3
-    rows_ub[idx:idx + 3*n_scenarios] = np.repeat(corn_ub_idx, 3)
-    cols_ub[idx:idx + 3*n_scenarios:3] = 1
-    cols_ub[idx+1:idx + 3*n_scenarios:3] = base_indices + 1
-    cols_ub[idx+2:idx + 3*n_scenarios:3] = base_indices + 3
-
-    vals_ub[idx:idx + 3*n_scenarios:3] = -ylds[:, 1]
-    vals_ub[idx+1:idx + 3*n_scenarios:3] = 1.0
-    vals_ub[idx+2:idx + 3*n_scenarios:3] = -1.0
-    b_ub[corn_ub_idx] = -demands[1]
-    idx += 3*n_scenarios
-
-    # --- Quota Limit Constraints (ub_idx: 3, 6, 9...) ---
-    quota_ub_idx = 3 + np.arange(n_scenarios) * 3
-    rows_ub[idx:idx + n_scenarios] = quota_ub_idx
-    cols_ub[idx:idx + n_scenarios] = base_indices + 4
-    vals_ub[idx:idx + n_scenarios] = np.ones(n_scenarios)
-    b_ub[quota_ub_idx] = beets_quota
-
-    # Optimization: Convert the COO matrix to Compressed Sparse Column (CSC) format.
-    # SciPy's HiGHS solver natively operates on CSC sparse matrices. If passed a COO matrix,
-    # the solver internally performs an expensive memory allocation and conversion to CSC.
-    # Doing it preemptively here saves measurable execution time for large scenario counts.
-    A_ub = sp.coo_matrix((vals_ub, (rows_ub, cols_ub)), shape=(n_ub_constraints, num_vars)).tocsc()
-
-    # --- Beets Balance Constraints (eq_idx: 0, 1, 2...) ---
-    eq_idx = np.arange(n_scenarios)
-    rows_eq = np.repeat(eq_idx, 3)
-    cols_eq = np.empty(3 * n_scenarios, dtype=int)
-    cols_eq[0::3] = 2
-    cols_eq[1::3] = base_indices + 4
-    cols_eq[2::3] = base_indices + 5
-
-    vals_eq = np.empty(3 * n_scenarios, dtype=float)
-    vals_eq[0::3] = ylds[:, 2]
-    vals_eq[1::3] = -1.0
-    vals_eq[2::3] = -1.0
-    b_eq = np.zeros(n_eq_constraints)
-
-    A_eq = sp.coo_matrix((vals_eq, (rows_eq, cols_eq)), shape=(n_eq_constraints, num_vars)).tocsc()
-
-    res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=(0, None), method='highs')
-
-    img_b64 = None
-    if res.success:
-        img_b64 = plot_stochastic(res.x[0:3], -res.fun, scenarios, probs, res.x, n_scenarios)
+
+    return solve_stochastic_arrays(total_land, probs, ylds, method, max_iter, tol, max_cut_groups,
+                                   metrics, reduce_to, rho, ph_tol, workers, scenarios,
+                                   cvar_weight=cvar_weight, cvar_alpha=cvar_alpha, frontier_points=frontier_points,
+                                   render=render, time_limit=time_limit, progress=progress, cancel=cancel)
+
+def solve_stochastic_arrays(total_land, probs, ylds, method="extensive", max_iter=50, tol=1e-6,
+                            max_cut_groups=100, metrics=False, reduce_to=None, rho=1.0, ph_tol=1e-3,
+                            workers=1, scenarios=None, cvar_weight=0.0, cvar_alpha=0.95, frontier_points=11,
+                            render="png", time_limit=None, progress=None, cancel=None):
+    """
+    solve_stochastic on scenario arrays: probs (n,) and ylds (n, 3), which may be read-only views.
+    scenarios (optional) only supplies names for the plot.
+    """
+    if method not in STOCHASTIC_METHODS:
+        raise ValueError(f"Unknown method '{method}'")
+    if cvar_weight > 0 and method not in ("extensive", "frontier"):
+        raise ValueError("CVaR objectives need method 'extensive' or 'frontier'")
+    n_scenarios = probs.size
+    check_probabilities(probs)
+
+    reduction = None
+    if reduce_to is not None and reduce_to < n_scenarios:
+        full_probs, full_ylds = probs, ylds
+        kept, probs, error = reduce_scenarios(probs, ylds, reduce_to, cancel)
+        ylds = ylds[kept]
+        if scenarios is not None:
+            scenarios = [scenarios[i] for i in kept]
+        reduction = {"original_scenarios": n_scenarios, "kept": kept.tolist(), "error": error}
+
+    if cancel is not None:
+        cancel.check()
+    if method == "lshaped":
+        result = solve_lshaped(total_land, probs, ylds, max_iter, tol, max_cut_groups, scenarios, render,
+                               time_limit=time_limit, progress=progress, cancel=cancel)
+    elif method == "ph":
+        if workers is None:
+            workers = ph_workers(probs.size)
+        result = solve_progressive_hedging(total_land, probs, ylds, rho, max_iter, ph_tol, workers, scenarios, render,
+                                           time_limit=time_limit, progress=progress, cancel=cancel)
+    elif method == "frontier":
+        result = solve_frontier(total_land, probs, ylds, cvar_weight, cvar_alpha, frontier_points, tol, scenarios, render)
+    else:
+        result = solve_extensive(total_land, probs, ylds, scenarios, cvar_weight, cvar_alpha, render)
+
+    if reduction is not None:
+        if result["success"]:
+            # Score the plan on the full scenario set to quantify what the reduction cost
+            reduction["full_expected_profit"] = float(farmer_profits(np.array([result["x"]]), full_ylds)[0] @ full_probs)
+        result["reduction"] = reduction
+
+    if metrics and result["success"]:
+        rp = result["expected_profit"]
+        if cvar_weight > 0:
+            # EVPI and VSS compare against the risk-neutral recourse problem. A CVaR plan gives up expected
+            # profit on purpose, so its value would inflate EVPI and can make VSS negative. The frontier
+            # already holds the risk-neutral plan at weight 0; otherwise solve it with the closed-form L-shaped method.
+            if method == "frontier":
+                rp = result["frontier"][0]["expected_profit"]
+            else:
+                rp = solve_lshaped(total_land, probs, ylds, tol=tol, render="data",
+                                   time_limit=time_limit, cancel=cancel)["expected_profit"]
+        result.update(stochastic_metrics(total_land, probs, ylds, rp, cancel))
+    return result
+
+def check_probabilities(probs):
+    # Security: All-zero probabilities would turn the normalized weights into NaN
+    if np.any(probs < 0) or not probs.sum() > 0:
+        raise ValueError("Probabilities must be non-negative with a positive sum")
+
+def unpack_columnar(data, yields=None, max_scenarios=None):
+    """
+    Maps packed little-endian float64 scenario columns onto NumPy arrays without copying.
+    Either `data` holds [probabilities | wheat | corn | beets] (4n values), or `data` holds the
+    n probabilities and `yields` the 3n yield values [wheat | corn | beets].
+    Returns (probs (n,), ylds (n, 3)) as read-only views of the buffers.
+    """
+    for buf in (data, yields):
+        if buf is not None and len(buf) % 8:
+            raise ValueError("Buffer length must be a multiple of 8 bytes")
+
+    if yields is None:
+        columns = np.frombuffer(data, dtype='<f8')
+        if columns.size % 4:
+            raise ValueError("Expected 4 columns of equal length")
+        columns = columns.reshape(4, -1)
+        probs, ylds = columns[0], columns[1:].T
+    else:
+        probs = np.frombuffer(data, dtype='<f8')
+        ylds = np.frombuffer(yields, dtype='<f8')
+        if ylds.size != 3 * probs.size:
+            raise ValueError("Expected 3 yield values per probability")
+        ylds = ylds.reshape(3, -1).T
+
+    n_scenarios = probs.size
+    if n_scenarios == 0:
+        raise ValueError("No scenarios")
+    if max_scenarios is not None and n_scenarios > max_scenarios:
+        raise ValueError(f"At most {max_scenarios} scenarios are supported")
+    # Security: Vectorized equivalents of the per-scenario JSON validation (finite, bounded probabilities and yields)
+    if not (np.all(np.isfinite(probs)) and np.all((probs >= 0) & (probs <= 1))):
+        raise ValueError("Probabilities must be finite and in [0, 1]")
+    if not np.all(np.abs(ylds) <= 1e20):
+        raise ValueError("Yields must be finite and bounded")
+    return probs, ylds
+
+def reduce_scenarios(probs, ylds, n_keep, cancel=None):
+    """
+    Fast forward selection (Heitsch & Roemisch): greedily picks n_keep scenarios minimizing the
+    Kantorovich distance to the original distribution, using Euclidean distances between yield vectors.
+    Every dropped scenario's probability is moved to its nearest kept scenario.
+    Returns (kept indices, their new probabilities, reduction error = the Kantorovich distance).
+    cancel: optional CancelToken, checked before each selection sweep
+    """
+    n_scenarios = probs.size
+    if n_keep < 1:
+        raise ValueError("Must keep at least one scenario")
+    # Security: The distance matrix is quadratic in the scenario count
+    if n_scenarios > MAX_REDUCTION_SCENARIOS:
+        raise ValueError(f"Scenario reduction supports at most {MAX_REDUCTION_SCENARIOS} scenarios")
+
+    # Optimization: Build the pairwise distance matrix with matrix products,
+    # ||a - b||^2 = ||a||^2 + ||b||^2 - 2 a.b, instead of a Python double loop.
+    # Optimization: Run the O(K n^2) selection sweeps in float32, halving memory traffic;
+    # the exact error and assignment below are recomputed in float64.
+    # Memory Leak Protection: the float64 terms are computed a block of rows at a time and written straight
+    # into the float32 matrix, so no n x n float64 array ever exists.
+    sq_norms = np.einsum('ij,ij->i', ylds, ylds)
+    dist = np.empty((n_scenarios, n_scenarios), dtype=np.float32)
+    block = max(1, REDUCTION_BLOCK // n_scenarios)
+    for start in range(0, n_scenarios, block):
+        rows = slice(start, start + block)
+        sq_dist = ylds[rows] @ ylds.T
+        sq_dist *= -2.0
+        sq_dist += sq_norms[rows, np.newaxis]
+        sq_dist += sq_norms[np.newaxis, :]
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        np.sqrt(sq_dist, out=dist[rows], casting='same_kind')
+    probs32 = probs.astype(np.float32)
+
+    selected = np.zeros(n_scenarios, dtype=bool)
+    kept = np.empty(n_keep, dtype=int)
+    for i in range(n_keep):
+        if cancel is not None:
+            cancel.check()
+        # z_u = sum_k p_k c(k, u): the distance left if u were selected next (selected rows are zero)
+        z = probs32 @ dist
+        z[selected] = np.inf
+        u = np.argmin(z)
+        kept[i] = u
+        selected[u] = True
+        # Each scenario's distance to the selected set, as seen by every candidate column.
+        # (The column is copied first: as an operand overlapping the output it would make NumPy copy all of dist.)
+        np.minimum(dist, dist[:, u].copy()[:, np.newaxis], out=dist)
+
+    # The kept columns all hold the distance to the kept set by now, so recompute the
+    # scenario-to-kept distances (n x K, cheap) to find each scenario's nearest kept scenario.
+    to_kept = sq_norms[:, np.newaxis] + sq_norms[kept][np.newaxis, :] - 2.0 * (ylds @ ylds[kept].T)
+    to_kept = np.sqrt(np.maximum(to_kept, 0.0))
+    nearest = np.argmin(to_kept, axis=1)
+    error = float(probs @ to_kept[np.arange(n_scenarios), nearest])
+    new_probs = np.bincount(nearest, weights=probs, minlength=n_keep)
+    return kept, new_probs, error
+
+def solve_extensive(total_land, probs, ylds, scenarios=None, cvar_weight=0.0, cvar_alpha=0.95, render="png"):
+    """
+    Solves the deterministic equivalent (extensive form) of the farmer problem in one LP.
+    The farmer model is a preset of the general two-stage solver: land is the only first-stage
+    row, and the recourse data comes from farmer_recourse.
+    With cvar_weight > 0 the objective mixes in the CVaR of the profit (auxiliary-variable formulation).
+    """
+    q, W, h, T = farmer_recourse(ylds)
+
+    # Optimization: q, W and h are shared by all scenarios and passed once (leading dimension 1);
+    # only T_s carries the yields, scattered into a cached CSC structure.
+    res = twostage.solve_two_stage(PLANTING_COSTS, W, q[np.newaxis], T, h[np.newaxis], probs,
+                                   A_ub=np.ones((1, 3)), b_ub=np.array([float(total_land)]),
+                                   cvar_weight=cvar_weight, cvar_alpha=cvar_alpha)
+
+    spec = None
+    if res["success"]:
+        scenario_profits = -res["recourse_costs"] - np.dot(res["x"], PLANTING_COSTS)
+        expected_profit = -res["expected_cost"] if cvar_weight > 0 else -res["objective"]
+        if scenarios is not None:
+            spec = stochastic_plot_spec(res["x"], expected_profit, scenarios, scenario_profits)
+
+    result = {
+        "success": res["success"],
+        "method": "extensive",
+        "x": res["x"].tolist() if res["success"] else None,
+        "expected_profit": expected_profit if res["success"] else None,
+        **plotting.output(spec, render)
+    }
+    if cvar_weight > 0:
+        result["cvar"] = -res["cvar"] if res["success"] else None
+    return result
+
+def solve_frontier(total_land, probs, ylds, cvar_weight=0.0, cvar_alpha=0.95, n_points=11, tol=1e-6, scenarios=None,
+                   render="png"):
+    """
+    Mean-CVaR frontier of the farmer problem: the plan maximizing (1 - lam) E[profit] + lam CVaR[profit]
+    for n_points weights lam evenly spread over [0, 1] (plus cvar_weight, whose plan is the main result).
+    """
+    # Optimization: Sweep the weights with the L-shaped frontier and the closed-form farmer recourse.
+    # No LP over the scenarios is built, and every weight restarts from the cuts of the previous ones,
+    # so the whole frontier costs less than a single extensive-form solve beyond a few thousand scenarios.
+    weights = np.union1d(np.linspace(0.0, 1.0, n_points), [cvar_weight])
+    q, W, h, T = farmer_recourse(ylds)
+    res = twostage.two_stage_frontier(PLANTING_COSTS, W, q[np.newaxis], T, h[np.newaxis], probs,
+                                      A_ub=np.ones((1, 3)), b_ub=np.array([float(total_land)]),
+                                      cvar_alpha=cvar_alpha, weights=weights, tol=tol,
+                                      recourse=FarmerRecourse(ylds))
+    if not res["success"]:
+        return {"success": False, "method": "frontier", "x": None, "expected_profit": None,
+                "cvar": None, "frontier": None, **plotting.output(None, render)}
+
+    frontier = [{"weight": p["weight"], "x": p["x"].tolist(), "expected_profit": -p["expected_cost"],
+                 "cvar": -p["cvar"]} for p in res["points"]]
+    chosen = res["points"][int(np.searchsorted(weights, cvar_weight))]
+
+    spec = None
+    if scenarios is not None:
+        scenario_profits = -chosen["recourse_costs"] - np.dot(chosen["x"], PLANTING_COSTS)
+        spec = stochastic_plot_spec(chosen["x"], -chosen["expected_cost"], scenarios, scenario_profits)
 
     return {
-        "success": res.success,
-        "x": res.x[0:3].tolist() if res.x is not None else None,
-        "expected_profit": -res.fun if res.success else None,
-        "plot": img_b64
+        "success": True,
+        "method": "frontier",
+        "x": chosen["x"].tolist(),
+        "expected_profit": -chosen["expected_cost"],
+        "cvar": -chosen["cvar"],
+        "cvar_alpha": cvar_alpha,
+        "frontier": frontier,
+        "converged": res["converged"],
+        "iterations": res["iterations"],
+        **plotting.output(spec, render)
     }
 
-def plot_stochastic(acres, profit, scenarios, probs, all_x, n_scenarios):
-    # Use Matplotlib Object-Oriented Interface for thread safety and performance
-    fig = Figure(figsize=(10, 5))
-    ax1 = fig.add_subplot(121)
-    ax2 = fig.add_subplot(122)
-
-    # Plot 1: Acres Allocation
-    crops = ['Wheat', 'Corn', 'Beets']
-    ax1.bar(crops, acres, color=['gold', 'orange', 'purple'])
-    ax1.set_title('Acres Planted')
-    ax1.set_ylabel('Acres')
-
-    # Plot 2: Profit Distribution (Scenario Profits)
-    # Calculate profit per scenario
-    # Profit_s = Revenue_s - Cost_Planting
-    cost_planting = np.dot(acres, [150, 230, 260])
-    # Optimization: Reshape all_x into a 2D matrix (n_scenarios x 6) and use vectorized operations
-    # and dot products to calculate scenario profits instantly, replacing the slow Python list appending loop.
-    sell_price_arr = np.array([170, 150, 36, 10])
-    buy_price_arr = np.array([238, 210])
-
-    scenario_vars = all_x[3:3 + n_scenarios * 6].reshape(n_scenarios, 6)
-    revenues = np.dot(scenario_vars[:, [0, 1, 4, 5]], sell_price_arr)
-    cost_purchases = np.dot(scenario_vars[:, [2, 3]], buy_price_arr)
-
-    scenario_profits = revenues - cost_purchases - cost_planting
+def farmer_recourse(ylds):
+    """
+    Writes the farmer's second stage as min q.y s.t. W y <= h - T_s x, y >= 0, with
+    y = (sold wheat, sold corn, bought wheat, bought corn, quota beets, excess beets).
+    Beet sales are bounded by the harvest; selling is always profitable, so this row binds.
+    W, q and h are shared by all scenarios; only T_s (n_scenarios x 4 x 3) carries the yields.
+    """
+    q = np.concatenate([-SELL_PRICE[:2], BUY_PRICE, -SELL_PRICE[2:]])
+    W = np.array([
+        [1, 0, -1, 0, 0, 0], # wheat sold - bought <= harvest - demand
+        [0, 1, 0, -1, 0, 0], # corn sold - bought <= harvest - demand
+        [0, 0, 0, 0, 1, 0],  # quota beets <= quota
+        [0, 0, 0, 0, 1, 1],  # beets sold <= harvest
+    ], dtype=float)
+    h = np.array([-DEMANDS[0], -DEMANDS[1], BEETS_QUOTA, 0.0])
+    T = np.zeros((ylds.shape[0], 4, 3))
+    T[:, 0, 0] = -ylds[:, 0]
+    T[:, 1, 1] = -ylds[:, 1]
+    T[:, 3, 2] = -ylds[:, 2]
+    return q, W, h, T
+
+def solve_lshaped(total_land, probs, ylds, max_iter=50, tol=1e-6, max_cut_groups=100, scenarios=None, render="png",
+                  time_limit=None, progress=None, cancel=None):
+    """
+    Multi-cut L-shaped method for the farmer problem (complete recourse, so only optimality cuts).
+    Master: min c.x + sum_g theta_g s.t. land, theta_g >= sum_{s in g} p_s (Q_s(x_k) + g_s (x - x_k)),
+    with g_s a subgradient of the recourse cost Q_s at x_k.
+    Stops at a relative gap of tol, after max_iter iterations or once time_limit seconds have passed
+    (stop_reason); progress is called after each iteration with its profit bounds.
+    """
+    n_scenarios = probs.size
+    # Optimization: The recourse values and subgradients come from the closed-form farmer recourse,
+    # so an iteration costs a few vectorized passes over the scenarios instead of the recourse LPs.
+    recourse = FarmerRecourse(ylds)
+
+    # Contiguous scenario groups share one theta; with one group per scenario this is pure multi-cut
+    n_groups = min(n_scenarios, max_cut_groups)
+    group = np.arange(n_scenarios) * n_groups // n_scenarios
+
+    c = np.concatenate([PLANTING_COSTS, np.ones(n_groups)])
+    master_bounds = [(0, None)] * 3 + [(None, None)] * n_groups
+
+    # Optimization: The master's rows live in preallocated CSR arrays instead of a dense matrix that is
+    # rebuilt with vstack every iteration. Row 0 is the land row (3 entries) and every cut row has exactly
+    # 4 entries (G_g and -1 for theta_g), so indptr is fixed and adding cuts only writes into the arrays.
+    max_rows = 1 + max_iter * n_groups
+    indptr = np.concatenate([[0], 3 + 4 * np.arange(max_rows)])
+    indices = np.empty(indptr[-1], dtype=np.int32)
+    data = np.empty(indptr[-1])
+    b_ub = np.empty(max_rows)
+    indices[:3], data[:3], b_ub[0] = np.arange(3), 1.0, total_land
+    cut_columns = np.column_stack([np.tile(np.arange(3), (n_groups, 1)), 3 + np.arange(n_groups)])
+    n_rows = 1
+
+    # Start from the cheapest first stage (nothing planted), which is feasible whenever the master is
+    x = np.zeros(3)
+    theta = np.full(n_groups, -np.inf)
+    if total_land < 0:
+        return {"success": False, "method": "lshaped", "x": None, "expected_profit": None,
+                "iterations": 0, "logs": ["Master problem is infeasible"], **plotting.output(None, render)}
+
+    lb = -np.inf
+    ub = np.inf
+    best_x = x
+    best_Q = None
+    logs = []
+    converged = False
+    stop_reason = "max_iter"
+    start_time = time.perf_counter()
+
+    for k in range(max_iter):
+        if cancel is not None:
+            cancel.check()
+        Q, grad = recourse(x)
+        cost = np.dot(PLANTING_COSTS, x) + np.dot(probs, Q)
+        if cost < ub:
+            ub, best_x, best_Q = cost, x, Q
+
+        gap = (ub - lb) / max(abs(ub), 1e-9)
+        message = f"Iter {k}: LB={-ub:.2f}, UB={-lb:.2f}, gap={gap:.2e}"
+        logs.append(message)
+        if progress is not None:
+            progress(iteration=k + 1, lb=float(-ub), ub=float(-lb) if lb != -np.inf else None, message=message)
+        if gap <= tol:
+            converged = True
+            stop_reason = "gap"
+            break
+        if time_limit is not None and time.perf_counter() - start_time >= time_limit:
+            stop_reason = "time_limit"
+            break
+
+        # Optimality cuts, aggregated per group from the subgradients of Q_s at x
+        grad *= probs[:, np.newaxis]
+        G = np.column_stack([np.bincount(group, weights=grad[:, j], minlength=n_groups) for j in range(3)])
+        value = np.bincount(group, weights=probs * Q, minlength=n_groups)
+        # Optimization: Only groups whose theta underestimates their recourse at x get a new cut;
+        # the others' cuts would not change the master's solution.
+        cut = value > theta + 1e-9 * np.maximum(np.abs(value), 1.0)
+        if not cut.any():
+            # The master already prices every group exactly at x, so lb = ub up to the solver's precision
+            converged = True
+            stop_reason = "gap"
+            break
+        n_cuts = int(cut.sum())
+        # G_g x - theta_g <= -const_g, with const_g = value_g - G_g x
+        entries = slice(indptr[n_rows], indptr[n_rows + n_cuts])
+        indices[entries] = cut_columns[cut].ravel()
+        data[entries] = np.column_stack([G[cut], np.full(n_cuts, -1.0)]).ravel()
+        b_ub[n_rows:n_rows + n_cuts] = G[cut] @ x - value[cut]
+        n_rows += n_cuts
+
+        A_ub = sp.csr_matrix((data[:indptr[n_rows]], indices[:indptr[n_rows]], indptr[:n_rows + 1]),
+                             shape=(n_rows, 3 + n_groups))
+        res = linprog(c, A_ub=A_ub, b_ub=b_ub[:n_rows], bounds=master_bounds, method='highs')
+        if not res.success:
+            return {"success": False, "method": "lshaped", "x": None, "expected_profit": None,
+                    "iterations": k + 1, "logs": logs + ["Master problem failed"], **plotting.output(None, render)}
+        x = res.x[:3]
+        theta = res.x[3:]
+        lb = res.fun
+
+    scenario_profits = -best_Q - np.dot(PLANTING_COSTS, best_x)
+    spec = None
+    if scenarios is not None:
+        spec = stochastic_plot_spec(best_x, -ub, scenarios, scenario_profits)
+
+    return {
+        "success": True,
+        "method": "lshaped",
+        "x": best_x.tolist(),
+        "expected_profit": float(-ub),
+        # Bounds on the expected profit: the best evaluated plan and the master relaxation
+        "profit_bounds": [float(-ub), float(-lb)],
+        "converged": converged,
+        "stop_reason": stop_reason,
+        "iterations": len(logs),
+        "cut_groups": n_groups,
+        "logs": logs,
+        **plotting.output(spec, render)
+    }
 
+def _farmer_slopes(ylds):
+    """
+    Per-crop marginal profit per acre below and above each crop's kink (demand met or quota filled),
+    and the kink in acres. Profit is concave piecewise linear in each crop's acres.
+    """
+    below = np.column_stack([BUY_PRICE[0] * ylds[:, 0], BUY_PRICE[1] * ylds[:, 1], SELL_PRICE[2] * ylds[:, 2]]) - PLANTING_COSTS
+    above = np.column_stack([SELL_PRICE[0] * ylds[:, 0], SELL_PRICE[1] * ylds[:, 1], SELL_PRICE[3] * ylds[:, 2]]) - PLANTING_COSTS
+    targets = np.array([DEMANDS[0], DEMANDS[1], BEETS_QUOTA])
+    # A crop with zero yield never reaches its kink
+    kink = np.divide(targets, ylds, out=np.full(ylds.shape, np.inf), where=ylds > 0)
+    return below, above, kink
+
+def _ph_subproblems(ylds, w, x_bar, rho, total_land, bisect_iter=30):
+    """
+    Solves max profit_s(x) - w_s.x - rho/2 ||x - x_bar||^2 s.t. sum(x) <= total_land, x >= 0 for every
+    scenario at once. The objective is separable per crop apart from the land constraint, so each
+    crop's optimum is closed form for a given land price, which is found by vectorized bisection.
+    """
+    below, above, kink = _farmer_slopes(ylds)
+    center = x_bar - w / rho
+
+    def acres(land_price):
+        # Stationary point on each linear piece; if neither lies on its own piece, the kink is optimal
+        on_below = center + (below - land_price) / rho
+        on_above = center + (above - land_price) / rho
+        return np.where(on_below <= kink, np.maximum(on_below, 0.0), np.where(on_above >= kink, on_above, kink))
+
+    x = acres(np.zeros((ylds.shape[0], 1)))
+    over = np.flatnonzero(x.sum(axis=1) > total_land)
+    if over.size:
+        # Bisection on the land multiplier, only for scenarios whose unconstrained optimum overuses land.
+        # At hi every crop's stationary point is <= 0, so hi is always land-feasible.
+        below, above, kink, center = below[over], above[over], kink[over], center[over]
+        lo = np.zeros((over.size, 1))
+        hi = np.max(below + rho * center, axis=1, keepdims=True)
+        used_lo = acres(lo).sum(axis=1, keepdims=True)
+        used_hi = acres(hi).sum(axis=1, keepdims=True)
+        for _ in range(bisect_iter):
+            mid = 0.5 * (lo + hi)
+            used = acres(mid).sum(axis=1, keepdims=True)
+            fits = used <= total_land
+            hi, used_hi = np.where(fits, mid, hi), np.where(fits, used, used_hi)
+            lo, used_lo = np.where(fits, lo, mid), np.where(fits, used_lo, used)
+        # Land use is piecewise linear in the price, so interpolating within the final bracket is
+        # exact once it holds a single piece; otherwise fall back to the feasible end of the bracket.
+        price = lo + (used_lo - total_land) / np.maximum(used_lo - used_hi, 1e-300) * (hi - lo)
+        x_over = acres(price)
+        infeasible = x_over.sum(axis=1, keepdims=True) > total_land + 1e-9
+        x[over] = np.where(infeasible, acres(hi), x_over)
+    return x
+
+def _farmer_deterministic(total_land, ylds):
+    """
+    Optimal plan of every scenario with its yields known (the wait-and-see plans) in closed form:
+    a fractional knapsack over the crops' linear pieces, filling land with the most profitable first.
+    """
+    below, above, kink = _farmer_slopes(ylds)
+    slopes = np.hstack([below, above])
+    lengths = np.hstack([kink, np.full(kink.shape, np.inf)])
+    order = np.argsort(-slopes, axis=1, kind='stable')
+    slopes = np.take_along_axis(slopes, order, axis=1)
+    lengths = np.take_along_axis(lengths, order, axis=1)
+    used_before = np.zeros(lengths.shape)
+    np.cumsum(lengths[:, :-1], axis=1, out=used_before[:, 1:])
+    taken = np.where(slopes > 0, np.clip(total_land - used_before, 0.0, lengths), 0.0)
+    # Below pieces are never less profitable than their crop's above piece, so they fill first
+    x = np.zeros(ylds.shape)
+    np.add.at(x, (np.arange(ylds.shape[0])[:, np.newaxis], order % 3), taken)
+    return x
+
+# Yields of the scenarios handled by a progressive hedging worker process, set once by its initializer
+_ph_worker_ylds = None
+
+def _ph_init(ylds):
+    global _ph_worker_ylds
+    _ph_worker_ylds = ylds
+
+def _ph_chunk(start, stop, w, x_bar, rho, total_land):
+    return _ph_subproblems(_ph_worker_ylds[start:stop], w, x_bar, rho, total_land)
+
+def ph_workers(n_scenarios):
+    """Worker processes worth using for progressive hedging: one per PH_CHUNK_SCENARIOS, up to the CPU count."""
+    return max(1, min(os.cpu_count() or 1, n_scenarios // PH_CHUNK_SCENARIOS))
+
+def solve_progressive_hedging(total_land, probs, ylds, rho=1.0, max_iter=50, tol=1e-3, workers=1, scenarios=None,
+                              render="png", adapt_rho=True, time_limit=None, progress=None, cancel=None):
+    """
+    Progressive hedging (Rockafellar & Wets) for the farmer problem. Every scenario plans its own
+    first stage x_s; augmented Lagrangian terms w_s.x + rho/2 ||x - x_bar||^2 drive the plans to the
+    probability-weighted consensus x_bar. Stops once both the expected distance of the plans to x_bar
+    and the last move of x_bar are within tol * total_land acres. With adapt_rho, rho starts at the given
+    value and is rebalanced between iterations (see PH_RHO_BALANCE). Scenario chunks are solved in a
+    process pool when workers > 1, each worker receiving the yields once.
+    time_limit, progress and cancel work as in solve_lshaped.
+    """
+    n_scenarios = probs.size
+    if total_land < 0:
+        return {"success": False, "method": "ph", "x": None, "expected_profit": None,
+                "iterations": 0, "logs": ["Land must be non-negative"], **plotting.output(None, render)}
+    if rho <= 0:
+        raise ValueError("rho must be positive")
+    check_probabilities(probs)
+
+    weights = probs / probs.sum()
+    # Iteration 0: each scenario's own optimal plan, without any penalty
+    X = _farmer_deterministic(total_land, ylds)
+    x_bar = weights @ X
+    W = rho * (X - x_bar)
+
+    bounds = np.linspace(0, n_scenarios, min(workers, n_scenarios) + 1).astype(int)
+    chunks = list(zip(bounds[:-1], bounds[1:]))
+    pool = None
+    if len(chunks) > 1:
+        pool = ProcessPoolExecutor(max_workers=len(chunks), initializer=_ph_init, initargs=(ylds,),
+                                   mp_context=processes.context())
+
+    logs = []
+    converged = False
+    stop_reason = "max_iter"
+    start_time = time.perf_counter()
+    try:
+        for k in range(max_iter):
+            if cancel is not None:
+                cancel.check()
+            if pool is None:
+                X = _ph_subproblems(ylds, W, x_bar, rho, total_land)
+            else:
+                futures = [pool.submit(_ph_chunk, a, b, W[a:b], x_bar, rho, total_land) for a, b in chunks]
+                X = np.concatenate([f.result() for f in futures])
+            x_prev, x_bar = x_bar, weights @ X
+            W += rho * (X - x_bar)
+            # Non-anticipativity residual: expected distance of the scenario plans to the consensus.
+            # The consensus must also have stopped moving, or a large rho could freeze it early.
+            residual = weights @ np.linalg.norm(X - x_bar, axis=1)
+            shift = np.linalg.norm(x_bar - x_prev)
+            message = (f"Iter {k}: x_bar=({x_bar[0]:.2f}, {x_bar[1]:.2f}, {x_bar[2]:.2f}), "
+                       f"residual={residual:.4f}, shift={shift:.4f}, rho={rho:.3g}")
+            logs.append(message)
+            if progress is not None:
+                progress(iteration=k + 1, residual=float(residual), shift=float(shift), rho=float(rho), message=message)
+            if max(residual, shift) <= tol * total_land:
+                converged = True
+                stop_reason = "tol"
+                break
+            if time_limit is not None and time.perf_counter() - start_time >= time_limit:
+                stop_reason = "time_limit"
+                break
+            # A residual that dominates needs a stiffer penalty; a consensus still moving a lot needs a softer one.
+            # W already holds the multipliers themselves, so it stays valid when rho changes.
+            if adapt_rho:
+                if residual > PH_RHO_BALANCE * rho * shift:
+                    rho *= PH_RHO_FACTOR
+                elif rho * shift > PH_RHO_BALANCE * residual:
+                    rho /= PH_RHO_FACTOR
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    # x_bar is a convex combination of land-feasible plans, so it is feasible itself
+    scenario_profits = farmer_profits(x_bar[np.newaxis, :], ylds)[0]
+    expected_profit = float(scenario_profits @ probs)
+    spec = None
+    if scenarios is not None:
+        spec = stochastic_plot_spec(x_bar, expected_profit, scenarios, scenario_profits)
+
+    return {
+        "success": True,
+        "method": "ph",
+        "x": x_bar.tolist(),
+        "expected_profit": expected_profit,
+        "converged": converged,
+        "stop_reason": stop_reason,
+        "iterations": len(logs),
+        "residual": float(residual) if logs else None,
+        "logs": logs,
+        **plotting.output(spec, render)
+    }
+
+def solve_wait_and_see(total_land, ylds):
+    """
+    Solves the deterministic farmer problem of every scenario (planting with its yields known).
+    Returns (profits, X): the optimal profit and planting per scenario.
+    """
+    if total_land < 0:
+        raise ValueError("Wait-and-see problem is infeasible")
+    # Optimization: closed-form plans and recourse, no LP (about 150x faster than batched
+    # block-diagonal LPs at 1e5 scenarios)
+    X = _farmer_deterministic(total_land, ylds)
+    return farmer_plan_profits(X, ylds), X
+
+def stochastic_metrics(total_land, probs, ylds, rp, cancel=None):
+    """
+    EVPI = WS - RP and VSS = RP - EEV for the (maximized) recourse problem value RP, where WS is the
+    expected wait-and-see profit and EEV the expected profit of the mean-yield (EV) plan.
+    Both are closed form and take a few vectorized passes, so there is no time limit; cancel is checked between them.
+    """
+    ws_profits, _ = solve_wait_and_see(total_land, ylds)
+    ws = np.dot(probs, ws_profits)
+    if cancel is not None:
+        cancel.check()
+
+    # EV problem: the deterministic problem at expected yields, then evaluated over all scenarios
+    mean_ylds = probs @ ylds / np.sum(probs)
+    _, x_ev = solve_wait_and_see(total_land, mean_ylds[np.newaxis, :])
+    eev = np.dot(farmer_profits(x_ev, ylds)[0], probs)
+
+    return {
+        "wait_and_see": float(ws),
+        "ev_solution": x_ev[0].tolist(),
+        "eev": float(eev),
+        "evpi": float(ws - rp),
+        "vss": float(rp - eev)
+    }
+
+def farmer_profits(X, ylds):
+    """
+    Closed-form second stage of the farmer problem: profit of each candidate plan in each scenario.
+    The recourse is separable per crop. Wheat and corn surpluses over demand are sold, and
+    deficits are bought (buying costs more than selling earns, so never both). All beets are sold,
+    at the quota price up to the quota and the excess price above it.
+    X: (n_candidates, 3) planted acres, ylds: (n_scenarios, 3) yields. Returns (n_candidates, n_scenarios).
+    """
+    profits = -(X @ PLANTING_COSTS)[:, np.newaxis]
+    # Optimization: Work crop by crop on (n_candidates, n_scenarios) outer products instead of one
+    # 3D harvest tensor, keeping the peak temporary memory at a single 2D block.
+    for crop in range(2):
+        surplus = np.multiply.outer(X[:, crop], ylds[:, crop]) - DEMANDS[crop]
+        profits = profits + np.where(surplus >= 0, SELL_PRICE[crop], BUY_PRICE[crop]) * surplus
+    beets = np.multiply.outer(X[:, 2], ylds[:, 2])
+    quota_beets = np.minimum(beets, BEETS_QUOTA)
+    profits += SELL_PRICE[2] * quota_beets + SELL_PRICE[3] * (beets - quota_beets)
+    return profits
+
+def farmer_plan_profits(X, ylds):
+    """Profit of plan X[s] in scenario s (the diagonal of farmer_profits(X, ylds)), for (n, 3) X and ylds."""
+    harvest = X * ylds
+    profits = -(X @ PLANTING_COSTS)
+    for crop in range(2):
+        surplus = harvest[:, crop] - DEMANDS[crop]
+        profits += np.where(surplus >= 0, SELL_PRICE[crop], BUY_PRICE[crop]) * surplus
+    quota_beets = np.minimum(harvest[:, 2], BEETS_QUOTA)
+    profits += SELL_PRICE[2] * quota_beets + SELL_PRICE[3] * (harvest[:, 2] - quota_beets)
+    return profits
+
+class FarmerRecourse:
+    """
+    Closed-form farmer recourse oracle for twostage.two_stage_frontier: x -> (recourse cost Q_s(x),
+    its gradient in x) per scenario, in cost (not profit) terms and without the planting cost.
+    """
+    __slots__ = ['ylds', 'below', 'above', 'kink']
+
+    def __init__(self, ylds):
+        self.ylds = ylds
+        self.below, self.above, self.kink = _farmer_slopes(ylds)
+
+    def __call__(self, x):
+        Q = -farmer_profits(x[np.newaxis], self.ylds)[0] - x @ PLANTING_COSTS
+        # Each crop's profit is concave piecewise linear with one kink; either slope is valid at the kink
+        grad = -np.where(x < self.kink, self.below, self.above) - PLANTING_COSTS
+        return Q, grad
+
+def iter_scenario_chunks(ylds, probs, chunk_size=EVAL_CHUNK):
+    """Yields (yields, probabilities) views of chunk_size scenarios at a time."""
+    for start in range(0, ylds.shape[0], chunk_size):
+        yield ylds[start:start + chunk_size], probs[start:start + chunk_size]
+
+def evaluate_candidates(X, scenario_chunks):
+    """
+    Expected, minimum and maximum profit of each candidate first-stage plan over a stream of
+    scenario chunks, without solving any LP. Only one chunk is held at a time, so the number of
+    scenarios is limited by time rather than memory.
+    X: (n_candidates, 3) planted acres
+    scenario_chunks: iterable of (yields (n, 3), probabilities (n,)) arrays
+    """
+    X = np.asarray(X, dtype=float)
+    if X.ndim != 2 or X.shape[1] != 3:
+        raise ValueError("Candidates must be a list of 3 planted areas")
+    n_candidates = X.shape[0]
+
+    expected = np.zeros(n_candidates)
+    second_moment = np.zeros(n_candidates)
+    total_prob = 0.0
+    worst = np.full(n_candidates, np.inf)
+    best = np.full(n_candidates, -np.inf)
+    n_scenarios = 0
+    block = max(1, EVAL_BLOCK // n_candidates)
+
+    for ylds, probs in scenario_chunks:
+        ylds = np.asarray(ylds, dtype=float)
+        probs = np.asarray(probs, dtype=float)
+        if ylds.ndim != 2 or ylds.shape[1] != 3 or probs.shape != (ylds.shape[0],):
+            raise ValueError("Each scenario needs 3 yields and a probability")
+        for start in range(0, ylds.shape[0], block):
+            profits = farmer_profits(X, ylds[start:start + block])
+            expected += profits @ probs[start:start + block]
+            second_moment += np.square(profits) @ probs[start:start + block]
+            np.minimum(worst, profits.min(axis=1), out=worst)
+            np.maximum(best, profits.max(axis=1), out=best)
+        n_scenarios += ylds.shape[0]
+        total_prob += probs.sum()
+
+    if n_scenarios == 0:
+        raise ValueError("No scenarios to evaluate")
+
+    # Standard deviation under the probabilities normalized to sum to one
+    mean = expected / max(total_prob, 1e-300)
+    std = np.sqrt(np.maximum(second_moment / max(total_prob, 1e-300) - np.square(mean), 0.0))
+
+    return {
+        "n_scenarios": n_scenarios,
+        "expected_profit": expected.tolist(),
+        "std_profit": std.tolist(),
+        "min_profit": worst.tolist(),
+        "max_profit": best.tolist(),
+        "best_candidate": int(np.argmax(expected))
+    }
+
+def sample_yields(distributions, n_samples, rng, chunk_size=EVAL_CHUNK):
+    """
+    Yields (n, 3) arrays of sampled yields, chunk_size at a time, for the three crops'
+    distributions, each a (kind, params) pair. Yields are clipped at zero.
+    """
+    for start in range(0, n_samples, chunk_size):
+        size = min(chunk_size, n_samples - start)
+        chunk = np.empty((size, 3))
+        for crop, (kind, params) in enumerate(distributions):
+            if kind == "normal":
+                chunk[:, crop] = rng.normal(params[0], params[1], size)
+            elif kind == "uniform":
+                chunk[:, crop] = rng.uniform(params[0], params[1], size)
+            else:
+                chunk[:, crop] = rng.triangular(params[0], params[1], params[2], size)
+        np.maximum(chunk, 0.0, out=chunk)
+        yield chunk
+
+def _check_distributions(distributions):
+    if len(distributions) != 3:
+        raise ValueError("Need one yield distribution per crop")
+    for kind, params in distributions:
+        if YIELD_DISTRIBUTIONS.get(kind) != len(params):
+            raise ValueError(f"Invalid yield distribution '{kind}'")
+        if kind == "normal" and params[1] < 0:
+            raise ValueError("Standard deviation must be non-negative")
+        if kind == "uniform" and params[0] > params[1]:
+            raise ValueError("Uniform bounds must satisfy low <= high")
+        if kind == "triangular" and not (params[0] <= params[1] <= params[2] and params[0] < params[2]):
+            raise ValueError("Triangular parameters must satisfy low <= mode <= high with low < high")
+
+def _saa_replication(total_land, distributions, sample_size, seed, method, time_limit=None, cancel=None):
+    """Solves one SAA problem on its own seeded sample; returns (x, optimal SAA profit)."""
+    rng = np.random.default_rng(seed)
+    ylds = np.concatenate(list(sample_yields(distributions, sample_size, rng)))
+    probs = np.full(sample_size, 1.0 / sample_size)
+    res = solve_stochastic_arrays(total_land, probs, ylds, method=method, time_limit=time_limit, cancel=cancel)
+    if not res["success"]:
+        raise ValueError("SAA problem could not be solved")
+    return res["x"], res["expected_profit"]
+
+def _saa_map(args, cancel=None):
+    """
+    Solves the replications on the shared SAA pool, started on first use.
+    The token cannot cross into the workers, so it is polled here while they run: once it trips the
+    pending replications are dropped, and the running ones finish within their own time limit.
+    """
+    global _saa_pool
+    with _saa_pool_lock:
+        if _saa_pool is None:
+            _saa_pool = ProcessPoolExecutor(max_workers=SAA_WORKERS, mp_context=processes.context())
+        pool = _saa_pool
+    futures = [pool.submit(_saa_replication, *a) for a in args]
+    try:
+        for future in futures:
+            while cancel is not None:
+                try:
+                    future.result(timeout=SAA_CANCEL_POLL)
+                    break
+                except TimeoutError:
+                    cancel.check()
+        return [future.result() for future in futures]
+    except Cancelled:
+        for future in futures:
+            future.cancel()
+        raise
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory): the next request starts a fresh pool
+        with _saa_pool_lock:
+            if _saa_pool is pool:
+                _saa_pool = None
+        raise
+
+def solve_saa(total_land, distributions, sample_size=100, replications=10, eval_size=100_000,
+              seed=0, confidence=0.95, method="extensive", workers=None, render="png", time_limit=None, cancel=None):
+    """
+    Sample average approximation of the farmer problem with yields drawn from distributions.
+    Solves `replications` independent SAA problems of `sample_size` scenarios (on the shared process
+    pool when workers > 1), then scores every replication's plan on one common out-of-sample set of
+    `eval_size` scenarios with the closed-form recourse and picks the best. Scenarios only ever exist
+    as NumPy chunks.
+
+    For this maximization problem the mean SAA optimum estimates an upper bound on the true optimal
+    profit, and the chosen plan's profit on a second, independent sample of `eval_size` scenarios an
+    unbiased lower bound (Mak, Morton & Wood).
+    The reported gap is their difference with a one-sided confidence bound.
+    distributions: three (kind, params) pairs, see YIELD_DISTRIBUTIONS
+    time_limit: wall-clock budget in seconds of each replication's L-shaped / progressive hedging iterations
+    cancel: optional CancelToken, checked between replications and evaluation chunks (raises Cancelled once tripped)
+    """
+    _check_distributions(distributions)
+    if method not in STOCHASTIC_METHODS:
+        raise ValueError(f"Unknown method '{method}'")
+    if replications < 2 or sample_size < 1 or eval_size < 2:
+        raise ValueError("Need at least 2 replications, 1 sample and 2 evaluation scenarios")
+
+    # Independent, reproducible streams for every replication, the selection sample and the lower-bound sample
+    seeds = np.random.SeedSequence(seed).spawn(replications + 2)
+    args = [(total_land, distributions, sample_size, seeds[m], method, time_limit) for m in range(replications)]
+
+    if workers is None:
+        workers = min(replications, SAA_WORKERS)
+    if workers > 1:
+        results = _saa_map(args, cancel)
+    else:
+        results = [_saa_replication(*a, cancel=cancel) for a in args]
+
+    X = np.array([x for x, _ in results])
+    saa_values = np.array([v for _, v in results])
+
+    eval_probs = np.full(min(eval_size, EVAL_CHUNK), 1.0 / eval_size)
+
+    def eval_chunks(seed_seq):
+        for ylds in sample_yields(distributions, eval_size, np.random.default_rng(seed_seq)):
+            if cancel is not None:
+                cancel.check()
+            yield ylds, eval_probs[:ylds.shape[0]]
+
+    # The plan is chosen as the best of the candidates on one sample. The best of several sample means is
+    # biased upwards, so the lower bound is the chosen plan's mean on a second, independent sample.
+    selection = evaluate_candidates(X, eval_chunks(seeds[replications]))
+    best = selection["best_candidate"]
+    evaluation = evaluate_candidates(X[best:best + 1], eval_chunks(seeds[replications + 1]))
+
+    alpha = 1.0 - confidence
+    t = stats.t.ppf(1 - alpha / 2, replications - 1)
+    z = stats.norm.ppf(1 - alpha / 2)
+    ub = saa_values.mean()
+    ub_half = t * saa_values.std(ddof=1) / np.sqrt(replications)
+    lb = evaluation["expected_profit"][0]
+    lb_std = evaluation["std_profit"][0]
+    lb_half = z * lb_std / np.sqrt(eval_size)
+    gap = ub - lb
+    # One-sided bound: both estimator errors at their one-sided (1 - alpha) quantiles
+    gap_bound = gap + stats.t.ppf(confidence, replications - 1) * saa_values.std(ddof=1) / np.sqrt(replications) \
+        + stats.norm.ppf(confidence) * lb_std / np.sqrt(eval_size)
+
+    # Plot the chosen plan's profit distribution on a small fresh sample
+    plot_ylds = next(sample_yields(distributions, 1000, np.random.default_rng(seed)))
+    spec = stochastic_plot_spec(X[best], lb, None, farmer_profits(X[best:best + 1], plot_ylds)[0])
+
+    return {
+        "success": True,
+        "x": X[best].tolist(),
+        "expected_profit": lb,
+        "profit_ci": [float(lb - lb_half), float(lb + lb_half)],
+        "upper_bound": float(ub),
+        "upper_bound_ci": [float(ub - ub_half), float(ub + ub_half)],
+        "gap": float(gap),
+        "gap_ci_upper": float(gap_bound),
+        "confidence": confidence,
+        # eval_profit: the replication's plan on the selection sample
+        "replications": [{"x": x, "saa_profit": v, "eval_profit": e}
+                         for (x, v), e in zip(results, selection["expected_profit"])],
+        **plotting.output(spec, render)
+    }
+
+def plot_stochastic(acres, profit, scenarios, scenario_profits):
+    return plotting.render_b64(stochastic_plot_spec(acres, profit, scenarios, scenario_profits))
+
+def stochastic_plot_spec(acres, profit, scenarios, scenario_profits, bins=20):
+    """
+    Plot-ready planting plan and profit distribution: per-scenario profits with their names for up to
+    50 named scenarios, otherwise a histogram (counts and bin edges) of the scenario profits.
+    """
+    spec = {"kind": "stochastic", "acres": [float(a) for a in acres], "expected_profit": float(profit)}
     # Optimization: Don't plot individual bars if there are too many scenarios.
-    # Plotting thousands of bars is extremely slow (e.g., ~9s for 1000 bars) and visually unreadable.
-    # Instead, plot a histogram to show the distribution of profits.
-    if n_scenarios <= 50:
-        ax2.bar([s['name'] for s in scenarios], scenario_profits, color='skyblue')
-        ax2.axhline(profit, color='red', linestyle='--', label=f'Exp: {profit:.0f}')
+    # Plotting thousands of bars is extremely slow (e.g., ~9s for 1000 bars) and visually unreadable,
+    # and the series would dominate the response. Instead, bin the profits into a histogram.
+    if len(scenario_profits) <= 50 and scenarios is not None:
+        spec["scenario_names"] = [s['name'] for s in scenarios]
+        spec["scenario_profits"] = [float(p) for p in scenario_profits]
     else:
-        ax2.hist(scenario_profits, bins=20, color='skyblue', edgecolor='black', alpha=0.7)
-        ax2.set_xlabel('Profit')
-        ax2.set_ylabel('Frequency')
-        ax2.axvline(profit, color='red', linestyle='--', label=f'Exp: {profit:.0f}')
-
-    ax2.set_title('Profit per Scenario')
-    ax2.legend()
-
-    fig.tight_layout()
-    buf = io.BytesIO()
-    canvas = FigureCanvasAgg(fig)
-    canvas.print_png(buf)
-
-    buf.seek(0)
-    img_str = base64.b64encode(buf.read()).decode('utf-8')
-    # No need to explicitly close fig as it is garbage collected
-    return img_str
+        counts, edges = np.histogram(scenario_profits, bins=bins)
+        spec["histogram"] = {"counts": counts.tolist(), "edges": edges.tolist()}
+    return spec
@@ -0,0 +1,411 @@
+import numpy as np
+from scipy.optimize import linprog
+import scipy.sparse as sp
+from functools import lru_cache
+
+# Extensive-form CSC templates kept, one per distinct structure (LRU)
+TEMPLATE_CACHE_SIZE = 16
+
+# Scenarios per block-diagonal recourse LP
+RECOURSE_CHUNK = 2000
+
+# Weight margin keeping both objective terms active in single-weight mean-CVaR solves
+CVAR_WEIGHT_EPS = 1e-6
+# L-shaped master solves per frontier point
+MAX_FRONTIER_ITER = 200
+
+def solve_two_stage(c, W, q, T, h, probs, A_ub=None, b_ub=None, cvar_weight=0.0, cvar_alpha=0.95):
+    """
+    Solves a general two-stage stochastic LP through its extensive form:
+    Minimize: c^T x + sum_s p_s q_s^T y_s
+    Subject to: A_ub x <= b_ub
+                T_s x + W y_s <= h_s   for every scenario s
+                x, y_s >= 0
+    c: (n_x,) first-stage costs, W: (m2, n_y) fixed recourse matrix, stored once for all scenarios
+    q: (S, n_y), T: (S, m2, n_x), h: (S, m2) per-scenario data; a leading dimension of 1 is shared
+    probs: (S,) scenario probabilities
+    Equality rows can be written as two opposite inequalities.
+    cvar_weight, cvar_alpha: with a weight lam > 0, minimizes (1 - lam) E[cost] + lam CVaR_alpha[cost]
+                             instead, where CVaR_alpha is the expected cost of the worst 1 - alpha tail.
+    """
+    cost, A, rhs, q = extensive_form(c, W, q, T, h, probs, A_ub, b_ub)
+    n_x = np.size(c)
+    n_scenarios, n_y = q.shape
+
+    if cvar_weight > 0:
+        form = RiskForm(cost, A, rhs, c, q, probs, cvar_alpha)
+        point = form.solve(cvar_weight)
+        if point is None:
+            return {"success": False, "message": form.message, "x": None, "objective": None, "recourse_costs": None}
+        return {"success": True, "message": form.message, **point}
+
+    res = linprog(cost, A_ub=A, b_ub=rhs, bounds=(0, None), method='highs')
+
+    if not res.success:
+        return {"success": False, "message": res.message, "x": None, "objective": None, "recourse_costs": None}
+
+    y = res.x[n_x:].reshape(n_scenarios, n_y)
+    return {
+        "success": True,
+        "message": res.message,
+        "x": res.x[:n_x],
+        "objective": float(res.fun),
+        # q_s^T y_s per scenario, without the probability weight
+        "recourse_costs": np.einsum('sj,sj->s', q, y)
+    }
+
+def two_stage_frontier(c, W, q, T, h, probs, A_ub=None, b_ub=None, cvar_alpha=0.95, weights=None,
+                       tol=1e-6, max_iter=MAX_FRONTIER_ITER, max_cut_groups=1, recourse=None):
+    """
+    Mean-CVaR efficient frontier of a two-stage LP: the plan minimizing (1 - lam) E[cost] + lam CVaR[cost]
+    for every CVaR weight lam in `weights` (default 0, 0.1, ..., 1), to a relative gap of tol.
+    Sweeps the weights in increasing order with an L-shaped (Benders) master over x. Expected-cost
+    cuts (one per scenario group, at most max_cut_groups) and CVaR cuts do not depend on the weight,
+    so every point restarts from all cuts and evaluated plans of the previous ones.
+    recourse: optional callable x -> (Q (S,), dQ/dx (S, n_x)) replacing the recourse LPs, e.g. a closed form
+    Returns {"success", "message", "points": one dict per weight (in the given order), "iterations", "converged"}.
+    """
+    weights = np.linspace(0.0, 1.0, 11) if weights is None else np.asarray(weights, dtype=float)
+    if weights.ndim != 1 or weights.size == 0 or np.any((weights < 0) | (weights > 1)):
+        raise ValueError("Frontier weights must lie in [0, 1]")
+    if not 0 <= cvar_alpha < 1:
+        raise ValueError("CVaR confidence level must lie in [0, 1)")
+
+    # Reuse the extensive-form validation; the matrix itself is never built
+    c, W, q, T, h, probs, A_ub, b_ub = _check_two_stage(c, W, q, T, h, probs, A_ub, b_ub)
+    n_x = c.size
+    n_scenarios = probs.size
+    if abs(probs.sum() - 1.0) > 1e-6:
+        raise ValueError("CVaR needs probabilities that sum to one")
+
+    # Master variables: x, theta_g (expected recourse of group g), theta_C (CVaR of the total cost)
+    n_groups = min(n_scenarios, max_cut_groups)
+    group = np.arange(n_scenarios) * n_groups // n_scenarios
+    n_master = n_x + n_groups + 1
+    master_bounds = [(0, None)] * n_x + [(None, None)] * (n_groups + 1)
+    A_rows = [np.hstack([A_ub, np.zeros((A_ub.shape[0], n_groups + 1))])]
+    b_rows = [b_ub]
+
+    # Evaluated plans: x, expected cost, CVaR
+    plans, means, tails = [], [], []
+
+    if recourse is None:
+        def recourse(x):
+            Q, pi = solve_recourse(x, q, W, h, T)
+            # -pi_s T_s is a subgradient of Q_s at x
+            return Q, -np.einsum('sr,src->sc', pi, T)
+
+    def evaluate(x):
+        Q, grad = recourse(x)
+        losses = x @ c + Q
+        plans.append(x)
+        means.append(float(probs @ losses))
+        tails.append(cvar(losses, probs, cvar_alpha))
+
+        # Expected-cost cuts, aggregated per group
+        weighted = grad * probs[:, np.newaxis]
+        G = np.column_stack([np.bincount(group, weights=weighted[:, j], minlength=n_groups) for j in range(n_x)])
+        const = np.bincount(group, weights=probs * Q, minlength=n_groups) - G @ x
+        rows = np.zeros((n_groups + 1, n_master))
+        rows[:n_groups, :n_x] = G
+        rows[np.arange(n_groups), n_x + np.arange(n_groups)] = -1.0
+        # CVaR cut: the tail weights of the current losses give a subgradient c + sum_s w_s grad_s
+        tail_w = _cvar_weights(losses, probs, cvar_alpha)
+        g_cvar = c + tail_w @ grad
+        rows[n_groups, :n_x] = g_cvar
+        rows[n_groups, -1] = -1.0
+        A_rows.append(rows)
+        b_rows.append(np.concatenate([-const, [g_cvar @ x - tails[-1]]]))
+
+    # Start from the cheapest first stage (nothing planted) when it is feasible
+    start = np.zeros(n_x)
+    if np.any(b_ub < 0):
+        res = linprog(c, A_ub=A_ub, b_ub=b_ub, bounds=(0, None), method='highs')
+        if not res.success:
+            return {"success": False, "message": res.message, "points": None, "iterations": 0, "converged": False}
+        start = res.x
+    evaluate(start)
+
+    best = {}
+    iterations = 0
+    converged = True
+    for lam in np.unique(weights):
+        objective = np.concatenate([(1 - lam) * c, np.full(n_groups, 1 - lam), [lam]])
+        for _ in range(max_iter):
+            scores = (1 - lam) * np.array(means) + lam * np.array(tails)
+            k = int(np.argmin(scores))
+            res = linprog(objective, A_ub=np.vstack(A_rows), b_ub=np.concatenate(b_rows),
+                          bounds=master_bounds, method='highs')
+            iterations += 1
+            if not res.success:
+                return {"success": False, "message": res.message, "points": None,
+                        "iterations": iterations, "converged": False}
+            if scores[k] - res.fun <= tol * max(abs(scores[k]), 1.0):
+                break
+            evaluate(res.x[:n_x])
+        else:
+            converged = False
+        scores = (1 - lam) * np.array(means) + lam * np.array(tails)
+        best[lam] = int(np.argmin(scores))
+
+    # Per-scenario recourse costs of the chosen plans
+    recourse_costs = {k: recourse(plans[k])[0] for k in set(best.values())}
+    points = []
+    for w in weights:
+        k = best[w]
+        points.append({
+            "weight": float(w),
+            "x": plans[k],
+            "objective": (1 - w) * means[k] + w * tails[k],
+            "expected_cost": means[k],
+            "cvar": tails[k],
+            "recourse_costs": recourse_costs[k]
+        })
+    return {"success": True, "message": "Optimization terminated successfully.", "points": points,
+            "iterations": iterations, "converged": converged}
+
+def cvar(losses, probs, alpha):
+    """
+    CVaR_alpha of a discrete loss distribution: the expected loss in the worst 1 - alpha
+    probability tail, min_eta eta + sum_s p_s (L_s - eta)^+ / (1 - alpha).
+    """
+    return float(_cvar_weights(losses, probs, alpha) @ losses)
+
+def _cvar_weights(losses, probs, alpha):
+    """Tail weights w (sum 1, 0 <= w_s <= p_s / (1 - alpha)) with CVaR_alpha = w.L; w is a subgradient of CVaR in L."""
+    order = np.argsort(losses)[::-1]
+    # Probability mass of each scenario inside the worst 1 - alpha tail
+    before = np.concatenate([[0.0], np.cumsum(probs[order])[:-1]])
+    mass = np.clip((1 - alpha) - before, 0.0, probs[order])
+    w = np.empty_like(probs)
+    w[order] = mass / (1 - alpha)
+    return w
+
+class RiskForm:
+    """
+    Extensive form with the Rockafellar-Uryasev CVaR variables appended: z = (x, y, eta, u) with
+    u_s >= c.x + q_s.y_s - eta, u_s >= 0 and eta free, so that
+    CVaR_alpha[cost] = min eta + sum_s p_s u_s / (1 - alpha).
+    The matrix is built once; solve(weight) only changes the objective.
+    """
+
+    def __init__(self, cost, A, rhs, c, q, probs, alpha):
+        if not 0 <= alpha < 1:
+            raise ValueError("CVaR confidence level must lie in [0, 1)")
+        probs = np.asarray(probs, dtype=float)
+        # Security: eta's objective coefficient is 1 - sum(p) / (1 - alpha), unbounded below unless the probabilities sum to one
+        if abs(probs.sum() - 1.0) > 1e-6:
+            raise ValueError("CVaR needs probabilities that sum to one")
+
+        c = np.asarray(c, dtype=float)
+        n_scenarios, n_y = q.shape
+        n_x = c.size
+        n_z = cost.size
+        self.n_x, self.q, self.c, self.probs, self.alpha = n_x, q, c, probs, alpha
+
+        # Optimization: One COO construction for all S scenario-cost rows (vectorized index arithmetic)
+        scenario = np.arange(n_scenarios)[:, np.newaxis]
+        x_cols = np.flatnonzero(c)
+        rows = np.concatenate([
+            np.repeat(np.arange(n_scenarios), x_cols.size),
+            np.repeat(np.arange(n_scenarios), n_y),
+            np.arange(n_scenarios),
+            np.arange(n_scenarios),
+        ])
+        cols = np.concatenate([
+            np.tile(x_cols, n_scenarios),
+            (n_x + scenario * n_y + np.arange(n_y)).ravel(),
+            np.full(n_scenarios, n_z),
+            n_z + 1 + np.arange(n_scenarios),
+        ])
+        vals = np.concatenate([np.tile(c[x_cols], n_scenarios), q.ravel(), -np.ones(2 * n_scenarios)])
+        risk_rows = sp.coo_matrix((vals, (rows, cols)), shape=(n_scenarios, n_z + 1 + n_scenarios))
+        self.A = sp.vstack([sp.hstack([A, sp.csc_matrix((A.shape[0], 1 + n_scenarios))]), risk_rows], format='csc')
+        self.rhs = np.concatenate([rhs, np.zeros(n_scenarios)])
+        self.bounds = np.zeros((n_z + 1 + n_scenarios, 2))
+        self.bounds[:, 1] = np.inf
+        self.bounds[n_z, 0] = -np.inf
+
+        # Expected-cost and CVaR objectives over z
+        self.mean_cost = np.concatenate([cost, np.zeros(1 + n_scenarios)])
+        self.cvar_cost = np.concatenate([np.zeros(n_z), [1.0], probs / (1 - alpha)])
+        self.solves = 0
+        self.message = ""
+
+    def solve(self, weight):
+        """Minimizes (1 - weight) E[cost] + weight CVaR[cost]; returns the solution point, or None if the LP fails."""
+        # Keep both terms in play so the recourse stays optimal in every scenario (weight 1) and
+        # eta, u describe the tail exactly (weight 0); the reported values are recomputed exactly below
+        w = min(max(weight, CVAR_WEIGHT_EPS), 1 - CVAR_WEIGHT_EPS)
+        res = linprog((1 - w) * self.mean_cost + w * self.cvar_cost, A_ub=self.A, b_ub=self.rhs,
+                      bounds=self.bounds, method='highs')
+        self.solves += 1
+        self.message = res.message
+        if not res.success:
+            return None
+
+        n_scenarios, n_y = self.q.shape
+        x = res.x[:self.n_x]
+        recourse = np.einsum('sj,sj->s', self.q, res.x[self.n_x:self.n_x + n_scenarios * n_y].reshape(n_scenarios, n_y))
+        losses = x @ self.c + recourse
+        expected_cost = float(self.probs @ losses)
+        tail_cost = cvar(losses, self.probs, self.alpha)
+        return {
+            "x": x,
+            "objective": (1 - weight) * expected_cost + weight * tail_cost,
+            "expected_cost": expected_cost,
+            "cvar": tail_cost,
+            "recourse_costs": recourse
+        }
+
+def extensive_form(c, W, q, T, h, probs, A_ub=None, b_ub=None):
+    """
+    Validates the two-stage data and builds the extensive form min cost.z s.t. A z <= rhs, z >= 0,
+    with z = (x, y_1, ..., y_S). Returns (cost, A (CSC), rhs, q broadcast to (S, n_y)).
+    """
+    c, W, q, T, h, probs, A_ub, b_ub = _check_two_stage(c, W, q, T, h, probs, A_ub, b_ub)
+    n_scenarios, m2 = h.shape
+
+    # Optimization: The extensive form's sparsity pattern only depends on the scenario count and the
+    # nonzero patterns of A_ub, T and W, so its CSC structure is cached and each solve only scatters values.
+    # T's pattern is the union over scenarios, so scenarios with different zeros share one structure.
+    T_mask = np.any(T != 0, axis=0)
+    template = _template(n_scenarios, _mask_key(A_ub != 0), _mask_key(T_mask), _mask_key(W != 0))
+    A = template.matrix(A_ub, T, W)
+
+    cost = np.concatenate([c, (probs[:, np.newaxis] * q).ravel()])
+    rhs = np.concatenate([b_ub, h.ravel()])
+    return cost, A, rhs, q
+
+def solve_recourse(x, q, W, h, T, chunk_size=RECOURSE_CHUNK):
+    """
+    Solves every scenario's recourse LP min q_s.y s.t. W y <= h_s - T_s x, y >= 0 at a fixed x.
+    q and h are either shared ((n_y,), (m2,)) or per scenario ((S, n_y), (S, m2)).
+    Returns (Q, pi): the optimal recourse cost and the (non-positive) constraint duals per scenario.
+    """
+    n_scenarios = T.shape[0]
+    n_rows, n_recourse = W.shape
+    rhs = h - T @ x
+    q = np.broadcast_to(q, (n_scenarios, n_recourse))
+
+    Q = np.empty(n_scenarios)
+    pi = np.empty((n_scenarios, n_rows))
+    # Optimization: Solve chunk_size scenarios at once as one block-diagonal LP instead of one linprog
+    # per scenario. Per-call overhead dominates these tiny LPs, while a single LP over all scenarios
+    # would bring back the memory footprint of the extensive form. Blocks are built once per chunk size.
+    blocks = {}
+    for start in range(0, n_scenarios, chunk_size):
+        stop = min(start + chunk_size, n_scenarios)
+        size = stop - start
+        A = blocks.get(size)
+        if A is None:
+            A = blocks[size] = sp.kron(sp.identity(size, format='csc'), sp.csc_matrix(W), format='csc')
+        res = linprog(q[start:stop].ravel(), A_ub=A, b_ub=rhs[start:stop].ravel(), bounds=(0, None), method='highs')
+        if not res.success:
+            raise ValueError("Recourse problem is infeasible or unbounded")
+        Q[start:stop] = np.einsum('sj,sj->s', res.x.reshape(size, n_recourse), q[start:stop])
+        pi[start:stop] = res.ineqlin.marginals.reshape(size, n_rows)
+    return Q, pi
+
+def _check_two_stage(c, W, q, T, h, probs, A_ub, b_ub):
+    """Validates two-stage data; returns float arrays with q, T and h broadcast to all scenarios (views)."""
+    c = np.asarray(c, dtype=float)
+    W = np.asarray(W, dtype=float)
+    probs = np.asarray(probs, dtype=float)
+
+    # Security: Validate dimensions to prevent IndexError (DoS)
+    if c.ndim != 1 or W.ndim != 2 or probs.ndim != 1:
+        raise ValueError("c and probabilities must be vectors and W a matrix")
+    n_x = c.size
+    m2, n_y = W.shape
+    n_scenarios = probs.size
+    if n_scenarios == 0:
+        raise ValueError("No scenarios")
+
+    q = np.broadcast_to(_per_scenario(q, (n_y,), n_scenarios, "q"), (n_scenarios, n_y))
+    T = np.broadcast_to(_per_scenario(T, (m2, n_x), n_scenarios, "T"), (n_scenarios, m2, n_x))
+    h = np.broadcast_to(_per_scenario(h, (m2,), n_scenarios, "h"), (n_scenarios, m2))
+
+    if A_ub is None or np.size(A_ub) == 0:
+        A_ub = np.zeros((0, n_x))
+        b_ub = np.zeros(0)
+    A_ub = np.asarray(A_ub, dtype=float)
+    b_ub = np.asarray(b_ub, dtype=float)
+    if A_ub.ndim != 2 or A_ub.shape[1] != n_x or b_ub.shape != (A_ub.shape[0],):
+        raise ValueError(f"A_ub must have {n_x} columns and b_ub one entry per row")
+    return c, W, q, T, h, probs, A_ub, b_ub
+
+def _per_scenario(data, shape, n_scenarios, name):
+    """Checks that data has shape (S, *shape) or (1, *shape) (shared by all scenarios)."""
+    data = np.asarray(data, dtype=float)
+    if data.shape[1:] != shape or data.shape[0] not in (1, n_scenarios):
+        raise ValueError(f"{name} must have shape ({n_scenarios} or 1, {', '.join(map(str, shape))})")
+    return data
+
+def _mask_key(mask):
+    """Hashable key of a boolean sparsity pattern."""
+    return mask.shape, np.packbits(mask, axis=None).tobytes()
+
+class _ExtensiveTemplate:
+    """
+    CSC structure of a two-stage extensive form: shared indptr/indices and the CSC data positions
+    of the A, T and W entries. Instances are shared between requests and never modified.
+    Rows: first-stage rows, then m2 rows per scenario. Columns: x, then n_y columns per scenario.
+    """
+    __slots__ = ['n_scenarios', 'shape', 'indptr', 'indices', 'pos_A', 'pos_T', 'pos_W', 'A_mask', 'T_mask', 'W_mask']
+
+    def __init__(self, n_scenarios, A_mask, T_mask, W_mask):
+        self.n_scenarios = n_scenarios
+        self.A_mask, self.T_mask, self.W_mask = A_mask, T_mask, W_mask
+        m1, n_x = A_mask.shape
+        m2, n_y = W_mask.shape
+        self.shape = (m1 + n_scenarios * m2, n_x + n_scenarios * n_y)
+
+        scenario = np.arange(n_scenarios)[:, np.newaxis]
+        a_rows, a_cols = np.nonzero(A_mask)
+        t_rows, t_cols = np.nonzero(T_mask)
+        w_rows, w_cols = np.nonzero(W_mask)
+
+        # Optimization: Build every scenario block's indices at once by broadcasting the block
+        # offsets against the pattern, instead of stacking per-scenario blocks in a Python loop.
+        rows = np.concatenate([
+            a_rows,
+            (m1 + scenario * m2 + t_rows).ravel(),
+            (m1 + scenario * m2 + w_rows).ravel(),
+        ])
+        cols = np.concatenate([
+            a_cols,
+            np.broadcast_to(t_cols, (n_scenarios, t_cols.size)).ravel(),
+            (n_x + scenario * n_y + w_cols).ravel(),
+        ])
+
+        # Optimization: Convert to Compressed Sparse Column (CSC) format once per template.
+        # SciPy's HiGHS solver natively operates on CSC sparse matrices. Tagging the COO entries
+        # with ids yields where each entry lands in the CSC data array.
+        ids = sp.coo_matrix((np.arange(1, rows.size + 1, dtype=float), (rows, cols)), shape=self.shape).tocsc()
+        order = ids.data.astype(np.int64) - 1
+        positions = np.empty(rows.size, dtype=np.int64)
+        positions[order] = np.arange(rows.size)
+        self.indptr, self.indices = ids.indptr, ids.indices
+        self.indptr.flags.writeable = False
+        self.indices.flags.writeable = False
+
+        n_t = t_rows.size * n_scenarios
+        self.pos_A = positions[:a_rows.size]
+        self.pos_T = positions[a_rows.size:a_rows.size + n_t]
+        self.pos_W = positions[a_rows.size + n_t:]
+
+    def matrix(self, A_ub, T, W):
+        """Returns the CSC constraint matrix for the given values; only the data array is new."""
+        n_scenarios = self.n_scenarios
+        data = np.empty(self.indices.size)
+        data[self.pos_A] = A_ub[self.A_mask]
+        data[self.pos_T] = np.broadcast_to(T[:, self.T_mask], (n_scenarios, int(self.T_mask.sum()))).ravel()
+        data[self.pos_W] = np.tile(W[self.W_mask], n_scenarios)
+        return sp.csc_matrix((data, self.indices, self.indptr), shape=self.shape, copy=False)
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _template(n_scenarios, A_key, T_key, W_key):
+    masks = [np.unpackbits(np.frombuffer(bits, dtype=np.uint8), count=int(np.prod(shape))).reshape(shape).astype(bool)
+             for shape, bits in (A_key, T_key, W_key)]
+    return _ExtensiveTemplate(n_scenarios, *masks)
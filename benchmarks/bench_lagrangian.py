@@ -0,0 +1,92 @@
+import sys
+import os
+import time
+import numpy as np
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+from api.solvers import lagrangian
+
+def generate_gap_instance(n_tasks, n_agents, seed=0):
+    """
+    Generates a Martello-Toth type C GAP instance:
+    weights ~ U[5, 25], costs ~ U[10, 50], capacity_j = 0.8 * sum_i w_ij / n_agents.
+    """
+    rng = np.random.default_rng(seed)
+    weights = rng.integers(5, 26, size=(n_tasks, n_agents)).astype(float)
+    costs = rng.integers(10, 51, size=(n_tasks, n_agents)).astype(float)
+    capacities = np.floor(0.8 * weights.sum(axis=0) / n_agents)
+    return costs.tolist(), weights.tolist(), capacities.tolist()
+
+def sparsify(costs, weights, density, seed=0):
+    """Keeps each (task, agent) pair with probability `density` (at least one per task) as eligible pairs."""
+    rng = np.random.default_rng(seed)
+    costs, weights = np.array(costs), np.array(weights)
+    n_tasks, n_agents = costs.shape
+    eligible = rng.random(costs.shape) < density
+    eligible[np.arange(n_tasks), rng.integers(0, n_agents, size=n_tasks)] = True
+    task, agent = np.nonzero(eligible)
+    return [(int(i), int(j), costs[i, j], weights[i, j]) for i, j in zip(task, agent)]
+
+def run(label, costs, weights, capacities, **kwargs):
+    start = time.perf_counter()
+    res = lagrangian.solve_lagrangian(costs, weights, capacities, **kwargs)
+    elapsed = time.perf_counter() - start
+    lb = res['lb'] if res['lb'] is not None else float('nan')
+    gap = f"{res['gap']:.4f}" if res['gap'] is not None else "n/a"
+    print(f"  {label:<24} iters={res['iterations']:>4}  LB={lb:>10.2f}  gap={gap:>8}  "
+          f"stop={res['stop_reason']:<10}  time={elapsed:.2f}s")
+    return res
+
+if __name__ == "__main__":
+    instances = [(15, 4), (30, 6), (45, 8)]
+    for n_tasks, n_agents in instances:
+        costs, weights, capacities = generate_gap_instance(n_tasks, n_agents)
+        print(f"GAP {n_tasks} tasks x {n_agents} agents")
+        for step_rule in lagrangian.STEP_RULES:
+            run(step_rule, costs, weights, capacities, max_iter=60, step_rule=step_rule)
+        run("polyak+local_search", costs, weights, capacities, max_iter=60, local_search=True)
+
+    # Bound quality vs per-iteration cost of the two relaxations
+    print("Relaxations")
+    for n_tasks, n_agents in instances:
+        costs, weights, capacities = generate_gap_instance(n_tasks, n_agents, seed=2)
+        print(f"GAP {n_tasks} tasks x {n_agents} agents")
+        for relax in lagrangian.RELAXATIONS:
+            run(relax, costs, weights, capacities, max_iter=60, relax=relax)
+
+    # Iterations needed to close the gap to 1% with each dual method
+    print("Iterations to 1% gap")
+    for n_tasks, n_agents in instances:
+        costs, weights, capacities = generate_gap_instance(n_tasks, n_agents, seed=1)
+        print(f"GAP {n_tasks} tasks x {n_agents} agents")
+        for dual_method in lagrangian.DUAL_METHODS:
+            run(dual_method, costs, weights, capacities, max_iter=150, target_gap=0.01, dual_method=dual_method)
+
+    # Sparse eligibility: only eligible pairs become knapsack variables, whereas the dense formulation
+    # carries forbidden pairs as variables that can never fit. Each agent's knapsack only keeps the items
+    # that can be in it, so blocked pairs cost the dense input no solve time either: the sparse input's
+    # gain is its size (MAX_SPARSE_TASKS tasks, vs MAX_VARS for dense matrices), not the per-iteration time.
+    # The "milp knapsacks" row turns the dynamic program off, for the per-agent HiGHS solves it replaces.
+    print("Sparse eligible pairs (density 0.3) vs dense with blocked pairs")
+    for n_tasks, n_agents in [(100, 10), (200, 20)]:
+        costs, weights, capacities = generate_gap_instance(n_tasks, n_agents, seed=3)
+        pairs = sparsify(costs, weights, 0.3)
+        blocked = np.full((n_tasks, n_agents), max(capacities) + 1)
+        for i, j, _, w in pairs:
+            blocked[i, j] = w
+        print(f"GAP {n_tasks} tasks x {n_agents} agents, {len(pairs)} pairs")
+        timings = {}
+        for label, kwargs in [("dense", dict(costs=costs, weights=blocked.tolist())),
+                              ("sparse", dict(costs=None, weights=None, pairs=pairs))]:
+            start = time.perf_counter()
+            run(label, capacities=capacities, max_iter=20, render="data", **kwargs)
+            timings[label] = time.perf_counter() - start
+        cells, lagrangian.MAX_KNAPSACK_CELLS = lagrangian.MAX_KNAPSACK_CELLS, 0
+        start = time.perf_counter()
+        run("sparse, milp knapsacks", None, None, capacities, pairs=pairs, max_iter=20, render="data")
+        timings["milp"] = time.perf_counter() - start
+        lagrangian.MAX_KNAPSACK_CELLS = cells
+        print(f"  sparse vs dense: {timings['dense'] / timings['sparse']:.2f}x, "
+              f"knapsack DP vs milp: {timings['milp'] / timings['sparse']:.1f}x")
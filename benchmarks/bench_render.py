@@ -0,0 +1,72 @@
+import sys
+import os
+import time
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import numpy as np
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+from api import plotting
+from api.solvers import ip, lagrangian
+
+pool_output = plotting.output
+
+IP_ARGS = ([5, 8], [[1, 1], [5, 9]], [6, 45])
+GAP_ARGS = (
+    np.random.default_rng(0).integers(10, 51, size=(30, 5)).tolist(),
+    np.random.default_rng(1).integers(5, 26, size=(30, 5)).tolist(),
+    [30.0] * 5,
+)
+
+def plot_request():
+    """Small solve, large figure: the branch-and-bound tree as a PNG."""
+    return ip.solve_ip(*IP_ARGS, maximize=True)
+
+def solve_request():
+    """Solver-bound request without a plot."""
+    return lagrangian.solve_lagrangian(*GAP_ARGS, max_iter=30, render="data")
+
+def inline_output(spec, render="png", key="plot"):
+    # Baseline: draw in the request thread, as before the render pool
+    if render != "png":
+        return pool_output(spec, render, key)
+    return {key: None if spec is None else base64.b64encode(plotting.render_png(spec)).decode('utf-8')}
+
+def timed(request):
+    start = time.perf_counter()
+    request()
+    return time.perf_counter() - start
+
+def mixed_load(clients, requests_per_client):
+    """Half the clients request plots, half request plain solves; returns latencies (s) per request kind."""
+    jobs = [plot_request if i % 2 == 0 else solve_request for i in range(clients)] * requests_per_client
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = list(pool.map(timed, jobs))
+    by_kind = {"plot": [], "solve": []}
+    for job, latency in zip(jobs, latencies):
+        by_kind["plot" if job is plot_request else "solve"].append(latency)
+    return by_kind
+
+def report(label, by_kind):
+    for kind, latencies in by_kind.items():
+        ms = np.array(latencies) * 1000
+        print(f"  {label:<8} {kind:<6} n={ms.size:>3}  p50={np.percentile(ms, 50):>7.1f}ms  p99={np.percentile(ms, 99):>7.1f}ms")
+
+if __name__ == "__main__":
+    print(f"Plot rendering under mixed load: 8 clients, half plots and half solves ({os.cpu_count()} CPUs, "
+          f"{plotting.RENDER_WORKERS} render workers)")
+
+    # First figure in a fresh process vs a pre-warmed worker (including the IPC round trip)
+    spec = {"kind": "convergence", "lb": [0.0, 1.0]}
+    print(f"  first figure in this process: {timed(lambda: plotting.render_png(spec)) * 1000:.1f}ms")
+    for _ in range(2 * plotting.RENDER_WORKERS):
+        plotting.render_in_pool(spec).result()  # start and warm the workers
+    warm = np.median([timed(lambda: plotting.render_in_pool(spec).result()) for _ in range(10)])
+    print(f"  same figure on a warm worker: {warm * 1000:.1f}ms")
+
+    with patch.object(plotting, "output", inline_output):
+        report("inline", mixed_load(8, 10))
+    report("pool", mixed_load(8, 10))
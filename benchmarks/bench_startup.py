@@ -0,0 +1,43 @@
+import sys
+import os
+import subprocess
+from collections import defaultdict
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+EAGER = "import api.index, api.solvers.lp, api.solvers.ip, api.solvers.colgen, api.solvers.lagrangian, " \
+        "api.solvers.stochastic, scipy.stats, matplotlib.figure, matplotlib.backends.backend_agg, networkx"
+
+def import_times(code):
+    """Runs code in a fresh interpreter under -X importtime; returns {module: (self_us, cumulative_us)}."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, cwd=os.getcwd(), check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+def report(label, code, top=6):
+    times = import_times(code)
+    total = sum(self_us for self_us, _ in times.values())
+    by_package = defaultdict(int)
+    for name, (self_us, _) in times.items():
+        by_package[name.split(".")[0]] += self_us
+    heaviest = sorted(by_package.items(), key=lambda item: -item[1])[:top]
+    print(f"  {label:<26} {total / 1e3:>7.1f}ms  {len(times):>5} modules  "
+          + ", ".join(f"{name} {us / 1e3:.0f}ms" for name, us in heaviest))
+
+if __name__ == "__main__":
+    print("Import time of a cold start (python -X importtime, self time summed per top-level package)")
+    report("lazy (import api.index)", "import api.index")
+    report("eager (everything)", EAGER)
+    # Deferred cost: startup plus what the first request of each kind imports
+    for label, code in (("+ first /api/lp", "import api.solvers.lp"),
+                        ("+ first /api/stochastic", "import api.solvers.stochastic"),
+                        ("+ first plot", "import api.plotting; api.plotting.render_png({'kind': 'convergence', 'lb': [0.0]})")):
+        report(label, f"import api.index; {code}")
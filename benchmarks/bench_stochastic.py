@@ -0,0 +1,93 @@
+import sys
+import os
+import time
+import resource
+import multiprocessing as mp
+import numpy as np
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+from api.solvers import stochastic, twostage
+
+def generate_scenarios(n_scenarios, seed=0):
+    """Farmer scenarios with yields uniform in +-20% of the textbook averages (2.5, 3, 20 T/acre)."""
+    rng = np.random.default_rng(seed)
+    ylds = rng.uniform([2.0, 2.4, 16.0], [3.0, 3.6, 24.0], size=(n_scenarios, 3))
+    return [{"name": f"S{i}", "probability": 1.0 / n_scenarios, "yields": y.tolist()} for i, y in enumerate(ylds)]
+
+def _measure(method, n_scenarios, kwargs):
+    scenarios = generate_scenarios(n_scenarios)
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    res = stochastic.solve_stochastic(500, scenarios, method=method, **kwargs)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux; the increment covers the solver (including HiGHS) but not the input
+    peak_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss) / 1024
+    return res['expected_profit'], res.get('iterations'), elapsed, peak_mb
+
+def run(method, n_scenarios, **kwargs):
+    # Each run gets a fresh process so peak memory is not inherited from earlier, larger runs
+    with mp.get_context("spawn").Pool(1) as pool:
+        profit, iters, elapsed, peak_mb = pool.apply(_measure, (method, n_scenarios, kwargs))
+    iters = f"{iters:>4}" if iters is not None else "   -"
+    print(f"  {method:<10} S={n_scenarios:>7}  profit={profit:>12.2f}  iters={iters}  "
+          f"time={elapsed:7.2f}s  peak_mem=+{peak_mb:.0f}MB")
+
+if __name__ == "__main__":
+    # The extensive form grows as 3 + 6*S variables and is very slow past 1e4 scenarios;
+    # pass --full to include it at 1e5 as well.
+    full = "--full" in sys.argv
+    print("Extensive form vs multi-cut L-shaped")
+    for n_scenarios in (1_000, 10_000, 100_000):
+        if n_scenarios <= 10_000 or full:
+            run("extensive", n_scenarios)
+        run("lshaped", n_scenarios)
+
+    # Progressive hedging: fixed iteration count, so the time isolates the parallel subproblem solves
+    print(f"Progressive hedging, 20 iterations on 100000 scenarios ({os.cpu_count()} CPUs)")
+    ylds = np.random.default_rng(0).uniform([2.0, 2.4, 16.0], [3.0, 3.6, 24.0], size=(100_000, 3))
+    probs = np.full(100_000, 1e-5)
+    for workers in (1, 2, 4):
+        start = time.perf_counter()
+        res = stochastic.solve_progressive_hedging(500, probs, ylds, max_iter=20, tol=0, workers=workers)
+        print(f"  workers={workers}  profit={res['expected_profit']:.2f}  time={time.perf_counter() - start:.2f}s")
+
+    # Extensive-form matrix assembly: first call builds the cached CSC template, later calls only fill values
+    print("Extensive-form assembly (cold template vs cached)")
+    for n_scenarios in (1_000, 10_000, 100_000):
+        ylds = np.random.default_rng(0).uniform([2.0, 2.4, 16.0], [3.0, 3.6, 24.0], size=(n_scenarios, 3))
+        q, W, h, T = stochastic.farmer_recourse(ylds)
+        probs = np.full(n_scenarios, 1.0 / n_scenarios)
+        args = (stochastic.PLANTING_COSTS, W, q[np.newaxis], T, h[np.newaxis], probs, np.ones((1, 3)), np.array([500.0]))
+        twostage._template.cache_clear()
+        start = time.perf_counter()
+        twostage.extensive_form(*args)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        twostage.extensive_form(*args)
+        warm = time.perf_counter() - start
+        print(f"  S={n_scenarios:>7}  cold={cold * 1e3:7.2f}ms  cached={warm * 1e3:7.2f}ms")
+
+    # Closed-form recourse: no LP, so millions of scenarios are evaluated in a streaming pass
+    print("Closed-form evaluation of 10 candidate plans")
+    rng = np.random.default_rng(0)
+    candidates = rng.uniform(0, 250, size=(10, 3))
+    for n_scenarios in (100_000, 1_000_000, 5_000_000):
+        ylds = rng.uniform([2.0, 2.4, 16.0], [3.0, 3.6, 24.0], size=(n_scenarios, 3))
+        probs = np.full(n_scenarios, 1.0 / n_scenarios)
+        start = time.perf_counter()
+        stochastic.evaluate_candidates(candidates, stochastic.iter_scenario_chunks(ylds, probs))
+        print(f"  S={n_scenarios:>9}  time={time.perf_counter() - start:.2f}s")
+
+    # Mean-CVaR frontier (11 weights) against a single extensive-form CVaR solve
+    print("Mean-CVaR frontier, 11 weights, vs one extensive CVaR solve")
+    for n_scenarios in (1_000, 10_000):
+        scenarios = generate_scenarios(n_scenarios)
+        start = time.perf_counter()
+        res = stochastic.solve_stochastic(500, scenarios, method="frontier", cvar_alpha=0.9)
+        sweep = time.perf_counter() - start
+        start = time.perf_counter()
+        stochastic.solve_stochastic(500, scenarios, cvar_weight=0.5, cvar_alpha=0.9)
+        single = time.perf_counter() - start
+        print(f"  S={n_scenarios:>6}  frontier={sweep:.2f}s ({res['iterations']} master solves)  one extensive={single:.2f}s")
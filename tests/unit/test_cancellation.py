@@ -0,0 +1,165 @@
+import sys
+import os
+import time
+import json
+import asyncio
+import unittest
+import numpy as np
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+from api.index import app
+from api.cancellation import CancelToken, Cancelled
+from api.solvers import ip, colgen, lagrangian, stochastic
+import api.limiter
+
+def long_gap_payload():
+    """GAP instance that runs the full 30 s time limit unless cancelled."""
+    rng = np.random.default_rng(3)
+    weights = rng.integers(5, 26, size=(60, 10))
+    return {
+        "costs": rng.integers(10, 51, size=(60, 10)).tolist(), "weights": weights.tolist(),
+        "capacities": np.floor(0.8 * weights.sum(axis=0) / 10).tolist(),
+        "max_iter": 500, "time_limit": 30, "target_gap": 0, "render": "data"
+    }
+
+FARMER_SCENARIOS = [
+    {"name": "Above", "probability": 1 / 3, "yields": [3.0, 3.6, 24.0]},
+    {"name": "Average", "probability": 1 / 3, "yields": [2.5, 3.0, 20.0]},
+    {"name": "Below", "probability": 1 / 3, "yields": [2.0, 2.4, 16.0]},
+]
+DISTRIBUTIONS = [("uniform", [2.0, 3.0]), ("normal", [3.0, 0.3]), ("triangular", [16.0, 20.0, 24.0])]
+DISTRIBUTION_PARAMS = [{"kind": kind, "params": params} for kind, params in DISTRIBUTIONS]
+
+def long_saa_payload():
+    """SAA run at the request limits, about 20 s of work on one CPU."""
+    return {"total_land": 500, "distributions": DISTRIBUTION_PARAMS, "sample_size": 2000, "replications": 20,
+            "eval_size": 1_000_000, "render": "data"}
+
+async def call_then_disconnect(path, payload, after):
+    """Calls the ASGI app directly; the client disconnects `after` seconds after sending the body."""
+    body = json.dumps(payload).encode()
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(after)
+        return {"type": "http.disconnect"}
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+class TestCancelToken(unittest.TestCase):
+    def test_cancel_and_deadline(self):
+        token = CancelToken()
+        token.check()
+        token.cancel("disconnected")
+        token.cancel("later reasons are ignored")
+        with self.assertRaises(Cancelled) as ctx:
+            token.check()
+        self.assertEqual(str(ctx.exception), "disconnected")
+
+        token = CancelToken(timeout=0)
+        self.assertTrue(token.cancelled)
+        self.assertEqual(token.reason, "deadline")
+
+    def test_solvers_stop_when_cancelled(self):
+        token = CancelToken()
+        token.cancel()
+        with self.assertRaises(Cancelled):
+            ip.solve_ip([5, 8], [[1, 1], [5, 9]], [6, 45], cancel=token)
+        with self.assertRaises(Cancelled):
+            colgen.solve_cutting_stock(100, [[45, 97], [36, 610]], cancel=token)
+        with self.assertRaises(Cancelled):
+            lagrangian.solve_lagrangian([[4, 6], [5, 3]], [[2, 3], [3, 2]], [4, 4], cancel=token)
+        for method in ("extensive", "lshaped", "ph"):
+            with self.assertRaises(Cancelled):
+                stochastic.solve_stochastic(500, FARMER_SCENARIOS, method=method, cancel=token)
+        ylds = np.array([s["yields"] for s in FARMER_SCENARIOS])
+        with self.assertRaises(Cancelled):
+            stochastic.stochastic_metrics(500, np.full(3, 1 / 3), ylds, 108390, cancel=token)
+        for workers in (1, 2):
+            with self.assertRaises(Cancelled):
+                stochastic.solve_saa(500, DISTRIBUTIONS, replications=2, eval_size=1000, workers=workers, cancel=token)
+
+class TestRequestCancellation(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+
+    def test_deadline(self):
+        with patch('api.index.SOLVE_DEADLINE_SECONDS', 0.5):
+            start = time.perf_counter()
+            response = self.client.post("/api/lagrangian", json=long_gap_payload())
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["detail"], "Solve deadline exceeded")
+        self.assertLess(time.perf_counter() - start, 10)
+
+    def test_stochastic_deadline(self):
+        body = np.concatenate([np.full(3, 1 / 3), [3.0, 2.5, 2.0], [3.6, 3.0, 2.4], [24.0, 20.0, 16.0]]).astype('<f8')
+        with patch('api.index.SOLVE_DEADLINE_SECONDS', 0):
+            responses = [
+                self.client.post("/api/stochastic", json={"total_land": 500, "scenarios": FARMER_SCENARIOS,
+                                                          "method": "lshaped", "render": "data"}),
+                self.client.post("/api/stochastic/saa", json={"total_land": 500, "distributions": DISTRIBUTION_PARAMS,
+                                                              "replications": 2, "eval_size": 1000, "render": "data"}),
+                self.client.post("/api/stochastic/columnar?total_land=500&method=ph&render=data", content=body.tobytes(),
+                                 headers={"content-type": "application/octet-stream"}),
+            ]
+        for response in responses:
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()["detail"], "Solve deadline exceeded")
+
+    def test_client_disconnect(self):
+        start = time.perf_counter()
+        status = asyncio.run(call_then_disconnect("/api/lagrangian", long_gap_payload(), after=0.5))
+        self.assertEqual(status, 503)
+        self.assertLess(time.perf_counter() - start, 10)
+
+    def test_cancel_job(self):
+        job_id = self.client.post("/api/jobs", json={"solver": "lagrangian", "params": long_gap_payload()}).json()["id"]
+        response = self.client.delete(f"/api/jobs/{job_id}")
+        self.assertEqual(response.status_code, 200)
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            data = self.client.get(f"/api/jobs/{job_id}").json()
+            if data["status"] not in ("queued", "running"):
+                break
+            time.sleep(0.05)
+        self.assertEqual(data["status"], "cancelled")
+        self.assertEqual(data["error"], {"status_code": 503, "detail": "Solve cancelled"})
+        self.assertEqual(self.client.delete("/api/jobs/" + "A" * 22).status_code, 404)
+
+    def test_cancel_saa_job(self):
+        job_id = self.client.post("/api/jobs", json={"solver": "saa", "params": long_saa_payload()}).json()["id"]
+        time.sleep(0.5)
+        start = time.perf_counter()
+        self.client.delete(f"/api/jobs/{job_id}")
+        deadline = time.time() + 15
+        while time.time() < deadline:
+            data = self.client.get(f"/api/jobs/{job_id}").json()
+            if data["status"] not in ("queued", "running"):
+                break
+            time.sleep(0.05)
+        self.assertEqual(data["status"], "cancelled")
+        self.assertLess(time.perf_counter() - start, 15)
+
+if __name__ == '__main__':
+    unittest.main()
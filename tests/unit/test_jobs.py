@@ -0,0 +1,94 @@
+import sys
+import os
+import time
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+from api.index import app
+from api import jobs
+import api.limiter
+
+IP_PARAMS = {"c": [5, 8], "A_ub": [[1, 1], [5, 9]], "b_ub": [6, 45], "maximize": True, "render": "data"}
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+
+    def wait(self, job_id, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            response = self.client.get(f"/api/jobs/{job_id}")
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            if data["status"] in ("done", "failed"):
+                return data
+            time.sleep(0.05)
+        self.fail("job did not finish")
+
+    def test_submit_poll_result(self):
+        response = self.client.post("/api/jobs", json={"solver": "ip", "params": IP_PARAMS})
+        self.assertEqual(response.status_code, 202)
+        self.assertIn(response.json()["status"], ("queued", "running", "done"))
+        data = self.wait(response.json()["id"])
+        self.assertEqual(data["status"], "done")
+        self.assertEqual(data["result"]["fun"], 40.0)
+        # Same result as the synchronous route
+        self.assertEqual(data["result"]["x"], self.client.post("/api/ip", json=IP_PARAMS).json()["x"])
+        self.assertGreater(data["progress"]["nodes"], 0)
+
+    def test_progress_of_iterative_solvers(self):
+        response = self.client.post("/api/jobs", json={"solver": "colgen", "params": {
+            "roll_length": 100, "demands": [[45, 97], [36, 610], [31, 395], [14, 211]]}})
+        data = self.wait(response.json()["id"])
+        self.assertEqual(data["progress"]["columns"], len(data["result"]["patterns"]))
+
+        response = self.client.post("/api/jobs", json={"solver": "lagrangian", "params": {
+            "costs": [[4, 6], [5, 3], [2, 7]], "weights": [[2, 3], [3, 2], [2, 2]], "capacities": [4, 4],
+            "render": "data"}})
+        data = self.wait(response.json()["id"])
+        self.assertEqual(data["progress"]["iteration"], data["result"]["iterations"])
+        self.assertEqual(data["progress"]["lb"], data["result"]["lb"])
+
+        # Solvers without progress reporting still run
+        response = self.client.post("/api/jobs", json={"solver": "lp", "params": {**IP_PARAMS, "maximize": True}})
+        data = self.wait(response.json()["id"])
+        self.assertIsNone(data["progress"])
+        self.assertAlmostEqual(data["result"]["fun"], 41.25)
+
+    def test_validation_and_failures(self):
+        response = self.client.post("/api/jobs", json={"solver": "simplex", "params": IP_PARAMS})
+        self.assertEqual(response.status_code, 422)
+        # The payload is validated against the solver's own model before queueing
+        response = self.client.post("/api/jobs", json={"solver": "ip", "params": {"c": [1, 1]}})
+        self.assertEqual(response.status_code, 422)
+
+        # Errors raised while solving are reported like the synchronous route's
+        response = self.client.post("/api/jobs", json={"solver": "colgen", "params": {"roll_length": 100, "demands": [[0, 5]]}})
+        data = self.wait(response.json()["id"])
+        self.assertEqual(data["status"], "failed")
+        self.assertEqual(data["error"], {"status_code": 400, "detail": "Invalid input parameters"})
+
+        self.assertEqual(self.client.get("/api/jobs/" + "A" * 22).status_code, 404)
+        self.assertEqual(self.client.get("/api/jobs/bad").status_code, 422)
+
+    def test_pending_jobs_are_bounded(self):
+        with patch.object(jobs, "MAX_PENDING_JOBS", 0):
+            response = self.client.post("/api/jobs", json={"solver": "ip", "params": IP_PARAMS})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["retry-after"], "5")
+
+    def test_results_expire(self):
+        response = self.client.post("/api/jobs", json={"solver": "ip", "params": IP_PARAMS})
+        job_id = response.json()["id"]
+        self.wait(job_id)
+        with patch('api.jobs.time.time', return_value=time.time() + jobs.JOB_TTL + 1):
+            self.assertEqual(self.client.get(f"/api/jobs/{job_id}").status_code, 404)
+        self.assertNotIn(job_id, jobs.jobs)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,334 @@
+import sys
+import os
+import unittest
+import numpy as np
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+from api.index import app
+from api.solvers import lagrangian
+import api.limiter
+from benchmarks.bench_lagrangian import generate_gap_instance
+
+class TestLagrangianSteps(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+
+    def test_polyak_stops_on_closed_gap(self):
+        costs = [[10, 20], [15, 10]]
+        weights = [[2, 5], [3, 2]]
+        res = lagrangian.solve_lagrangian(costs, weights, [5, 5], max_iter=50)
+        self.assertEqual(res['ub'], 20.0)
+        self.assertAlmostEqual(res['lb'], 20.0)
+        self.assertEqual(res['gap'], 0.0)
+        self.assertIn(res['stop_reason'], ["optimal", "gap"])
+        self.assertLess(res['iterations'], 50)
+
+    def test_polyak_beats_diminishing_bound(self):
+        costs, weights, caps = generate_gap_instance(12, 3, seed=1)
+        polyak = lagrangian.solve_lagrangian(costs, weights, caps, max_iter=30, step_rule="polyak")
+        diminishing = lagrangian.solve_lagrangian(costs, weights, caps, max_iter=30, step_rule="diminishing")
+        self.assertGreaterEqual(polyak['lb'], diminishing['lb'] - 1e-6)
+
+    def test_stall_counts_recovery_after_overshoot(self):
+        # Without a UB the first Polyak steps overshoot; counting the recovery as stall would halve
+        # theta too early and leave the bound near 270
+        costs, weights, caps = generate_gap_instance(12, 3, seed=1)
+        res = lagrangian.solve_lagrangian(costs, weights, caps, max_iter=60, target_gap=0)
+        self.assertGreater(res['lb'], 275)
+
+    def test_time_limit(self):
+        costs, weights, caps = generate_gap_instance(12, 3, seed=2)
+        res = lagrangian.solve_lagrangian(costs, weights, caps, max_iter=500, time_limit=1e-6, target_gap=0)
+        self.assertEqual(res['stop_reason'], "time_limit")
+        self.assertEqual(res['iterations'], 1)
+
+    def test_unknown_step_rule(self):
+        with self.assertRaises(ValueError):
+            lagrangian.solve_lagrangian([[1, 2]], [[1, 1]], [1, 1], step_rule="adam")
+
+    def test_api_iteration_limits(self):
+        payload = {
+            "costs": [[10, 20], [15, 10]],
+            "weights": [[2, 5], [3, 2]],
+            "capacities": [5, 5],
+            "max_iter": 10,
+            "target_gap": 0.01
+        }
+        response = self.client.post("/api/lagrangian", json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(response.json()['iterations'], 10)
+
+        payload["max_iter"] = 100000
+        response = self.client.post("/api/lagrangian", json=payload)
+        self.assertEqual(response.status_code, 422)
+
+        payload["max_iter"] = 10
+        payload["time_limit"] = 3600
+        response = self.client.post("/api/lagrangian", json=payload)
+        self.assertEqual(response.status_code, 422)
+
+class TestLagrangianRepair(unittest.TestCase):
+    def assertFeasible(self, agent, weights, caps):
+        weights = np.array(weights)
+        self.assertTrue(np.all(agent >= 0))
+        load = np.bincount(agent, weights=weights[np.arange(len(agent)), agent], minlength=len(caps))
+        self.assertTrue(np.all(load <= np.array(caps) + 1e-9))
+
+    def test_repair_duplicates_and_unassigned(self):
+        costs = np.array([[10.0, 20.0], [15.0, 10.0], [5.0, 5.0]])
+        weights = np.array([[2.0, 5.0], [3.0, 2.0], [1.0, 1.0]])
+        caps = np.array([5.0, 5.0])
+        # Task 0 assigned twice, task 2 unassigned
+        x = np.array([[1, 1], [0, 1], [0, 0]])
+        agent = lagrangian.repair_assignment(x, costs, weights, caps)
+        self.assertEqual(agent[0], 0)
+        self.assertFeasible(agent, weights, caps)
+
+    def test_repair_overloaded_agent(self):
+        costs = np.array([[1.0, 5.0], [1.0, 2.0], [1.0, 9.0]])
+        weights = np.ones((3, 2))
+        caps = np.array([2.0, 2.0])
+        x = np.array([[1, 0], [1, 0], [1, 0]])
+        agent = lagrangian.repair_assignment(x, costs, weights, caps)
+        # Task 1 has the smallest regret and is the one moved
+        self.assertEqual(agent.tolist(), [0, 1, 0])
+
+    def test_repair_infeasible(self):
+        x = np.zeros((2, 1))
+        agent = lagrangian.repair_assignment(x, np.ones((2, 1)), np.ones((2, 1)), np.array([1.0]))
+        self.assertIsNone(agent)
+
+    def test_upper_bound_every_run(self):
+        costs = [[10, 20], [15, 10], [5, 5]]
+        weights = [[2, 5], [3, 2], [1, 1]]
+        res = lagrangian.solve_lagrangian(costs, weights, [5, 5])
+        self.assertEqual(res['ub'], 25.0)
+        self.assertLess(res['gap'], 1e-4)
+        self.assertEqual(res['stop_reason'], "gap")
+
+    def test_local_search_not_worse(self):
+        costs, weights, caps = generate_gap_instance(20, 4, seed=3)
+        plain = lagrangian.solve_lagrangian(costs, weights, caps, max_iter=10)
+        improved = lagrangian.solve_lagrangian(costs, weights, caps, max_iter=10, local_search=True)
+        self.assertIsNotNone(plain['ub'])
+        self.assertLessEqual(improved['ub'], plain['ub'] + 1e-9)
+        self.assertGreaterEqual(improved['ub'], improved['lb'] - 1e-6)
+
+    def test_greedy_start_gives_first_step_a_target(self):
+        costs, weights, caps = generate_gap_instance(20, 5, seed=0)
+        res = lagrangian.solve_lagrangian(costs, weights, caps, max_iter=1)
+        self.assertTrue(res['logs'][0].startswith("Greedy start: UB="))
+        start = lagrangian.repair_assignment(np.zeros((20, 5)), np.array(costs), np.array(weights), np.array(caps))
+        self.assertLessEqual(res['ub'], np.sum(np.array(costs)[np.arange(20), start]))
+
+    def test_repair_falls_back_to_weight_ranking(self):
+        # Cost-ranked regret insertion strands a task on this instance; ranking by relative weight packs it
+        costs = np.array([[13, 9, 3], [12, 1, 17], [17, 17, 1], [19, 19, 12], [16, 15, 15]], dtype=float)
+        weights = np.array([[5, 4, 9], [4, 6, 4], [5, 9, 2], [6, 4, 7], [7, 3, 7]], dtype=float)
+        caps = np.array([8.0, 7.0, 8.0])
+        slot_agent = np.broadcast_to(np.arange(3), (5, 3))
+        self.assertFalse(lagrangian._insert_by_regret(np.arange(5), np.full(5, -1), caps.copy(), costs, weights, slot_agent))
+        agent = lagrangian.repair_assignment(np.zeros((5, 3)), costs, weights, caps)
+        self.assertIsNotNone(agent)
+        self.assertFeasible(agent, weights, caps)
+
+class TestLagrangianVolume(unittest.TestCase):
+    def test_volume_closes_gap(self):
+        costs = [[10, 20], [15, 10], [5, 5]]
+        weights = [[2, 5], [3, 2], [1, 1]]
+        res = lagrangian.solve_lagrangian(costs, weights, [5, 5], dual_method="volume")
+        self.assertEqual(res['dual_method'], "volume")
+        self.assertEqual(res['ub'], 25.0)
+        self.assertLess(res['gap'], 1e-4)
+
+    def test_volume_primal_estimate(self):
+        costs, weights, caps = generate_gap_instance(12, 3, seed=4)
+        res = lagrangian.solve_lagrangian(costs, weights, caps, max_iter=15, target_gap=0, dual_method="volume")
+        x_bar = np.array(res['primal_estimate'])
+        self.assertEqual(x_bar.shape, (12, 3))
+        self.assertTrue(np.all((x_bar >= 0) & (x_bar <= 1)))
+        # The averaged primal respects every knapsack constraint since each iterate does
+        load = (np.array(weights) * x_bar).sum(axis=0)
+        self.assertTrue(np.all(load <= np.array(caps) + 1e-6))
+        # Bounds stay valid: LB never exceeds the repaired UB
+        self.assertLessEqual(res['lb'], res['ub'] + 1e-6)
+
+    def test_subgradient_has_no_primal_estimate(self):
+        res = lagrangian.solve_lagrangian([[10, 20], [15, 10]], [[2, 5], [3, 2]], [5, 5])
+        self.assertIsNone(res['primal_estimate'])
+
+    def test_unknown_dual_method(self):
+        with self.assertRaises(ValueError):
+            lagrangian.solve_lagrangian([[1, 2]], [[1, 1]], [1, 1], dual_method="bundle")
+
+class TestCapacityRelaxation(unittest.TestCase):
+    def test_closed_form_oracle(self):
+        costs = np.array([[1.0, 5.0], [1.0, 2.0]])
+        weights = np.array([[1.0, 1.0], [1.0, 1.0]])
+        oracle = lagrangian.CapacityOracle(costs, weights, np.array([1.0, 1.0]))
+        lb, x = oracle.solve(np.array([2.0, 0.0]))
+        # Task 0: min(1 + 2, 5) = 3 on agent 0; task 1: min(1 + 2, 2) = 2 on agent 1
+        self.assertEqual(x.tolist(), [[1.0, 0.0], [0.0, 1.0]])
+        self.assertAlmostEqual(lb, 3 + 2 - 2)
+        self.assertEqual(oracle.subgradient(x).tolist(), [0.0, 0.0])
+
+    def test_capacity_relaxation_without_milp(self):
+        costs, weights, caps = generate_gap_instance(20, 4, seed=5)
+        with patch('api.solvers.lagrangian.milp') as mock_milp:
+            res = lagrangian.solve_lagrangian(costs, weights, caps, max_iter=50, relax="capacity")
+            mock_milp.assert_not_called()
+        self.assertEqual(res['relax'], "capacity")
+        self.assertEqual(len(res['lb_history']), res['iterations'])
+        self.assertIsNotNone(res['ub'])
+        self.assertIsNotNone(res['best_solution'])
+        self.assertLessEqual(res['lb'], res['ub'] + 1e-6)
+
+    def test_capacity_relaxation_small_instance(self):
+        costs = [[10, 20], [15, 10], [5, 5]]
+        weights = [[2, 5], [3, 2], [1, 1]]
+        res = lagrangian.solve_lagrangian(costs, weights, [5, 5], relax="capacity")
+        self.assertEqual(res['ub'], 25.0)
+        self.assertAlmostEqual(res['lb'], 25.0, places=3)
+
+    def test_unknown_relaxation(self):
+        with self.assertRaises(ValueError):
+            lagrangian.solve_lagrangian([[1, 2]], [[1, 1]], [1, 1], relax="both")
+
+class TestIncrementalResolve(unittest.TestCase):
+    def setUp(self):
+        costs, weights, caps = generate_gap_instance(10, 3, seed=6)
+        self.costs = np.array(costs)
+        self.weights = np.array(weights)
+        self.caps = np.array(caps)
+
+    def test_unchanged_multipliers_skip_every_agent(self):
+        oracle = lagrangian.AssignmentOracle(self.costs, self.weights, self.caps)
+        lambdas = np.full(10, 30.0)
+        lb_first, x_first = oracle.solve(lambdas)
+        lb_second, x_second = oracle.solve(lambdas)
+        self.assertEqual(oracle.skipped, 3)
+        self.assertAlmostEqual(lb_first, lb_second)
+        np.testing.assert_array_equal(x_first, x_second)
+
+    def test_tolerant_skip_keeps_valid_bound(self):
+        rng = np.random.default_rng(0)
+        cached = lagrangian.AssignmentOracle(self.costs, self.weights, self.caps, resolve_tol=5.0)
+        lambdas = np.full(10, 30.0)
+        cached.solve(lambdas)
+        for _ in range(5):
+            lambdas = lambdas + rng.normal(scale=0.5, size=10)
+            lb_cached, _ = cached.solve(lambdas)
+            lb_exact, _ = lagrangian.AssignmentOracle(self.costs, self.weights, self.caps).solve(lambdas)
+            self.assertLessEqual(lb_cached, lb_exact + 1e-6)
+        self.assertGreater(cached.skipped, 0)
+
+    def test_skipped_solves_reported(self):
+        res = lagrangian.solve_lagrangian(self.costs.tolist(), self.weights.tolist(), self.caps.tolist(),
+                                          max_iter=40, target_gap=0, resolve_tol=5.0)
+        self.assertGreater(res['skipped_solves'], 0)
+        self.assertLessEqual(res['lb'], res['ub'] + 1e-6)
+        res = lagrangian.solve_lagrangian(self.costs.tolist(), self.weights.tolist(), self.caps.tolist(),
+                                          max_iter=5, relax="capacity")
+        self.assertEqual(res['skipped_solves'], 0)
+
+class TestKnapsack(unittest.TestCase):
+    def milp_optimum(self, profits, weights, capacity):
+        res = lagrangian.milp(c=-profits, constraints=lagrangian.LinearConstraint(weights[np.newaxis, :], -np.inf, capacity),
+                              integrality=np.ones(profits.size), bounds=lagrangian.Bounds(0, 1), options={'mip_rel_gap': 0})
+        return -res.fun
+
+    def test_dynamic_program_matches_milp(self):
+        rng = np.random.default_rng(4)
+        for _ in range(20):
+            n = int(rng.integers(1, 40))
+            profits = rng.uniform(0, 50, size=n)
+            weights = rng.integers(0, 26, size=n).astype(float)
+            capacity = rng.uniform(0, weights.sum())
+            x = lagrangian.solve_knapsack(profits, weights, capacity)
+            self.assertLessEqual(weights @ x, capacity)
+            self.assertAlmostEqual(profits @ x, self.milp_optimum(profits, weights, capacity), places=6)
+
+    def test_fractional_weights_fall_back_to_milp(self):
+        self.assertIsNone(lagrangian.solve_knapsack(np.ones(2), np.array([1.5, 2.0]), 3.0))
+        with patch.object(lagrangian, 'MAX_KNAPSACK_CELLS', 10):
+            self.assertIsNone(lagrangian.solve_knapsack(np.ones(2), np.array([1.0, 2.0]), 30.0))
+        # The oracle gives the same bound either way
+        costs, weights, caps = generate_gap_instance(12, 3, seed=6)
+        lambdas = np.full(12, 40.0)
+        lb_dp, _ = lagrangian.AssignmentOracle(np.array(costs), np.array(weights), np.array(caps)).solve(lambdas)
+        with patch.object(lagrangian, 'MAX_KNAPSACK_CELLS', 0):
+            lb_milp, _ = lagrangian.AssignmentOracle(np.array(costs), np.array(weights), np.array(caps)).solve(lambdas)
+        self.assertAlmostEqual(lb_dp, lb_milp, delta=1e-4 * abs(lb_milp))
+
+class TestSparseInput(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+        costs, weights, caps = map(np.array, generate_gap_instance(12, 4, seed=5))
+        rng = np.random.default_rng(5)
+        self.eligible = rng.random(costs.shape) < 0.6
+        self.eligible[np.arange(12), rng.integers(0, 4, size=12)] = True
+        self.costs, self.weights, self.caps = costs, weights, caps
+        task, agent = np.nonzero(self.eligible)
+        self.pairs = [[int(i), int(j), float(costs[i, j]), float(weights[i, j])] for i, j in zip(task, agent)]
+
+    def test_oracle_matches_dense_with_blocked_pairs(self):
+        # A dense pair heavier than its agent's capacity can never be picked, so it acts as forbidden
+        blocked = np.where(self.eligible, self.weights, self.caps.max() + 1)
+        dense = lagrangian.AssignmentOracle(self.costs, blocked, self.caps)
+        costs, weights, slot_agent, _ = lagrangian._slots_from_pairs(self.pairs, 4)
+        sparse = lagrangian.AssignmentOracle(costs, weights, self.caps, slot_agent=slot_agent)
+        lambdas = np.full(12, 35.0)
+        lb_dense, _ = dense.solve(lambdas)
+        lb_sparse, _ = sparse.solve(lambdas)
+        self.assertAlmostEqual(lb_dense, lb_sparse, places=6)
+
+    def test_assignment_uses_eligible_pairs(self):
+        for relax in ("assignment", "capacity"):
+            res = lagrangian.solve_lagrangian(None, None, self.caps.tolist(), pairs=self.pairs,
+                                              max_iter=20, relax=relax)
+            agent = np.array(res['assignment'])
+            self.assertTrue(np.all(self.eligible[np.arange(12), agent]))
+            load = np.bincount(agent, weights=self.weights[np.arange(12), agent], minlength=4)
+            self.assertTrue(np.all(load <= self.caps + 1e-9))
+            self.assertAlmostEqual(res['ub'], self.costs[np.arange(12), agent].sum())
+            self.assertLessEqual(res['lb'], res['ub'] + 1e-6)
+            self.assertIsNone(res['best_solution'])
+
+    def test_volume_estimate_per_pair(self):
+        res = lagrangian.solve_lagrangian(None, None, self.caps.tolist(), pairs=self.pairs,
+                                          max_iter=10, dual_method="volume")
+        self.assertEqual(len(res['primal_estimate']), len(self.pairs))
+
+    def test_invalid_pairs(self):
+        with self.assertRaises(ValueError):
+            lagrangian.solve_lagrangian(None, None, [5, 5], pairs=[[0, 0, 1, 1], [0, 0, 2, 1]])
+        with self.assertRaises(ValueError):
+            lagrangian.solve_lagrangian(None, None, [5, 5], pairs=[[0, 2, 1, 1]])
+        with self.assertRaises(ValueError):
+            # Task 1 has no eligible agent
+            lagrangian.solve_lagrangian(None, None, [5, 5], pairs=[[0, 0, 1, 1]], n_tasks=2)
+
+    def test_api_sparse_input(self):
+        payload = {"pairs": self.pairs, "capacities": self.caps.tolist(), "max_iter": 10}
+        response = self.client.post("/api/lagrangian", json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['assignment']), 12)
+
+        payload["costs"] = self.costs.tolist()
+        response = self.client.post("/api/lagrangian", json=payload)
+        self.assertEqual(response.status_code, 422)
+
+        response = self.client.post("/api/lagrangian", json={"capacities": [5, 5]})
+        self.assertEqual(response.status_code, 422)
+
+        response = self.client.post("/api/lagrangian", json={"pairs": [[0, 0, 1.0]], "capacities": [5]})
+        self.assertEqual(response.status_code, 422)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import sys
+import os
+import subprocess
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+from api import lazy
+import api.index
+from api.solvers import stochastic
+
+def run_python(code):
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.getcwd(), timeout=120)
+    if result.returncode != 0:
+        raise AssertionError(result.stderr)
+    return result.stdout.strip()
+
+class TestLazyImports(unittest.TestCase):
+    def test_startup_skips_heavy_modules(self):
+        # A fresh interpreter: this one already has everything imported
+        out = run_python(
+            "import sys; import api.index\n"
+            "print(sorted(m for m in ('scipy', 'matplotlib', 'networkx', 'api.solvers.lp', 'api.plotting') if m in sys.modules))"
+        )
+        self.assertEqual(out, "[]")
+
+    def test_first_request_loads_only_its_solver(self):
+        out = run_python(
+            "import sys; from fastapi.testclient import TestClient; from api.index import app; from api import lazy\n"
+            "r = TestClient(app).post('/api/lp', json={'c': [3, 2], 'A_ub': [[1, 1]], 'b_ub': [4], 'maximize': True, 'render': 'data'})\n"
+            "print(r.json()['fun'], lazy.loaded(), [m for m in ('api.solvers.ip', 'scipy.stats', 'matplotlib') if m in sys.modules])"
+        )
+        self.assertEqual(out, "12.0 ['api.solvers.lp'] []")
+
+    def test_registry_and_concurrent_access(self):
+        module = lazy.lazy("json")
+        self.assertIs(lazy.lazy("json"), module)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: module.dumps([1]), range(32)))
+        self.assertEqual(results, ["[1]"] * 32)
+        self.assertIn("json", lazy.loaded())
+        with self.assertRaises(AttributeError):
+            module.not_a_function
+
+    def test_reduction_limit_matches_solver(self):
+        self.assertEqual(api.index.MAX_REDUCTION_SCENARIOS, stochastic.MAX_REDUCTION_SCENARIOS)
+
+if __name__ == '__main__':
+    unittest.main()
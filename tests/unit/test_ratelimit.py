@@ -16,8 +16,10 @@ class TestRateLimit(unittest.TestCase):
         # Reset limiter store before each test
         api.limiter.rate_limit_store.clear()
 
-    def test_rate_limit_enforcement(self):
+    @patch('api.limiter.time.time', return_value=1000.0)
+    def test_rate_limit_enforcement(self, mock_time):
         # The limit is 20 requests per minute
+        # Tokens refill continuously (one every 3 seconds), so the clock is frozen to keep the requests "rapid"
         # We need a bounded problem to ensure solver succeeds
         payload = {
             "c": [1, 1],
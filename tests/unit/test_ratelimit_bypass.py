@@ -1,6 +1,7 @@
 import sys
 import os
 import unittest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 
 # Add root to path
@@ -15,7 +16,8 @@ class TestRateLimitBypass(unittest.TestCase):
         # Reset limiter store before each test
         api.limiter.rate_limit_store.clear()
 
-    def test_ip_spoofing_prevention(self):
+    @patch('api.limiter.time.time', return_value=1000.0)
+    def test_ip_spoofing_prevention(self, mock_time):
         """
         Simulates an attacker trying to bypass rate limiting by spoofing X-Forwarded-For headers.
         The attacker sends: 'spoofed-ip, real-ip'.
@@ -29,6 +31,7 @@ class TestRateLimitBypass(unittest.TestCase):
             "maximize": True
         }
 
+        # Tokens refill continuously, so the clock is frozen to keep the requests within one refill interval
         real_ip = "203.0.113.1"
         limit = api.limiter.RATE_LIMIT_REQUESTS # 20
 
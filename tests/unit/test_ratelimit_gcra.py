@@ -0,0 +1,187 @@
+import sys
+import os
+import asyncio
+import socketserver
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+from api.index import app
+import api.limiter
+from api.limiter import MemoryBackend, SQLiteBackend, RedisBackend, gcra
+
+LP_PARAMS = {"c": [1, 1], "A_ub": [[1, 0], [0, 1]], "b_ub": [1, 1], "maximize": True}
+IP_PARAMS = {"c": [5, 8], "A_ub": [[1, 1], [5, 9]], "b_ub": [6, 45], "maximize": True, "render": "data"}
+
+def request_from(ip):
+    request = MagicMock()
+    request.client.host = ip
+    request.headers = {}
+    request.url.path = "/api/lp"
+    return request
+
+class RESPHandler(socketserver.StreamRequestHandler):
+    """Just enough of a Redis-compatible server for RedisBackend: AUTH, SELECT, EVALSHA and EVAL of its script."""
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2].decode())
+        return args
+
+    def handle(self):
+        server = self.server
+        while (args := self.read_command()) is not None:
+            server.commands.append(args[0])
+            if args[0] in ("AUTH", "SELECT"):
+                self.wfile.write(b"+OK\r\n")
+                continue
+            script, (key, now, increment, burst) = args[1], args[3:]
+            if args[0] == "EVALSHA" and script not in server.scripts:
+                self.wfile.write(b"-NOSCRIPT No matching script.\r\n")
+                continue
+            if args[0] == "EVAL":
+                assert script == RedisBackend.SCRIPT
+                server.scripts.add(RedisBackend.SCRIPT_SHA)
+            # The script's GCRA step, evaluated here instead of by Lua
+            now = float(now)
+            new_tat = max(server.data.get(key, now), now) + float(increment)
+            ahead = new_tat - now
+            if ahead > float(burst):
+                reply = str(ahead - float(burst)).encode()
+            else:
+                server.data[key] = new_tat
+                reply = b"0"
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(reply), reply))
+
+class TestGCRA(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+
+    def test_single_float_per_client(self):
+        for _ in range(3):
+            self.client.post("/api/lp", json=LP_PARAMS)
+        self.assertEqual(len(api.limiter.rate_limit_store), 1)
+        self.assertIsInstance(next(iter(api.limiter.rate_limit_store.values())), float)
+
+    @patch('api.limiter.time.time')
+    def test_tokens_refill_evenly(self, mock_time):
+        mock_time.return_value = 1000.0
+        for _ in range(api.limiter.RATE_LIMIT_REQUESTS):
+            self.assertEqual(self.client.post("/api/lp", json=LP_PARAMS).status_code, 200)
+        response = self.client.post("/api/lp", json=LP_PARAMS)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["retry-after"], "3")
+
+        # One emission interval later exactly one token is back
+        mock_time.return_value = 1003.0
+        self.assertEqual(self.client.post("/api/lp", json=LP_PARAMS).status_code, 200)
+        self.assertEqual(self.client.post("/api/lp", json=LP_PARAMS).status_code, 429)
+
+    @patch('api.limiter.time.time', return_value=1000.0)
+    def test_endpoint_costs(self, mock_time):
+        # An IP solve costs 4 of the 20 tokens
+        for _ in range(5):
+            self.assertEqual(self.client.post("/api/ip", json=IP_PARAMS).status_code, 200)
+        response = self.client.post("/api/ip", json=IP_PARAMS)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["retry-after"], "12")
+        # The bucket is shared, so cheaper endpoints are limited too
+        self.assertEqual(self.client.post("/api/lp", json=LP_PARAMS).status_code, 429)
+
+    @patch('api.limiter.time.time', return_value=1000.0)
+    def test_job_costs_its_solver(self, mock_time):
+        for _ in range(5):
+            self.assertEqual(self.client.post("/api/jobs", json={"solver": "ip", "params": IP_PARAMS}).status_code, 202)
+        self.assertEqual(self.client.post("/api/jobs", json={"solver": "ip", "params": IP_PARAMS}).status_code, 429)
+
+    def test_blocked_requests_spend_nothing(self):
+        tat, _ = gcra(None, 1000.0, 20)
+        self.assertEqual(tat, 1060.0)
+        self.assertEqual(gcra(tat, 1000.0, 1), (None, 3.0))
+        self.assertEqual(gcra(tat, 1003.0, 1), (1063.0, 0.0))
+
+class TestBackends(unittest.TestCase):
+    def setUp(self):
+        api.limiter.rate_limit_store.clear()
+
+    def exhaust(self, backend, key="203.0.113.1", now=1000.0):
+        for _ in range(api.limiter.RATE_LIMIT_REQUESTS):
+            self.assertEqual(backend.acquire(key, now, 1), 0.0)
+
+    def test_sqlite_shared_between_workers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ratelimit.db")
+            # Two backends on one file stand in for two worker processes
+            first, second = SQLiteBackend(path), SQLiteBackend(path)
+            self.exhaust(first)
+            self.assertEqual(second.acquire("203.0.113.1", 1000.0, 1), 3.0)
+            self.assertEqual(second.acquire("198.51.100.1", 1000.0, 1), 0.0)
+            self.assertEqual(first.acquire("203.0.113.1", 1061.0, 1), 0.0)
+
+    def test_sqlite_prunes_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = SQLiteBackend(os.path.join(tmp, "ratelimit.db"), max_keys=10)
+            backend.PRUNE_EVERY = 50
+            for i in range(50):
+                backend.acquire(f"10.0.0.{i}", 1000.0, 1)
+            count = backend._conn().execute("SELECT count(*) FROM rate_limit").fetchone()[0]
+            self.assertEqual(count, 10)
+            # Full buckets carry no state, so their rows go first
+            backend.acquire("10.0.0.0", 2000.0, 1)
+            for i in range(49):
+                backend.acquire("10.0.0.0", 2000.0 + 3 * i, 1)
+            count = backend._conn().execute("SELECT count(*) FROM rate_limit").fetchone()[0]
+            self.assertEqual(count, 1)
+
+    def test_redis_protocol(self):
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), RESPHandler)
+        server.daemon_threads = True
+        server.data, server.scripts, server.commands = {}, set(), []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            host, port = server.server_address
+            backend = RedisBackend(f"redis://:secret@{host}:{port}/2")
+            self.exhaust(backend)
+            self.assertEqual(backend.acquire("203.0.113.1", 1000.0, 1), 3.0)
+            self.assertEqual(backend.acquire("203.0.113.1", 1010.0, 2), 0.0)
+            self.assertAlmostEqual(server.data["optimax:ratelimit:203.0.113.1"], 1066.0)
+            # The script is sent once; afterwards only its hash
+            self.assertEqual(server.commands[:4], ["AUTH", "SELECT", "EVALSHA", "EVAL"])
+            self.assertEqual(set(server.commands[4:]), {"EVALSHA"})
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_unavailable_backend_falls_back_to_memory(self):
+        # Nothing listens on port 1
+        with patch.object(api.limiter, "backend", RedisBackend("redis://127.0.0.1:1")):
+            async def run_test():
+                for _ in range(api.limiter.RATE_LIMIT_REQUESTS):
+                    await api.limiter.check_rate_limit(request_from("203.0.113.1"))
+                with self.assertRaises(HTTPException) as raised:
+                    await api.limiter.check_rate_limit(request_from("203.0.113.1"))
+                self.assertEqual(raised.exception.status_code, 429)
+            with self.assertLogs("api.limiter", level="WARNING"):
+                asyncio.run(run_test())
+
+    def test_memory_backend_is_bounded(self):
+        backend = MemoryBackend()
+        with patch.object(api.limiter, "MAX_STORE_SIZE", 5):
+            for i in range(10):
+                backend.acquire(f"10.0.0.{i}", 1000.0, 1)
+        self.assertEqual(list(api.limiter.rate_limit_store), [f"10.0.0.{i}" for i in range(5, 10)])
+
+if __name__ == '__main__':
+    unittest.main()
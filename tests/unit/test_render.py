@@ -0,0 +1,192 @@
+import sys
+import os
+import unittest
+import json
+import numpy as np
+import signal
+from unittest.mock import patch
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi.testclient import TestClient
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+from api.index import app
+from api import plotting
+from api.solvers import lp, stochastic
+import api.limiter
+
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+LP_PAYLOAD = {"c": [3, 2], "A_ub": [[2, 1], [1, 1], [1, 0]], "b_ub": [100, 80, 40], "maximize": True}
+IP_PAYLOAD = {"c": [5, 8], "A_ub": [[1, 1], [5, 9]], "b_ub": [6, 45], "maximize": True}
+LAGRANGIAN_PAYLOAD = {"costs": [[4, 6], [5, 3], [2, 7]], "weights": [[2, 3], [3, 2], [2, 2]], "capacities": [4, 4], "max_iter": 20}
+STOCHASTIC_PAYLOAD = {"total_land": 500, "scenarios": [
+    {"name": "Above", "probability": 1 / 3, "yields": [3.0, 3.6, 24.0]},
+    {"name": "Average", "probability": 1 / 3, "yields": [2.5, 3.0, 20.0]},
+    {"name": "Below", "probability": 1 / 3, "yields": [2.0, 2.4, 16.0]},
+]}
+
+class TestRenderData(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+
+    def post_both(self, path, payload, key="plot"):
+        """Posts the payload with render=png and render=data; returns both responses' JSON after checking the data one."""
+        png = self.client.post(path, json=payload)
+        data = self.client.post(path, json={**payload, "render": "data"})
+        self.assertEqual(png.status_code, 200)
+        self.assertEqual(data.status_code, 200)
+        self.assertIsNotNone(png.json()[key])
+        self.assertIsNone(data.json()[key])
+        # The series are much smaller than the embedded PNG
+        self.assertLess(len(data.content), len(png.content) / 2)
+        # ...and draw the same kind of figure
+        self.assertTrue(plotting.render_png(data.json()["plot_data"]).startswith(PNG_MAGIC))
+        return png.json(), data.json()
+
+    def test_lp(self):
+        _, data = self.post_both("/api/lp", LP_PAYLOAD)
+        spec = data["plot_data"]
+        self.assertEqual(spec["kind"], "lp")
+        self.assertEqual(len(spec["constraints"]), 3)
+        # x1 <= 40 is vertical
+        self.assertEqual(spec["constraints"][2]["vertical"], 40.0)
+        self.assertEqual(spec["optimum"], [20.0, 60.0])
+        self.assertAlmostEqual(spec["objective"]["value"], 180.0)
+        np.testing.assert_allclose(spec["feasible"], [[0, 0], [40, 0], [40, 20], [20, 60], [0, 80]], atol=1e-9)
+        self.assertEqual(data["feasible_region"], spec["feasible"])
+
+    def test_ip_tree(self):
+        _, data = self.post_both("/api/ip", IP_PAYLOAD, key="tree_plot")
+        nodes = data["plot_data"]["nodes"]
+        self.assertEqual(nodes[0]["parent"], None)
+        self.assertIn("integer", {n["status"] for n in nodes})
+        self.assertTrue(all(n["parent"] in {m["id"] for m in nodes} for n in nodes[1:]))
+
+    def test_lagrangian_history(self):
+        _, data = self.post_both("/api/lagrangian", LAGRANGIAN_PAYLOAD)
+        self.assertEqual(data["plot_data"]["lb"], data["lb_history"])
+
+    def test_stochastic(self):
+        _, data = self.post_both("/api/stochastic", STOCHASTIC_PAYLOAD)
+        spec = data["plot_data"]
+        self.assertEqual(spec["scenario_names"], ["Above", "Average", "Below"])
+        self.assertAlmostEqual(sum(spec["scenario_profits"]) / 3, spec["expected_profit"], places=2)
+
+    def test_stochastic_histogram(self):
+        scenarios = [{"name": f"S{i}", "probability": 1 / 60, "yields": [2 + i / 60, 3.0, 20.0]} for i in range(60)]
+        res = stochastic.solve_stochastic(500, scenarios, render="data")
+        histogram = res["plot_data"]["histogram"]
+        self.assertEqual(sum(histogram["counts"]), 60)
+        self.assertEqual(len(histogram["edges"]), 21)
+
+    def test_skipped_plot_and_invalid_mode(self):
+        # Integral root relaxation: no tree
+        response = self.client.post("/api/ip", json={**IP_PAYLOAD, "b_ub": [5, 45], "render": "data"})
+        self.assertIsNone(response.json()["plot_data"])
+
+        response = self.client.post("/api/lp", json={**LP_PAYLOAD, "render": "svg"})
+        self.assertEqual(response.status_code, 422)
+
+    def test_specs_are_plain_json(self):
+        response = self.client.post("/api/lp", json={**LP_PAYLOAD, "render": "data"})
+        spec = response.json()["plot_data"]
+        self.assertEqual(json.loads(json.dumps(spec)), spec)
+
+class TestAsyncRender(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+
+    def test_plot_id_and_fetch(self):
+        response = self.client.post("/api/ip", json={**IP_PAYLOAD, "render": "async"})
+        data = response.json()
+        self.assertIsNone(data["tree_plot"])
+        self.assertIn("no-store", response.headers["cache-control"])
+
+        response = self.client.get(f"/api/plot/{data['tree_plot_id']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "image/png")
+        self.assertTrue(response.content.startswith(PNG_MAGIC))
+        # Exempt from the global no-store policy; the other security headers stay
+        self.assertIn("max-age=", response.headers["cache-control"])
+        self.assertNotIn("no-store", response.headers["cache-control"])
+        self.assertEqual(response.headers["x-content-type-options"], "nosniff")
+
+        etag = response.headers["etag"]
+        response = self.client.get(f"/api/plot/{data['tree_plot_id']}", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_skipped_unknown_and_invalid(self):
+        response = self.client.post("/api/lp", json={**LP_PAYLOAD, "c": [1, 1, 1], "A_ub": [[1, 1, 1]], "b_ub": [4], "render": "async"})
+        self.assertIsNone(response.json()["plot_id"])
+        self.assertEqual(self.client.get("/api/plot/" + "A" * 22).status_code, 404)
+        self.assertEqual(self.client.get("/api/plot/../index").status_code, 404)
+        self.assertEqual(self.client.get("/api/plot/not-an-id").status_code, 422)
+
+    def test_store_is_bounded(self):
+        spec = {"kind": "convergence", "lb": [1.0, 2.0]}
+        with patch.object(plotting, "MAX_STORED_PLOTS", 3):
+            ids = [plotting.submit(spec) for _ in range(5)]
+            self.assertEqual(len(plotting.plot_store), 3)
+        self.assertIsNone(plotting.get_plot(ids[0]))
+        self.assertTrue(plotting.get_plot(ids[-1]).result().startswith(PNG_MAGIC))
+
+    def test_render_pool_recovers_from_dead_worker(self):
+        spec = {"kind": "convergence", "lb": [1.0, 2.0]}
+        self.assertTrue(plotting.render_in_pool(spec).result().startswith(PNG_MAGIC))
+        pool = plotting._pool()
+        if not isinstance(pool, ProcessPoolExecutor):
+            self.skipTest("render pool fell back to threads")
+        for pid in list(pool._processes):
+            os.kill(pid, signal.SIGKILL)
+        with self.assertRaises(BrokenProcessPool):
+            pool.submit(plotting.render_png, spec).result()
+        self.assertTrue(plotting.render_in_pool(spec).result().startswith(PNG_MAGIC))
+        self.assertIsNot(plotting._pool(), pool)
+
+    def test_render_workers_are_not_forked(self):
+        # The pool is started from request threads, where a forked child can inherit a held lock
+        pool = plotting._pool()
+        if not isinstance(pool, ProcessPoolExecutor):
+            self.skipTest("render pool fell back to threads")
+        self.assertIn(pool._mp_context.get_start_method(), ("forkserver", "spawn"))
+
+def polygon_area(vertices):
+    x, y = np.asarray(vertices).T
+    return 0.5 * (x @ np.roll(y, -1) - y @ np.roll(x, -1))
+
+class TestFeasiblePolygon(unittest.TestCase):
+    def test_vertical_and_negative_slope(self):
+        # x1 >= 2 (vertical, lower side) and x2 >= x1 - 4 (a2 < 0) were mis-shaded by the sampled envelope
+        A = [[-1, 0], [1, -1], [1, 1]]
+        b = [-2, 4, 10]
+        vertices = lp.feasible_polygon(A, b, 12)
+        np.testing.assert_allclose(vertices, [[2, 0], [4, 0], [7, 3], [2, 8]], atol=1e-9)
+        self.assertAlmostEqual(polygon_area(vertices), 23.0)
+
+    def test_clipped_to_window_and_bounds(self):
+        # Unbounded region is cut off at the plot window; bounds are half-planes too
+        self.assertAlmostEqual(polygon_area(lp.feasible_polygon([[-1, 1]], [0], 10)), 50.0)
+        vertices = lp.feasible_polygon([[-1, 1]], [0], 10, bounds=[(1, 5), (None, None)])
+        self.assertAlmostEqual(polygon_area(vertices), 12.0)
+
+    def test_redundant_parallel_and_empty(self):
+        vertices = lp.feasible_polygon([[1, 1], [2, 2], [1, 1]], [4, 10, 6], 10)
+        np.testing.assert_allclose(vertices, [[0, 0], [4, 0], [0, 4]], atol=1e-9)
+        self.assertEqual(lp.feasible_polygon([[1, 1], [-1, -1]], [2, -3], 10), [])
+        self.assertEqual(lp.feasible_polygon([[0, 0]], [-1], 10), [])
+        # A single point is degenerate
+        self.assertEqual(lp.feasible_polygon([[1, 1]], [0], 10), [])
+
+    def test_lp_response_and_png(self):
+        res = lp.solve_lp([1, 1], [[-1, 0], [1, -1], [1, 1]], [-2, 4, 10], maximize=True)
+        self.assertAlmostEqual(polygon_area(res['feasible_region']), 23.0)
+        self.assertIsNotNone(res['plot'])
+
+if __name__ == '__main__':
+    unittest.main()
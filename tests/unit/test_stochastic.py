@@ -0,0 +1,585 @@
+import sys
+import os
+import unittest
+import base64
+import tracemalloc
+import numpy as np
+from fastapi.testclient import TestClient
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+from api.index import app
+from api.solvers import stochastic, twostage
+import api.limiter
+from benchmarks.bench_stochastic import generate_scenarios
+
+# Birge & Louveaux's three-scenario farmer instance (expected profit 108,390)
+FARMER_SCENARIOS = [
+    {"name": "Above", "probability": 1 / 3, "yields": [3.0, 3.6, 24.0]},
+    {"name": "Average", "probability": 1 / 3, "yields": [2.5, 3.0, 20.0]},
+    {"name": "Below", "probability": 1 / 3, "yields": [2.0, 2.4, 16.0]},
+]
+
+class TestLShaped(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+
+    def test_textbook_instance(self):
+        res = stochastic.solve_stochastic(500, FARMER_SCENARIOS, method="lshaped")
+        self.assertTrue(res['success'])
+        self.assertTrue(res['converged'])
+        self.assertAlmostEqual(res['expected_profit'], 108390, places=2)
+        np.testing.assert_allclose(res['x'], [170, 80, 250], atol=1e-6)
+
+    def test_matches_extensive_form(self):
+        scenarios = generate_scenarios(300, seed=4)
+        extensive = stochastic.solve_stochastic(500, scenarios)
+        for groups in (1, 20, 300):
+            res = stochastic.solve_stochastic(500, scenarios, method="lshaped", max_iter=100, max_cut_groups=groups)
+            self.assertTrue(res['converged'])
+            self.assertEqual(res['cut_groups'], groups)
+            self.assertAlmostEqual(res['expected_profit'], extensive['expected_profit'], delta=1e-4 * extensive['expected_profit'])
+            lower, upper = res['profit_bounds']
+            self.assertLessEqual(lower, upper + 1e-6)
+
+    def test_zero_tolerance_stops_without_new_cuts(self):
+        scenarios = generate_scenarios(2000, seed=5)
+        extensive = stochastic.solve_stochastic(500, scenarios)
+        # With tol=0 the loop ends once no group's theta is below its recourse, long before max_iter
+        res = stochastic.solve_stochastic(500, scenarios, method="lshaped", max_iter=200, tol=0, max_cut_groups=500)
+        self.assertTrue(res['converged'])
+        self.assertLess(res['iterations'], 200)
+        self.assertAlmostEqual(res['expected_profit'], extensive['expected_profit'], delta=1e-6 * extensive['expected_profit'])
+
+    def test_time_limit(self):
+        scenarios = generate_scenarios(2000, seed=5)
+        for method in ("lshaped", "ph"):
+            res = stochastic.solve_stochastic(500, scenarios, method=method, tol=0, ph_tol=1e-12, time_limit=1e-9)
+            self.assertFalse(res['converged'])
+            self.assertEqual(res['stop_reason'], "time_limit")
+            self.assertEqual(res['iterations'], 1)
+        res = stochastic.solve_stochastic(500, FARMER_SCENARIOS, method="lshaped")
+        self.assertEqual(res['stop_reason'], "gap")
+
+    def test_recourse_duals_give_valid_cuts(self):
+        ylds = np.array([s['yields'] for s in FARMER_SCENARIOS])
+        q, W, h, T = stochastic.farmer_recourse(ylds)
+        x0 = np.array([100.0, 100.0, 300.0])
+        Q0, pi = stochastic.solve_recourse(x0, q, W, h, T, chunk_size=2)
+        grad = -np.einsum('sr,src->sc', pi, T)
+        rng = np.random.default_rng(0)
+        for _ in range(5):
+            x = rng.uniform(0, 300, size=3)
+            Q, _ = stochastic.solve_recourse(x, q, W, h, T)
+            # Convexity: the cut at x0 underestimates the recourse cost everywhere
+            self.assertTrue(np.all(Q >= Q0 + grad @ (x - x0) - 1e-6))
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            stochastic.solve_stochastic(500, FARMER_SCENARIOS, method="benders")
+
+    def test_api_lshaped(self):
+        payload = {"total_land": 500, "scenarios": FARMER_SCENARIOS, "method": "lshaped"}
+        response = self.client.post("/api/stochastic", json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(response.json()['expected_profit'], 108390, places=2)
+
+        payload["max_iter"] = 100000
+        response = self.client.post("/api/stochastic", json=payload)
+        self.assertEqual(response.status_code, 422)
+
+class TestClosedFormRecourse(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+        rng = np.random.default_rng(1)
+        self.ylds = rng.uniform([2.0, 2.4, 16.0], [3.0, 3.6, 24.0], size=(200, 3))
+        self.X = rng.uniform(0, 300, size=(5, 3))
+
+    def test_matches_recourse_lp(self):
+        profits = stochastic.farmer_profits(self.X, self.ylds)
+        q, W, h, T = stochastic.farmer_recourse(self.ylds)
+        for k in range(self.X.shape[0]):
+            Q, _ = stochastic.solve_recourse(self.X[k], q, W, h, T)
+            np.testing.assert_allclose(profits[k], -Q - self.X[k] @ stochastic.PLANTING_COSTS, atol=1e-6)
+
+    def test_chunked_evaluation(self):
+        probs = np.full(200, 1 / 200)
+        whole = stochastic.evaluate_candidates(self.X, [(self.ylds, probs)])
+        chunked = stochastic.evaluate_candidates(self.X, stochastic.iter_scenario_chunks(self.ylds, probs, chunk_size=7))
+        np.testing.assert_allclose(whole['expected_profit'], chunked['expected_profit'])
+        self.assertEqual(chunked['n_scenarios'], 200)
+        profits = stochastic.farmer_profits(self.X, self.ylds)
+        np.testing.assert_allclose(chunked['min_profit'], profits.min(axis=1))
+        self.assertEqual(chunked['best_candidate'], int(np.argmax(profits.mean(axis=1))))
+
+    def test_textbook_solution_value(self):
+        ylds = np.array([s['yields'] for s in FARMER_SCENARIOS])
+        res = stochastic.evaluate_candidates([[170, 80, 250]], [(ylds, np.full(3, 1 / 3))])
+        self.assertAlmostEqual(res['expected_profit'][0], 108390, places=6)
+
+    def test_api_evaluate(self):
+        payload = {"candidates": [[170, 80, 250], [120, 80, 300]], "yields": [s['yields'] for s in FARMER_SCENARIOS]}
+        response = self.client.post("/api/stochastic/evaluate", json=payload)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertAlmostEqual(data['expected_profit'][0], 108390, places=6)
+        self.assertEqual(data['best_candidate'], 0)
+
+        payload["probabilities"] = [0.5, 0.5]
+        response = self.client.post("/api/stochastic/evaluate", json=payload)
+        self.assertEqual(response.status_code, 422)
+
+        payload["probabilities"] = None
+        payload["candidates"] = [[-1, 80, 250]]
+        response = self.client.post("/api/stochastic/evaluate", json=payload)
+        self.assertEqual(response.status_code, 422)
+
+class TestStochasticMetrics(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+
+    def test_textbook_evpi_vss(self):
+        for method in ("extensive", "lshaped"):
+            res = stochastic.solve_stochastic(500, FARMER_SCENARIOS, method=method, metrics=True)
+            self.assertAlmostEqual(res['wait_and_see'], 115405.56, places=1)
+            self.assertAlmostEqual(res['eev'], 107240, places=2)
+            self.assertAlmostEqual(res['evpi'], 7015.56, places=1)
+            self.assertAlmostEqual(res['vss'], 1150, places=2)
+            np.testing.assert_allclose(res['ev_solution'], [120, 80, 300], atol=1e-6)
+
+    def test_risk_averse_metrics_use_risk_neutral_value(self):
+        # A CVaR plan trades expected profit for its tail, so it must not stand in for RP
+        for method in ("extensive", "frontier"):
+            res = stochastic.solve_stochastic(500, FARMER_SCENARIOS, method=method, metrics=True,
+                                              cvar_weight=0.9, cvar_alpha=0.9, render="data")
+            self.assertLess(res['expected_profit'], 108390 - 1)
+            self.assertAlmostEqual(res['evpi'], 7015.56, places=1)
+            self.assertAlmostEqual(res['vss'], 1150, places=2)
+            self.assertGreaterEqual(res['vss'], 0)
+
+    def test_wait_and_see_matches_single_solves(self):
+        ylds = np.array([[2.5, 3.0, 20.0], [2.75, 3.3, 22.0], [0.0, 3.0, 20.0]])
+        profits, X = stochastic.solve_wait_and_see(500, ylds)
+        np.testing.assert_allclose(profits, np.diag(stochastic.farmer_profits(X, ylds)), atol=1e-6)
+        for s in range(3):
+            single = stochastic.solve_stochastic(500, [{"name": "S", "probability": 1.0, "yields": ylds[s].tolist()}])
+            self.assertAlmostEqual(profits[s], single['expected_profit'], places=4)
+
+    def test_metrics_are_optional(self):
+        res = stochastic.solve_stochastic(500, FARMER_SCENARIOS)
+        self.assertNotIn('evpi', res)
+        payload = {"total_land": 500, "scenarios": FARMER_SCENARIOS, "metrics": True}
+        response = self.client.post("/api/stochastic", json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(response.json()['evpi'], 0)
+        self.assertGreaterEqual(response.json()['vss'], 0)
+
+class TestSAA(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+        self.distributions = [("uniform", [2.0, 3.0]), ("normal", [3.0, 0.3]), ("triangular", [16.0, 20.0, 24.0])]
+
+    def test_seeded_and_reproducible(self):
+        a = stochastic.solve_saa(500, self.distributions, sample_size=50, replications=4, eval_size=5000, seed=3, workers=1)
+        b = stochastic.solve_saa(500, self.distributions, sample_size=50, replications=4, eval_size=5000, seed=3, workers=1)
+        self.assertEqual(a['x'], b['x'])
+        self.assertEqual(len(a['replications']), 4)
+        # Replications draw different samples
+        self.assertNotEqual(a['replications'][0]['x'], a['replications'][1]['x'])
+
+    def test_confidence_intervals(self):
+        res = stochastic.solve_saa(500, self.distributions, sample_size=100, replications=6, eval_size=20000, workers=1)
+        low, high = res['profit_ci']
+        self.assertLess(low, res['expected_profit'])
+        self.assertGreater(high, res['expected_profit'])
+        low, high = res['upper_bound_ci']
+        self.assertLess(low, res['upper_bound'])
+        self.assertGreater(res['gap_ci_upper'], res['gap'])
+        # The chosen plan is the best one on the selection sample
+        best = max(res['replications'], key=lambda r: r['eval_profit'])
+        self.assertEqual(res['x'], best['x'])
+        # ...but its lower bound comes from an independent sample, not the (upward biased) best of the means
+        seeds = np.random.SeedSequence(0).spawn(6 + 2)
+        ylds = np.concatenate(list(stochastic.sample_yields(self.distributions, 20000, np.random.default_rng(seeds[-1]))))
+        independent = stochastic.farmer_profits(np.array([res['x']]), ylds)[0].mean()
+        self.assertAlmostEqual(res['expected_profit'], independent, places=4)
+        self.assertNotEqual(res['expected_profit'], best['eval_profit'])
+
+    def test_chunked_sampling(self):
+        rng_a, rng_b = np.random.default_rng(0), np.random.default_rng(0)
+        whole = np.concatenate(list(stochastic.sample_yields(self.distributions, 1000, rng_a)))
+        chunks = list(stochastic.sample_yields(self.distributions, 1000, rng_b, chunk_size=300))
+        self.assertEqual([c.shape[0] for c in chunks], [300, 300, 300, 100])
+        self.assertEqual(whole.shape, (1000, 3))
+        self.assertTrue(np.all(whole >= 0))
+
+    def test_parallel_matches_serial(self):
+        serial = stochastic.solve_saa(500, self.distributions, sample_size=30, replications=2, eval_size=1000, workers=1)
+        parallel = stochastic.solve_saa(500, self.distributions, sample_size=30, replications=2, eval_size=1000, workers=2)
+        np.testing.assert_allclose(serial['x'], parallel['x'])
+        # Requests share one pool instead of starting their own
+        pool = stochastic._saa_pool
+        stochastic.solve_saa(500, self.distributions, sample_size=30, replications=2, eval_size=1000, workers=2)
+        self.assertIs(stochastic._saa_pool, pool)
+        self.assertIn(pool._mp_context.get_start_method(), ("forkserver", "spawn"))
+
+    def test_invalid_distributions(self):
+        with self.assertRaises(ValueError):
+            stochastic.solve_saa(500, [("uniform", [3.0, 2.0])] * 3, workers=1)
+        with self.assertRaises(ValueError):
+            stochastic.solve_saa(500, [("triangular", [1.0, 2.0])] * 3, workers=1)
+
+    def test_api_saa(self):
+        payload = {
+            "total_land": 500,
+            "distributions": [{"kind": k, "params": p} for k, p in self.distributions],
+            "sample_size": 30, "replications": 2, "eval_size": 1000
+        }
+        response = self.client.post("/api/stochastic/saa", json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('gap_ci_upper', response.json())
+
+        payload["distributions"][0]["kind"] = "cauchy"
+        response = self.client.post("/api/stochastic/saa", json=payload)
+        self.assertEqual(response.status_code, 422)
+
+class TestScenarioReduction(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+
+    def test_duplicates_reduce_without_error(self):
+        base = np.array([s['yields'] for s in FARMER_SCENARIOS])
+        ylds = np.repeat(base, 4, axis=0)
+        probs = np.full(12, 1 / 12)
+        kept, new_probs, error = stochastic.reduce_scenarios(probs, ylds, 3)
+        self.assertAlmostEqual(error, 0.0, places=9)
+        np.testing.assert_allclose(np.sort(new_probs), [1 / 3] * 3)
+        self.assertEqual(len({tuple(ylds[k]) for k in kept}), 3)
+
+    def test_error_shrinks_with_kept_scenarios(self):
+        scenarios = generate_scenarios(200, seed=6)
+        ylds = np.array([s['yields'] for s in scenarios])
+        probs = np.full(200, 1 / 200)
+        errors = []
+        for n_keep in (5, 20, 80):
+            kept, new_probs, error = stochastic.reduce_scenarios(probs, ylds, n_keep)
+            self.assertEqual(len(set(kept.tolist())), n_keep)
+            self.assertAlmostEqual(new_probs.sum(), 1.0)
+            errors.append(error)
+        self.assertGreater(errors[0], errors[1])
+        self.assertGreater(errors[1], errors[2])
+        # Keeping everything is exact
+        self.assertAlmostEqual(stochastic.reduce_scenarios(probs, ylds, 200)[2], 0.0, places=6)
+
+    def test_probabilities_go_to_nearest_kept(self):
+        ylds = np.array([[2.0, 3.0, 20.0], [2.1, 3.0, 20.0], [3.0, 3.6, 24.0], [2.9, 3.6, 24.0]])
+        probs = np.array([0.1, 0.2, 0.3, 0.4])
+        kept, new_probs, error = stochastic.reduce_scenarios(probs, ylds, 2)
+        groups = {int(k): p for k, p in zip(kept, new_probs)}
+        self.assertAlmostEqual(sum(p for k, p in groups.items() if k < 2), 0.3)
+        self.assertAlmostEqual(sum(p for k, p in groups.items() if k >= 2), 0.7)
+        # Keeping the likelier scenario of each pair is optimal: 0.1 * 0.1 + 0.3 * 0.1 moved
+        self.assertEqual(sorted(kept.tolist()), [1, 3])
+        self.assertAlmostEqual(error, 0.04, places=9)
+
+    def test_peak_memory_is_the_float32_matrix(self):
+        n = 3000
+        rng = np.random.default_rng(8)
+        ylds = rng.normal([2.5, 3.0, 20.0], [0.5, 0.5, 3.0], (n, 3))
+        tracemalloc.start()
+        try:
+            stochastic.reduce_scenarios(np.full(n, 1 / n), ylds, 10)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        # 4 n^2 bytes for the matrix plus the blocked float64 temporaries, not several n x n float64 arrays
+        self.assertLess(peak, 4 * n * n + 4 * 8 * stochastic.REDUCTION_BLOCK)
+
+    def test_solve_with_reduction(self):
+        scenarios = generate_scenarios(300, seed=7)
+        full = stochastic.solve_stochastic(500, scenarios)
+        res = stochastic.solve_stochastic(500, scenarios, reduce_to=40)
+        reduction = res['reduction']
+        self.assertEqual(len(reduction['kept']), 40)
+        self.assertEqual(reduction['original_scenarios'], 300)
+        self.assertGreater(reduction['error'], 0)
+        # The reduced plan can only be worse on the full distribution, but not by much
+        self.assertLessEqual(reduction['full_expected_profit'], full['expected_profit'] + 1e-6)
+        self.assertGreater(reduction['full_expected_profit'], 0.99 * full['expected_profit'])
+
+    def test_api_reduction(self):
+        payload = {"total_land": 500, "scenarios": FARMER_SCENARIOS, "reduce_to": 2}
+        response = self.client.post("/api/stochastic", json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['reduction']['kept']), 2)
+
+        payload["reduce_to"] = 0
+        response = self.client.post("/api/stochastic", json=payload)
+        self.assertEqual(response.status_code, 422)
+
+class TestColumnarUpload(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+        self.probs = np.full(3, 1 / 3)
+        self.ylds = np.array([s['yields'] for s in FARMER_SCENARIOS])
+
+    def pack(self, probs, ylds):
+        return np.concatenate([probs, ylds.T.ravel()]).astype('<f8').tobytes()
+
+    def test_unpack_is_zero_copy(self):
+        body = self.pack(self.probs, self.ylds)
+        probs, ylds = stochastic.unpack_columnar(body)
+        np.testing.assert_array_equal(probs, self.probs)
+        np.testing.assert_array_equal(ylds, self.ylds)
+        self.assertFalse(probs.flags.owndata)
+        self.assertFalse(ylds.flags.owndata)
+        self.assertFalse(ylds.flags.writeable)
+
+    def test_unpack_validation(self):
+        with self.assertRaises(ValueError):
+            stochastic.unpack_columnar(self.pack(self.probs, self.ylds)[:-1])
+        with self.assertRaises(ValueError):
+            stochastic.unpack_columnar(self.pack(self.probs, self.ylds)[:-8])
+        with self.assertRaises(ValueError):
+            stochastic.unpack_columnar(self.pack(np.array([0.5, 0.5, 1.5]), self.ylds))
+        bad = self.ylds.copy()
+        bad[1, 2] = np.nan
+        with self.assertRaises(ValueError):
+            stochastic.unpack_columnar(self.pack(self.probs, bad))
+        with self.assertRaises(ValueError):
+            stochastic.unpack_columnar(self.pack(self.probs, self.ylds), max_scenarios=2)
+
+    def test_api_octet_stream(self):
+        response = self.client.post("/api/stochastic/columnar?total_land=500&method=lshaped",
+                                    content=self.pack(self.probs, self.ylds),
+                                    headers={"content-type": "application/octet-stream"})
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(response.json()['expected_profit'], 108390, places=2)
+
+        response = self.client.post("/api/stochastic/columnar?total_land=500&method=simplex",
+                                    content=self.pack(self.probs, self.ylds),
+                                    headers={"content-type": "application/octet-stream"})
+        self.assertEqual(response.status_code, 422)
+
+    def test_api_base64(self):
+        payload = {
+            "total_land": 500,
+            "probabilities": base64.b64encode(self.probs.astype('<f8').tobytes()).decode(),
+            "yields": base64.b64encode(self.ylds.T.astype('<f8').tobytes()).decode(),
+            "metrics": True
+        }
+        response = self.client.post("/api/stochastic/columnar", json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(response.json()['vss'], 1150, places=2)
+
+        payload["yields"] = "not base64!"
+        response = self.client.post("/api/stochastic/columnar", json=payload)
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_content_type_and_size(self):
+        response = self.client.post("/api/stochastic/columnar?total_land=500", content=b"abc",
+                                    headers={"content-type": "text/plain"})
+        self.assertEqual(response.status_code, 415)
+
+        # Bodies above the JSON limit are accepted here (this one is rejected later, for its NaN)
+        n = 80_000
+        probs = np.full(n, np.nan)
+        body = self.pack(probs, np.ones((n, 3)))
+        self.assertGreater(len(body), 2_000_000)
+        response = self.client.post("/api/stochastic/columnar?total_land=500", content=body,
+                                    headers={"content-type": "application/octet-stream"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post("/api/stochastic/columnar?total_land=500", content=b"",
+                                    headers={"content-type": "application/octet-stream", "content-length": "30000000"})
+        self.assertEqual(response.status_code, 413)
+
+class TestExtensiveForm(unittest.TestCase):
+    def test_repeated_solves(self):
+        first = stochastic.solve_stochastic(500, FARMER_SCENARIOS)
+        second = stochastic.solve_stochastic(500, FARMER_SCENARIOS)
+        self.assertAlmostEqual(first['expected_profit'], second['expected_profit'])
+        self.assertAlmostEqual(second['expected_profit'], 108390, places=2)
+
+class TestProgressiveHedging(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+        rng = np.random.default_rng(8)
+        self.ylds = rng.uniform([2.0, 2.4, 16.0], [3.0, 3.6, 24.0], size=(40, 3))
+        self.ylds[0, 0] = 0.0
+
+    def test_textbook_instance(self):
+        res = stochastic.solve_stochastic(500, FARMER_SCENARIOS, method="ph", max_iter=200, ph_tol=1e-6)
+        self.assertTrue(res['converged'])
+        np.testing.assert_allclose(res['x'], [170, 80, 250], atol=0.01)
+        self.assertAlmostEqual(res['expected_profit'], 108390, delta=1.0)
+        self.assertEqual(len(res['logs']), res['iterations'])
+
+    def test_default_configuration_converges(self):
+        res = stochastic.solve_stochastic(500, FARMER_SCENARIOS, method="ph")
+        self.assertTrue(res['converged'])
+        self.assertLess(res['iterations'], 50)
+        np.testing.assert_allclose(res['x'], [170, 80, 250], atol=1.0)
+
+        res = self.client.post("/api/stochastic", json={"total_land": 500, "scenarios": FARMER_SCENARIOS,
+                                                        "method": "ph", "render": "data"}).json()
+        self.assertTrue(res['converged'])
+
+    def test_default_configuration_converges_many_scenarios(self):
+        ylds = np.random.default_rng(8).uniform([2.0, 2.4, 16.0], [3.0, 3.6, 24.0], size=(1000, 3))
+        probs = np.full(1000, 1 / 1000)
+        res = stochastic.solve_stochastic_arrays(500, probs, ylds, "ph", render="data")
+        self.assertTrue(res['converged'])
+        self.assertAlmostEqual(res['expected_profit'],
+                               stochastic.solve_extensive(500, probs, ylds, render="data")['expected_profit'],
+                               delta=0.001 * abs(res['expected_profit']))
+
+    def test_zero_probabilities_rejected(self):
+        scenarios = [dict(s, probability=0.0) for s in FARMER_SCENARIOS]
+        for method in ("ph", "lshaped", "extensive"):
+            with self.assertRaisesRegex(ValueError, "positive sum"):
+                stochastic.solve_stochastic(500, scenarios, method=method)
+        with self.assertRaisesRegex(ValueError, "non-negative"):
+            stochastic.solve_progressive_hedging(500, np.array([1.0, -0.5]), self.ylds[:2])
+        response = self.client.post("/api/stochastic", json={"total_land": 500, "scenarios": scenarios,
+                                                             "method": "ph", "render": "data"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_closed_form_plans_match_lp(self):
+        X = stochastic._farmer_deterministic(500, self.ylds)
+        self.assertTrue(np.all(X.sum(axis=1) <= 500 + 1e-9))
+        profits = stochastic.farmer_plan_profits(X, self.ylds)
+        for s in range(0, 40, 8):
+            single = stochastic.solve_extensive(500, np.ones(1), self.ylds[s:s + 1], render="data")
+            self.assertAlmostEqual(profits[s], single['expected_profit'], places=4)
+
+    def test_subproblem_optimality(self):
+        rng = np.random.default_rng(9)
+        w = rng.normal(0, 50, size=(40, 3))
+        x_bar = np.array([150.0, 100.0, 250.0])
+        rho = 0.5
+        X = stochastic._ph_subproblems(self.ylds, w, x_bar, rho, 500)
+        self.assertTrue(np.all(X >= 0))
+        self.assertTrue(np.all(X.sum(axis=1) <= 500 + 1e-9))
+
+        def objective(x, s):
+            return stochastic.farmer_profits(x[np.newaxis, :], self.ylds[s:s + 1])[0, 0] - w[s] @ x - rho / 2 * np.sum((x - x_bar) ** 2)
+
+        # No random feasible perturbation improves the penalized objective
+        for s in range(0, 40, 8):
+            best = objective(X[s], s)
+            for _ in range(50):
+                trial = np.maximum(X[s] + rng.normal(0, 5, size=3), 0)
+                if trial.sum() > 500:
+                    trial *= 500 / trial.sum()
+                self.assertLessEqual(objective(trial, s), best + 1e-6)
+
+    def test_parallel_matches_serial(self):
+        probs = np.full(40, 1 / 40)
+        serial = stochastic.solve_progressive_hedging(500, probs, self.ylds, max_iter=20, workers=1)
+        parallel = stochastic.solve_progressive_hedging(500, probs, self.ylds, max_iter=20, workers=2)
+        np.testing.assert_allclose(serial['x'], parallel['x'])
+
+    def test_close_to_extensive_form(self):
+        scenarios = generate_scenarios(200, seed=10)
+        extensive = stochastic.solve_stochastic(500, scenarios)
+        res = stochastic.solve_stochastic(500, scenarios, method="ph", max_iter=200, ph_tol=1e-2)
+        self.assertAlmostEqual(res['expected_profit'], extensive['expected_profit'], delta=1e-4 * extensive['expected_profit'])
+
+    def test_api_ph(self):
+        payload = {"total_land": 500, "scenarios": FARMER_SCENARIOS, "method": "ph", "max_iter": 200, "rho": 2.0}
+        response = self.client.post("/api/stochastic", json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['method'], "ph")
+
+        payload["rho"] = 0
+        response = self.client.post("/api/stochastic", json=payload)
+        self.assertEqual(response.status_code, 422)
+
+class TestCVaR(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+
+    def test_cvar_of_discrete_losses(self):
+        losses = np.array([1.0, 4.0, 2.0, 3.0])
+        probs = np.full(4, 0.25)
+        self.assertAlmostEqual(twostage.cvar(losses, probs, 0.5), 3.5)
+        self.assertAlmostEqual(twostage.cvar(losses, probs, 0.0), 2.5)
+        # The tail of mass 0.4 takes all of the worst scenario and 0.15 of the next one
+        self.assertAlmostEqual(twostage.cvar(losses, probs, 0.6), (4 * 0.25 + 3 * 0.15) / 0.4)
+
+    def test_zero_weight_is_risk_neutral(self):
+        res = stochastic.solve_stochastic(500, FARMER_SCENARIOS, cvar_weight=0.0)
+        self.assertAlmostEqual(res['expected_profit'], 108390, places=2)
+        self.assertNotIn('cvar', res)
+
+    def test_risk_weight_trades_mean_for_tail(self):
+        scenarios = generate_scenarios(30, seed=3)
+        previous = None
+        for weight in (0.0, 0.3, 1.0):
+            res = stochastic.solve_stochastic(500, scenarios, cvar_weight=weight, cvar_alpha=0.8)
+            self.assertTrue(res['success'])
+            if weight == 0.0:
+                # Reference CVaR of the risk-neutral plan
+                profits = stochastic.farmer_profits(np.array([res['x']]), np.array([s['yields'] for s in scenarios]))[0]
+                probs = np.array([s['probability'] for s in scenarios])
+                res['cvar'] = -twostage.cvar(-profits, probs, 0.8)
+            if previous is not None:
+                self.assertLessEqual(res['expected_profit'], previous['expected_profit'] + 1e-6)
+                self.assertGreaterEqual(res['cvar'], previous['cvar'] - 1e-6)
+            previous = res
+
+    def test_frontier_matches_extensive(self):
+        scenarios = generate_scenarios(40, seed=5)
+        res = stochastic.solve_stochastic(500, scenarios, method="frontier", cvar_alpha=0.9, frontier_points=5)
+        self.assertTrue(res['success'])
+        self.assertTrue(res['converged'])
+        self.assertEqual([p['weight'] for p in res['frontier']], [0.0, 0.25, 0.5, 0.75, 1.0])
+        for point in res['frontier'][1:]:
+            w = point['weight']
+            exact = stochastic.solve_stochastic(500, scenarios, cvar_weight=w, cvar_alpha=0.9)
+            target = (1 - w) * exact['expected_profit'] + w * exact['cvar']
+            achieved = (1 - w) * point['expected_profit'] + w * point['cvar']
+            self.assertAlmostEqual(achieved / target, 1.0, places=5)
+        # Moving along the frontier gives up expected profit for a better tail
+        means = [p['expected_profit'] for p in res['frontier']]
+        tails = [p['cvar'] for p in res['frontier']]
+        self.assertTrue(all(a >= b - 1e-6 for a, b in zip(means, means[1:])))
+        self.assertTrue(all(a <= b + 1e-6 for a, b in zip(tails, tails[1:])))
+
+    def test_frontier_includes_requested_weight(self):
+        res = stochastic.solve_stochastic(500, FARMER_SCENARIOS, method="frontier", cvar_weight=0.33, frontier_points=3)
+        self.assertIn(0.33, [p['weight'] for p in res['frontier']])
+        point = next(p for p in res['frontier'] if p['weight'] == 0.33)
+        self.assertEqual(res['x'], point['x'])
+
+    def test_frontier_api_and_method_checks(self):
+        payload = {"total_land": 500, "scenarios": FARMER_SCENARIOS, "method": "frontier", "frontier_points": 6}
+        response = self.client.post("/api/stochastic", json=payload)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['method'], "frontier")
+        self.assertEqual(len(data['frontier']), 6)
+
+        response = self.client.post("/api/stochastic", json={**payload, "method": "lshaped", "cvar_weight": 0.5})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post("/api/stochastic", json={**payload, "cvar_alpha": 1.0})
+        self.assertEqual(response.status_code, 422)
+
+        # CVaR needs a probability distribution
+        scenarios = [dict(s, probability=0.2) for s in FARMER_SCENARIOS]
+        response = self.client.post("/api/stochastic", json={**payload, "scenarios": scenarios})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
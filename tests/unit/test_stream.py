@@ -0,0 +1,73 @@
+import sys
+import os
+import json
+import unittest
+from fastapi.testclient import TestClient
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+from api.index import app
+import api.limiter
+
+COLGEN_PAYLOAD = {"roll_length": 100, "demands": [[45, 97], [36, 610], [31, 395], [14, 211]]}
+LAGRANGIAN_PAYLOAD = {"costs": [[4, 6], [5, 3], [2, 7]], "weights": [[2, 3], [3, 2], [2, 2]], "capacities": [4, 4], "render": "data"}
+IP_PAYLOAD = {"c": [5, 8], "A_ub": [[1, 1], [5, 9]], "b_ub": [6, 45], "maximize": True, "render": "data"}
+
+class TestEventStreams(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+
+    def stream(self, path, payload):
+        """Posts the payload and returns the (event, data) pairs of the text/event-stream response."""
+        response = self.client.post(path, json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        events = []
+        for block in response.text.strip().split("\n\n"):
+            event, data = block.split("\n")
+            self.assertTrue(event.startswith("event: ") and data.startswith("data: "))
+            events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+        # Progress events, then exactly one final event
+        self.assertTrue(all(kind == "progress" for kind, _ in events[:-1]))
+        return events
+
+    def test_colgen_columns(self):
+        events = self.stream("/api/colgen/stream", COLGEN_PAYLOAD)
+        kind, result = events[-1]
+        self.assertEqual(kind, "result")
+        columns = [data["pattern"] for _, data in events[:-1]]
+        # One event per generated column, in order, and the log is not buffered in the result
+        self.assertEqual(columns, result["patterns"][len(COLGEN_PAYLOAD["demands"]):])
+        self.assertEqual(result["logs"], ["Optimality reached. Max reduced cost val: 1.0000 <= 1"])
+        self.assertEqual(result["objective"], self.client.post("/api/colgen", json=COLGEN_PAYLOAD).json()["objective"])
+
+    def test_lagrangian_bounds(self):
+        events = self.stream("/api/lagrangian/stream", LAGRANGIAN_PAYLOAD)
+        _, result = events[-1]
+        progress = [data for _, data in events[:-1]]
+        self.assertEqual([p["iteration"] for p in progress], list(range(1, result["iterations"] + 1)))
+        self.assertEqual([p["current_lb"] for p in progress], result["lb_history"])
+        self.assertEqual(progress[-1]["lb"], result["lb"])
+        self.assertEqual(result["logs"], [])
+
+    def test_ip_incumbent_and_nodes(self):
+        events = self.stream("/api/ip/stream", IP_PAYLOAD)
+        _, result = events[-1]
+        progress = [data for _, data in events[:-1]]
+        self.assertEqual([p["nodes"] for p in progress], list(range(len(progress))))
+        incumbents = [p["incumbent"] for p in progress if p["incumbent"] is not None]
+        self.assertEqual(incumbents, sorted(incumbents))
+        self.assertEqual(result["fun"], 40.0)
+
+    def test_errors(self):
+        # Validation happens before streaming starts
+        response = self.client.post("/api/ip/stream", json={"c": [1]})
+        self.assertEqual(response.status_code, 422)
+        # Solver errors end the stream with an error event
+        events = self.stream("/api/colgen/stream", {"roll_length": 100, "demands": [[0, 5]]})
+        self.assertEqual(events, [("error", {"status_code": 400, "detail": "Invalid input parameters"})])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import sys
+import os
+import unittest
+import numpy as np
+from fastapi.testclient import TestClient
+
+# Add root to path
+sys.path.append(os.getcwd())
+
+from api.index import app
+from api.solvers import stochastic, twostage
+import api.limiter
+
+FARMER_YIELDS = np.array([[3.0, 3.6, 24.0], [2.5, 3.0, 20.0], [2.0, 2.4, 16.0]])
+
+def farmer_instance(ylds=FARMER_YIELDS):
+    q, W, h, T = stochastic.farmer_recourse(ylds)
+    probs = np.full(ylds.shape[0], 1.0 / ylds.shape[0])
+    return stochastic.PLANTING_COSTS, W, q[np.newaxis], T, h[np.newaxis], probs
+
+class TestTwoStage(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        api.limiter.rate_limit_store.clear()
+
+    def test_farmer_preset(self):
+        res = twostage.solve_two_stage(*farmer_instance(), A_ub=[[1, 1, 1]], b_ub=[500])
+        self.assertTrue(res['success'])
+        self.assertAlmostEqual(-res['objective'], 108390, places=2)
+        np.testing.assert_allclose(res['x'], [170, 80, 250], atol=1e-6)
+        # Scenario profits of the textbook solution
+        profits = -res['recourse_costs'] - res['x'] @ stochastic.PLANTING_COSTS
+        np.testing.assert_allclose(profits, [167000, 109350, 48820], atol=1e-4)
+
+    def test_shared_and_per_scenario_data_agree(self):
+        c, W, q, T, h, probs = farmer_instance()
+        shared = twostage.solve_two_stage(c, W, q, T, h, probs, A_ub=[[1, 1, 1]], b_ub=[500])
+        n = probs.size
+        tiled = twostage.solve_two_stage(c, W, np.repeat(q, n, axis=0), T, np.repeat(h, n, axis=0), probs,
+                                         A_ub=[[1, 1, 1]], b_ub=[500])
+        self.assertAlmostEqual(shared['objective'], tiled['objective'], places=6)
+
+    def test_matrix_structure(self):
+        c, W, q, T, h, probs = farmer_instance(FARMER_YIELDS[:2])
+        _, A, rhs, _ = twostage.extensive_form(c, W, q, T, h, probs, A_ub=[[1, 1, 1]], b_ub=[500])
+        A = A.toarray()
+        # 1 land row + 4 rows per scenario; 3 acres + 6 recourse variables per scenario
+        self.assertEqual(A.shape, (9, 15))
+        np.testing.assert_array_equal(A[0], [1, 1, 1] + [0] * 12)
+        for s in range(2):
+            rows = slice(1 + 4 * s, 5 + 4 * s)
+            np.testing.assert_array_equal(A[rows, :3], T[s])
+            np.testing.assert_array_equal(A[rows, 3 + 6 * s:9 + 6 * s], W)
+        np.testing.assert_array_equal(rhs, [500] + list(h[0]) * 2)
+
+    def test_template_is_cached_and_shared_safely(self):
+        twostage._template.cache_clear()
+        c, W, q, T, h, probs = farmer_instance()
+        _, a, _, _ = twostage.extensive_form(c, W, q, T, h, probs)
+        _, b, _, _ = twostage.extensive_form(c, W, q, 2 * T, h, probs)
+        self.assertEqual(twostage._template.cache_info().hits, 1)
+        self.assertFalse(np.shares_memory(a.data, b.data))
+        self.assertTrue(np.shares_memory(a.indices, b.indices))
+        self.assertFalse(a.indices.flags.writeable)
+        np.testing.assert_array_equal(2 * a.toarray()[:, :3], b.toarray()[:, :3])
+
+    def test_cache_is_bounded(self):
+        twostage._template.cache_clear()
+        for n in range(1, twostage.TEMPLATE_CACHE_SIZE + 5):
+            c, W, q, T, h, probs = farmer_instance(np.ones((n, 3)))
+            twostage.extensive_form(c, W, q, T, h, probs)
+        self.assertEqual(twostage._template.cache_info().currsize, twostage.TEMPLATE_CACHE_SIZE)
+
+    def test_shape_validation(self):
+        c, W, q, T, h, probs = farmer_instance()
+        with self.assertRaises(ValueError):
+            twostage.solve_two_stage(c, W, q[:, :5], T, h, probs)
+        with self.assertRaises(ValueError):
+            twostage.solve_two_stage(c, W, q, T[:2], h, probs)
+        with self.assertRaises(ValueError):
+            twostage.solve_two_stage(c, W, q, T, h, probs, A_ub=[[1, 1]], b_ub=[500])
+
+    def test_frontier_with_lp_recourse(self):
+        c, W, q, T, h, probs = farmer_instance()
+        res = twostage.two_stage_frontier(c, W, q, T, h, probs, A_ub=[[1, 1, 1]], b_ub=[500],
+                                          cvar_alpha=0.5, weights=[1.0, 0.0, 0.5])
+        self.assertTrue(res['success'])
+        self.assertEqual([p['weight'] for p in res['points']], [1.0, 0.0, 0.5])
+        self.assertAlmostEqual(-res['points'][1]['expected_cost'], 108390, places=2)
+        for point in res['points']:
+            exact = twostage.solve_two_stage(c, W, q, T, h, probs, A_ub=[[1, 1, 1]], b_ub=[500],
+                                             cvar_weight=max(point['weight'], 1e-9), cvar_alpha=0.5)
+            self.assertAlmostEqual(point['objective'] / exact['objective'], 1.0, places=6)
+
+    def test_closed_form_oracle_matches_lp_recourse(self):
+        c, W, q, T, h, probs = farmer_instance()
+        oracle = stochastic.FarmerRecourse(FARMER_YIELDS)
+        for x in ([170, 80, 250], [0, 0, 0], [100, 150, 250]):
+            x = np.array(x, dtype=float)
+            Q, grad = oracle(x)
+            Q_lp, pi = twostage.solve_recourse(x, q[0], W, h[0], T)
+            np.testing.assert_allclose(Q, Q_lp, atol=1e-6)
+            # Cuts from the oracle never overestimate the recourse cost elsewhere
+            y = np.array([120.0, 120.0, 200.0])
+            self.assertTrue(np.all(Q + grad @ (y - x) <= oracle(y)[0] + 1e-6))
+
+    def test_api(self):
+        c, W, q, T, h, probs = farmer_instance()
+        payload = {
+            "c": c.tolist(), "A_ub": [[1, 1, 1]], "b_ub": [500], "W": W.tolist(),
+            "q": q.tolist(), "T": T.tolist(), "h": h.tolist(), "probabilities": probs.tolist()
+        }
+        response = self.client.post("/api/twostage", json=payload)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertAlmostEqual(-data['objective'], 108390, places=2)
+        self.assertEqual(len(data['recourse_costs']), 3)
+
+        response = self.client.post("/api/twostage", json={**payload, "cvar_weight": 0.5, "cvar_alpha": 0.5})
+        data = response.json()
+        # Planting 100/100/300 gives up 1,290 of expected profit for a better worst-half profit
+        self.assertAlmostEqual(-data['expected_cost'], 107100, places=2)
+        self.assertAlmostEqual(-data['cvar'], 77033.33, places=1)
+
+        response = self.client.post("/api/twostage", json={**payload, "b_ub": None})
+        self.assertEqual(response.status_code, 422)
+
+        # Ragged T
+        response = self.client.post("/api/twostage", json={**payload, "T": [T[0].tolist(), T[1].tolist()[:3]]})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()